@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+# State that must be the same in every worker lives in a Django cache. A
+# local-memory cache is per process, so with several workers the free tier
+# limit would be multiplied by the worker count, and a save in one worker
+# would not invalidate the cached copies held by the others. Like Django's
+# own security checks this runs with check --deploy, so migrate and
+# collectstatic work before CACHE_URL is configured.
+SHARED_CACHE_SETTINGS = [
+    ('RATE_LIMIT_CACHE_ALIAS', 'free tier rate limit counters'),
+    ('BUSINESS_PROFILE_CACHE_ALIAS', 'business profile version counters'),
+    ('AUTH_USER_CACHE_ALIAS', 'authenticated user version counters'),
+]
+
+
+def _is_local_memory(alias: str) -> bool:
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', '')
+    return backend == 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_caches(app_configs, **kwargs):
+    if settings.LOCAL_CACHE_ALLOWED:
+        return []
+    errors = []
+    for setting, purpose in SHARED_CACHE_SETTINGS:
+        alias = getattr(settings, setting)
+        if alias in settings.CACHES and _is_local_memory(alias):
+            errors.append(Error(
+                f'{setting} points at the local-memory cache {alias!r}, so the {purpose} are per worker.',
+                hint='Set CACHE_URL to a Redis or Memcached URL, or LOCAL_CACHE_ALLOWED=true '
+                     'when running a single process.',
+                obj=f'settings.{setting}',
+                id='api.E001',
+            ))
+    return errors
+
+
+@register()
+def check_request_budget(app_configs, **kwargs):
+    """A request whose LLM calls may outlast the gunicorn timeout gets its worker killed mid-response"""
+    errors = []
+    budget = settings.GEMINI_CALL_POLICY['budget']
+    if budget >= settings.REQUEST_BUDGET_SECONDS:
+        errors.append(Warning(
+            f"GEMINI_CALL_POLICY['budget'] ({budget:g}s) leaves no time in REQUEST_BUDGET_SECONDS "
+            f"({settings.REQUEST_BUDGET_SECONDS:g}s) for the rest of the request.",
+            hint='Lower GEMINI_REQUEST_BUDGET.',
+            id='api.W001',
+        ))
+    if settings.REQUEST_BUDGET_SECONDS >= settings.GUNICORN_TIMEOUT:
+        errors.append(Warning(
+            f'REQUEST_BUDGET_SECONDS ({settings.REQUEST_BUDGET_SECONDS:g}s) is not below GUNICORN_TIMEOUT '
+            f'({settings.GUNICORN_TIMEOUT}s), so slow requests are killed instead of failing cleanly.',
+            hint='Lower REQUEST_BUDGET_SECONDS or raise gunicorn --timeout and GUNICORN_TIMEOUT together.',
+            id='api.W002',
+        ))
+    return errors
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from api.utils.retention import compact_generation_requests
+
+
+class Command(BaseCommand):
+    help = 'Roll expired free tier request logs into daily per-IP counts and delete them in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, help='Keep raw rows for this many days')
+        parser.add_argument('--rollup-retention-days', type=int, help='Keep daily rollups for this many days')
+        parser.add_argument('--batch-size', type=int, help='Rows rolled up and deleted per transaction')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        summary = compact_generation_requests(
+            retention_days=options['retention_days'],
+            batch_size=options['batch_size'],
+            rollup_retention_days=options['rollup_retention_days'],
+            pause=options['pause']
+        )
+        self.stdout.write(
+            f"Compacted {summary['compacted']} requests in {summary['batches']} batches, "
+            f"deleted {summary['expired_rollups']} expired rollups"
+        )
@@ -0,0 +1,40 @@
+import signal
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from api.utils.dispatcher import dispatch_due_content
+
+
+class Command(BaseCommand):
+    help = 'Publish approved content whose scheduled time has passed. Several dispatchers can run at once.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.CONTENT_DISPATCH_BATCH_SIZE,
+                            help='Items claimed per batch')
+        parser.add_argument('--concurrency', type=int, default=settings.CONTENT_DISPATCH_CONCURRENCY,
+                            help='Concurrent publisher calls')
+        parser.add_argument('--poll-interval', type=float, default=settings.CONTENT_DISPATCH_POLL_SECONDS,
+                            help='Seconds to sleep when nothing is due')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once nothing is due instead of polling forever')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        while not self.stopping:
+            close_old_connections()
+            summary = dispatch_due_content(options['batch_size'], options['concurrency'])
+            if summary['claimed']:
+                self.stdout.write(f"Posted {summary['posted']}, failed {summary['failed']} "
+                                  f"of {summary['claimed']} claimed")
+                # A full batch means more is probably due right now
+                continue
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+
+    def _stop(self, signum, frame):
+        self.stopping = True
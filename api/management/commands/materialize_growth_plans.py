@@ -0,0 +1,37 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from api.models import GrowthPlan
+from api.utils.plan_materializer import materialize_growth_plan
+
+
+class Command(BaseCommand):
+    help = "Generate the week's scheduled content for active growth plans. Safe to re-run."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--business', help='Only materialise the plan of this business id')
+        parser.add_argument('--start-date', help='First day of the week (YYYY-MM-DD), defaults to tomorrow')
+        parser.add_argument('--batch-size', type=int, help='Rows per bulk insert')
+        parser.add_argument('--concurrency', type=int, help='Concurrent LLM calls per plan')
+
+    def handle(self, *args, **options):
+        plans = GrowthPlan.objects.select_related('business').filter(is_active=True)
+        if options['business']:
+            plans = plans.filter(business_id=options['business'])
+
+        start_date = None
+        if options['start_date']:
+            start_date = date.fromisoformat(options['start_date'])
+
+        for plan in plans.iterator():
+            summary = materialize_growth_plan(
+                plan,
+                start_date=start_date,
+                batch_size=options['batch_size'],
+                max_workers=options['concurrency']
+            )
+            self.stdout.write(
+                f"{plan.business}: {summary['created']} created, "
+                f"{summary['skipped']} skipped, {summary['failed']} failed"
+            )
+            for error in summary['errors']:
+                self.stderr.write(f"  {error['plan_item']}: {error['error']}")
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from api.utils.response_cache import response_cache
+from api.utils.similar_cache import similar_cache
+
+
+class Command(BaseCommand):
+    help = 'Delete expired rows from the generated content and near-duplicate content caches'
+
+    def handle(self, *args, **options):
+        deleted = response_cache.purge_expired()
+        similar = similar_cache.purge_expired()
+        self.stdout.write(f'Deleted {deleted} expired cached responses and {similar} expired similar contents')
@@ -0,0 +1,87 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from api.utils.benchmark import (
+    benchmark_report, create_users, delete_benchmark_users, local_server, parse_mix, run_load, write_report
+)
+
+
+class Command(BaseCommand):
+    help = ('Load-test the generate, content list, growth plan and auth endpoints and save the results as JSON. '
+            'Without --base-url a local gunicorn server is started on a throwaway database with the fake Gemini '
+            'backend.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='',
+                            help='Benchmark a running server instead of starting a local one')
+        parser.add_argument('--backend', choices=['fake', 'gemini'], default='fake',
+                            help='Gemini backend for the local server')
+        parser.add_argument('--workers', type=int, default=4, help='Gunicorn workers for the local server')
+        parser.add_argument('--database-url', default='',
+                            help='Throwaway database for the local server (default: a temporary SQLite file). '
+                                 'It is migrated and written to, so never point it at real data')
+        parser.add_argument('--mix', default='generate:4,content_list:4,growth_plan:1,auth:1',
+                            help='Weighted scenarios, e.g. generate:4,content_list:4,auth')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent virtual users')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run for')
+        parser.add_argument('--requests', type=int, default=None, help='Stop after this many requests')
+        parser.add_argument('--unique-prompts', action='store_true',
+                            help='Send every generate request with regenerate set so none are served from cache')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the scenario sequence')
+        parser.add_argument('--output', default='', help='Results file (default: BENCHMARK_OUTPUT_DIR/<time>.json)')
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        concurrency = max(1, options['concurrency'])
+
+        started_at = timezone.now()
+        load_options = dict(
+            mix=mix,
+            duration=options['duration'],
+            max_requests=options['requests'],
+            seed=options['seed'],
+        )
+        if options['base_url']:
+            base_url = options['base_url']
+            users = create_users(base_url, concurrency, options['unique_prompts'])
+            try:
+                results = run_load(users, **load_options)
+            finally:
+                # Removes the run's users when the server shares this project's configured database
+                deleted = delete_benchmark_users([user.email for user in users])
+            if deleted < len(users):
+                self.stdout.write(self.style.WARNING(
+                    f'Deleted {deleted} of {len(users)} benchmark users; the rest are in the server\'s own '
+                    f'database (emails matching bench-<12 hex>@example.com)'
+                ))
+            report = benchmark_report(results, started_at.isoformat(), base_url, mix, concurrency)
+        else:
+            server = {
+                'gemini_backend': options['backend'],
+                'database': options['database_url'].partition(':')[0] or 'sqlite (temporary)',
+                'workers': options['workers'],
+            }
+            with local_server(backend=options['backend'], workers=options['workers'],
+                              database_url=options['database_url']) as base_url:
+                users = create_users(base_url, concurrency, options['unique_prompts'])
+                results = run_load(users, **load_options)
+            report = benchmark_report(results, started_at.isoformat(), base_url, mix, concurrency, server)
+
+        path = options['output']
+        if not path:
+            os.makedirs(settings.BENCHMARK_OUTPUT_DIR, exist_ok=True)
+            path = os.path.join(settings.BENCHMARK_OUTPUT_DIR, f"{started_at:%Y%m%dT%H%M%S}.json")
+        write_report(report, path)
+
+        for name, summary in list(report['scenarios'].items()) + [('total', report['total'])]:
+            self.stdout.write(
+                f"{name:<13} {summary['requests']:>6} req  {summary['errors']:>4} err  "
+                f"{summary['throughput_rps'] or 0:>8.1f} rps  p50 {summary['p50_ms']} ms  "
+                f"p95 {summary['p95_ms']} ms  p99 {summary['p99_ms']} ms  "
+                f"queries/req {summary['queries_per_request']}"
+            )
+        self.stdout.write(self.style.SUCCESS(f'Results written to {path}'))
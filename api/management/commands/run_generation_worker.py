@@ -0,0 +1,73 @@
+import os
+import signal
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from api.utils.job_queue import claim_jobs, fail_exhausted_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run a worker that executes queued content generation jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.GENERATION_WORKER_CONCURRENCY,
+                            help='Maximum number of jobs this worker runs at once')
+        parser.add_argument('--lease-seconds', type=int, default=settings.GENERATION_JOB_LEASE_SECONDS,
+                            help='Visibility timeout for claimed jobs')
+        parser.add_argument('--poll-interval', type=float, default=settings.GENERATION_WORKER_POLL_SECONDS,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is drained instead of polling forever')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        concurrency = max(1, options['concurrency'])
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stdout.write(f'Worker {worker_id} started with concurrency {concurrency}')
+
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while not self.stopping:
+                close_old_connections()
+                fail_exhausted_jobs()
+
+                # Only claim as many jobs as there are free slots, so leases are not wasted waiting
+                jobs = claim_jobs(worker_id, concurrency - len(in_flight), options['lease_seconds'])
+                for job in jobs:
+                    in_flight.add(executor.submit(self._run, job))
+
+                if not in_flight:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                done, in_flight = wait(in_flight, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = future.result()
+                    if job is not None:
+                        self.stdout.write(f'Job {job.id} {job.status}')
+
+            wait(in_flight)
+
+        self.stdout.write(f'Worker {worker_id} stopped')
+
+    def _run(self, job):
+        try:
+            return run_job(job)
+        except Exception as e:
+            # The lease will expire and another attempt will pick the job up
+            self.stderr.write(f'Job {job.id} crashed: {e}')
+            return None
+        finally:
+            # Each pool thread owns its own connection; release it between jobs
+            connections.close_all()
+
+    def _stop(self, signum, frame):
+        self.stopping = True
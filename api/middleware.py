@@ -0,0 +1,57 @@
+import json
+import logging
+import random
+from django.conf import settings
+from .utils.profiling import profile_request, track_queries
+
+logger = logging.getLogger('api.profiling')
+
+
+class ProfilingMiddleware:
+    """
+    Measure total time, DB queries and LLM time for a sample of requests.
+    Results go out as a Server-Timing header and one JSON log line; requests
+    over PROFILING_QUERY_BUDGET or PROFILING_LATENCY_BUDGET_MS are logged as
+    warnings. Streaming bodies are produced after this returns, so only the
+    time to the first byte is covered for them.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        with profile_request() as profile, track_queries():
+            response = self.get_response(request)
+        elapsed = profile.elapsed
+
+        if settings.PROFILING_SERVER_TIMING:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={profile.db_time * 1000:.1f};desc="{profile.db_queries} queries"',
+                f'llm;dur={profile.llm_time * 1000:.1f};desc="{profile.llm_calls} calls"',
+                f'total;dur={elapsed * 1000:.1f}',
+            ])
+
+        over_budget = []
+        if profile.db_queries > settings.PROFILING_QUERY_BUDGET:
+            over_budget.append('queries')
+        if elapsed * 1000 > settings.PROFILING_LATENCY_BUDGET_MS:
+            over_budget.append('latency')
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': resolver_match.view_name if resolver_match else None,
+            'status': response.status_code,
+            'total_ms': round(elapsed * 1000, 1),
+            'db_queries': profile.db_queries,
+            'db_ms': round(profile.db_time * 1000, 1),
+            'llm_calls': profile.llm_calls,
+            'llm_ms': round(profile.llm_time * 1000, 1),
+            'over_budget': over_budget,
+        }
+        logger.log(logging.WARNING if over_budget else logging.INFO, json.dumps(record))
+        return response
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-17 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeneratedContentCache',
+            fields=[
+                ('cache_key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('content_type', models.CharField(max_length=50)),
+                ('platform', models.CharField(blank=True, max_length=50)),
+                ('response', models.JSONField(default=dict)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expires_at'], name='api_generat_expires_63ef63_idx')],
+            },
+        ),
+    ]
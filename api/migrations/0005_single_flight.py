@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 10:06
+
+from django.db import migrations, models
+
+
+def deactivate_duplicate_plans(apps, schema_editor):
+    # Keep the newest active plan per business so the unique constraint can be added
+    GrowthPlan = apps.get_model('api', 'GrowthPlan')
+    seen = set()
+    for plan in GrowthPlan.objects.filter(is_active=True).order_by('business_id', '-created_at'):
+        if plan.business_id in seen:
+            GrowthPlan.objects.filter(pk=plan.pk).update(is_active=False)
+        seen.add(plan.business_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_generationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SingleFlightLock',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(deactivate_duplicate_plans, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='growthplan',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('business',), name='unique_active_growth_plan'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-17 10:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_single_flight'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentGenerationDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('ip_address', models.GenericIPAddressField()),
+                ('request_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='contentgenerationrequest',
+            name='api_content_ip_addr_84dbf4_idx',
+        ),
+        migrations.AddIndex(
+            model_name='contentgenerationrequest',
+            index=models.Index(fields=['ip_address', 'created_at'], name='api_content_ip_addr_79dc3d_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='contentgenerationdailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'ip_address'), name='unique_daily_rollup_per_ip'),
+        ),
+    ]
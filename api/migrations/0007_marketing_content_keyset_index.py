@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-17 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_generation_request_retention'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='marketingcontent',
+            index=models.Index(fields=['business', '-created_at', '-id'], name='content_business_created_idx'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+from django.db import migrations
+
+# Full-text index over MarketingContent. The index lives outside the Django
+# model: PostgreSQL keeps a generated tsvector column (its GIN index is built
+# concurrently in 0013) and SQLite keeps an FTS5 table in sync with triggers,
+# so both are maintained incrementally by the database on every
+# insert/update/delete. The FTS5 rows carry the content's UUID rather than
+# sharing its rowid, which VACUUM and table rebuilds may renumber.
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE api_marketingcontent ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(metadata->>'theme', '') || ' ' || coalesce(metadata->>'tone', '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(content_text, '')), 'B')
+    ) STORED
+    """,
+]
+
+POSTGRES_REVERSE = [
+    "ALTER TABLE api_marketingcontent DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER api_marketingcontent_fts_insert AFTER INSERT ON api_marketingcontent BEGIN
+        INSERT INTO api_marketingcontent_fts(content_id, theme, tone, content_text)
+        VALUES (new.id, json_extract(new.metadata, '$.theme'), json_extract(new.metadata, '$.tone'), new.content_text);
+    END
+    """,
+    """
+    CREATE TRIGGER api_marketingcontent_fts_update AFTER UPDATE OF content_text, metadata ON api_marketingcontent BEGIN
+        DELETE FROM api_marketingcontent_fts WHERE content_id = old.id;
+        INSERT INTO api_marketingcontent_fts(content_id, theme, tone, content_text)
+        VALUES (new.id, json_extract(new.metadata, '$.theme'), json_extract(new.metadata, '$.tone'), new.content_text);
+    END
+    """,
+    """
+    CREATE TRIGGER api_marketingcontent_fts_delete AFTER DELETE ON api_marketingcontent BEGIN
+        DELETE FROM api_marketingcontent_fts WHERE content_id = old.id;
+    END
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS api_marketingcontent_fts_insert",
+    "DROP TRIGGER IF EXISTS api_marketingcontent_fts_update",
+    "DROP TRIGGER IF EXISTS api_marketingcontent_fts_delete",
+    "DROP TABLE IF EXISTS api_marketingcontent_fts",
+]
+
+SQLITE_FORWARD = SQLITE_REVERSE + [
+    """
+    CREATE VIRTUAL TABLE api_marketingcontent_fts USING fts5(
+        content_id UNINDEXED, theme, tone, content_text, tokenize='porter unicode61'
+    )
+    """,
+    """
+    INSERT INTO api_marketingcontent_fts(content_id, theme, tone, content_text)
+    SELECT id, json_extract(metadata, '$.theme'), json_extract(metadata, '$.tone'), content_text
+    FROM api_marketingcontent
+    """,
+] + SQLITE_TRIGGERS
+
+
+def install_sqlite_search_index(schema_editor):
+    """
+    (Re)build the SQLite index from scratch. SQLite migrations that alter
+    api_marketingcontent by remaking the table drop its triggers, so they
+    must call this afterwards.
+    """
+    for statement in SQLITE_FORWARD:
+        schema_editor.execute(statement)
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_marketing_content_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            _run({'postgresql': POSTGRES_REVERSE, 'sqlite': SQLITE_REVERSE}),
+        ),
+    ]
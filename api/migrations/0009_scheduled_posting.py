@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-17 10:12
+
+from importlib import import_module
+from django.db import migrations, models
+
+
+def restore_sqlite_search_index(apps, schema_editor):
+    # Adding fields remade api_marketingcontent on SQLite, dropping the FTS triggers
+    if schema_editor.connection.vendor == 'sqlite':
+        search = import_module('api.migrations.0008_marketing_content_search')
+        search.install_sqlite_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_marketing_content_search'),
+    ]
+
+    operations = [
+        # Restores the index after the fields are removed again when unapplying
+        migrations.RunPython(migrations.RunPython.noop, restore_sqlite_search_index),
+        migrations.AddField(
+            model_name='marketingcontent',
+            name='last_publish_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='marketingcontent',
+            name='next_publish_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='marketingcontent',
+            name='posted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='marketingcontent',
+            name='publish_attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='marketingcontent',
+            index=models.Index(condition=models.Q(('is_approved', True), ('is_posted', False)), fields=['scheduled_time'], name='content_due_for_posting_idx'),
+        ),
+        migrations.RunPython(restore_sqlite_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-17 10:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_scheduled_posting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarContentCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.CharField(max_length=64)),
+                ('fingerprint', models.BigIntegerField()),
+                ('content_type', models.CharField(max_length=50)),
+                ('platform', models.CharField(blank=True, max_length=50)),
+                ('content', models.TextField()),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket', 'expires_at'], name='similar_content_bucket_idx'), models.Index(fields=['expires_at'], name='api_similar_expires_698d25_idx')],
+                'constraints': [models.UniqueConstraint(fields=('bucket', 'fingerprint'), name='unique_similar_content_fingerprint')],
+            },
+        ),
+    ]
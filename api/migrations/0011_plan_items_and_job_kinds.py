@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-17 11:06
+
+import django.db.models.deletion
+from importlib import import_module
+from django.db import migrations, models
+
+
+def restore_sqlite_search_index(apps, schema_editor):
+    # Adding fields remade api_marketingcontent on SQLite, dropping the FTS triggers
+    if schema_editor.connection.vendor == 'sqlite':
+        search = import_module('api.migrations.0008_marketing_content_search')
+        search.install_sqlite_search_index(schema_editor)
+
+
+def copy_plan_items(apps, schema_editor):
+    # Materialised content recorded its plan only in metadata; duplicates from earlier races keep the oldest row
+    MarketingContent = apps.get_model('api', 'MarketingContent')
+    GrowthPlan = apps.get_model('api', 'GrowthPlan')
+    plan_ids = {str(plan_id) for plan_id in GrowthPlan.objects.values_list('id', flat=True)}
+    seen = set()
+    rows = MarketingContent.objects.filter(metadata__has_key='plan_item').order_by('created_at')
+    for content in rows.iterator():
+        plan_id, plan_item = content.metadata.get('plan_id'), content.metadata.get('plan_item')
+        if plan_id not in plan_ids or (plan_id, plan_item) in seen:
+            continue
+        seen.add((plan_id, plan_item))
+        MarketingContent.objects.filter(id=content.id).update(growth_plan_id=plan_id, plan_item=plan_item)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_similar_content_cache'),
+    ]
+
+    operations = [
+        # Restores the index after the fields are removed again when unapplying
+        migrations.RunPython(migrations.RunPython.noop, restore_sqlite_search_index),
+        migrations.AddField(
+            model_name='generationjob',
+            name='kind',
+            field=models.CharField(choices=[('content', 'Content generation'), ('materialize_plan', 'Growth plan materialisation')], default='content', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='marketingcontent',
+            name='growth_plan',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.growthplan'),
+        ),
+        migrations.AddField(
+            model_name='marketingcontent',
+            name='plan_item',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.RunPython(copy_plan_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='marketingcontent',
+            constraint=models.UniqueConstraint(fields=('growth_plan', 'plan_item'), name='unique_growth_plan_item'),
+        ),
+        migrations.RunPython(restore_sqlite_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-17 11:25
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_plan_items_and_job_kinds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='singleflightlock',
+            name='expires_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='singleflightlock',
+            name='owner',
+            field=models.CharField(default='', max_length=32),
+            preserve_default=False,
+        ),
+    ]
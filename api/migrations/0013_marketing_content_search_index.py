@@ -0,0 +1,39 @@
+from importlib import import_module
+from django.db import migrations
+
+# The GIN index over 0008's search_vector column, built without blocking
+# writes to api_marketingcontent. CREATE INDEX CONCURRENTLY cannot run in a
+# transaction, hence atomic = False. The column is not part of the Django
+# model, so AddIndexConcurrently (which needs the field in the model state)
+# cannot express it. On SQLite the FTS5 table is rebuilt keyed on the
+# content UUID, replacing the rowid-keyed table earlier versions of 0008
+# created.
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS api_marketingcontent_search_idx '
+            'ON api_marketingcontent USING GIN (search_vector)'
+        )
+    elif schema_editor.connection.vendor == 'sqlite':
+        search = import_module('api.migrations.0008_marketing_content_search')
+        search.install_sqlite_search_index(schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS api_marketingcontent_search_idx')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('api', '0012_single_flight_lock_lease'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -38,6 +38,16 @@ class GrowthPlan(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # Concurrent first requests must not each create (and pay for) an active plan
+            models.UniqueConstraint(
+                fields=['business'],
+                condition=models.Q(is_active=True),
+                name='unique_active_growth_plan'
+            ),
+        ]
+
 class MarketingContent(models.Model):
     CONTENT_TYPES = [
         ('social_post', 'Social Media Post'),
@@ -58,6 +68,30 @@ class MarketingContent(models.Model):
     is_posted = models.BooleanField(default=False)
     scheduled_time = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Scheduled posting state, maintained by the dispatcher
+    posted_at = models.DateTimeField(null=True, blank=True)
+    publish_attempts = models.PositiveIntegerField(default=0)
+    next_publish_at = models.DateTimeField(null=True, blank=True)  # Claim lease or retry backoff
+    last_publish_error = models.TextField(blank=True)
+    # Set on content materialised from a growth plan; one row per planned day and platform
+    growth_plan = models.ForeignKey(GrowthPlan, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    plan_item = models.CharField(max_length=100, null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # Concurrent or retried materialisations must not save (and pay for) an item twice
+            models.UniqueConstraint(fields=['growth_plan', 'plan_item'], name='unique_growth_plan_item'),
+        ]
+        indexes = [
+            # Matches the keyset ordering of the per-business content list
+            models.Index(fields=['business', '-created_at', '-id'], name='content_business_created_idx'),
+            # Only the small set of approved, unposted rows the dispatcher polls
+            models.Index(
+                fields=['scheduled_time'],
+                condition=models.Q(is_approved=True, is_posted=False),
+                name='content_due_for_posting_idx'
+            ),
+        ]
 
 class ContentGenerationRequest(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -67,6 +101,105 @@ class ContentGenerationRequest(models.Model):
     
     class Meta:
         indexes = [
-            models.Index(fields=['ip_address', 'session_key']),
-            models.Index(fields=['created_at']),
-        ]
\ No newline at end of file
+            models.Index(fields=['ip_address', 'created_at']),  # Per-IP window lookups
+            models.Index(fields=['created_at']),  # Retention sweeps
+        ]
+
+class ContentGenerationDailyRollup(models.Model):
+    """Per-IP daily count of free tier generations, kept after the raw rows expire"""
+    day = models.DateField()
+    ip_address = models.GenericIPAddressField()
+    request_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'ip_address'], name='unique_daily_rollup_per_ip'),
+        ]
+
+class GeneratedContentCache(models.Model):
+    """Persistent tier of the generated content cache, shared by all workers"""
+    cache_key = models.CharField(max_length=64, primary_key=True)  # sha256 of prompt + params
+    content_type = models.CharField(max_length=50)
+    platform = models.CharField(max_length=50, blank=True)
+    response = models.JSONField(default=dict)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+
+class SimilarContentCache(models.Model):
+    """
+    Generated content reusable by look-alike businesses. Rows are grouped by
+    a bucket (exact match on content type, platform, business type, location
+    and instructions) and matched on the SimHash of the remaining context.
+    """
+    bucket = models.CharField(max_length=64)  # sha256 of the exact-match part of the context
+    fingerprint = models.BigIntegerField()  # 64-bit SimHash, stored signed
+    content_type = models.CharField(max_length=50)
+    platform = models.CharField(max_length=50, blank=True)
+    content = models.TextField()  # Business name replaced by a placeholder
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bucket', 'fingerprint'], name='unique_similar_content_fingerprint'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket', 'expires_at'], name='similar_content_bucket_idx'),
+            models.Index(fields=['expires_at']),
+        ]
+
+
+class GenerationJob(models.Model):
+    """Content generation request queued for a background worker"""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUSES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    KIND_CONTENT = 'content'
+    KIND_MATERIALIZE_PLAN = 'materialize_plan'
+    KINDS = [
+        (KIND_CONTENT, 'Content generation'),
+        (KIND_MATERIALIZE_PLAN, 'Growth plan materialisation'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    business = models.ForeignKey(BusinessProfile, on_delete=models.CASCADE, null=True, blank=True,
+                                 related_name='generation_jobs')  # Empty for free tier requests
+    kind = models.CharField(max_length=30, choices=KINDS, default=KIND_CONTENT)
+    request_data = models.JSONField(default=dict)  # Validated ContentGenerationRequestSerializer data
+    business_context = models.JSONField(default=dict)  # Snapshot of the prompt context at submission
+    status = models.CharField(max_length=20, choices=STATUSES, default=STATUS_QUEUED)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    content = models.ForeignKey(MarketingContent, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='+')
+    attempts = models.PositiveIntegerField(default=0)
+    worker_id = models.CharField(max_length=100, blank=True)
+    leased_until = models.DateTimeField(null=True, blank=True)  # Visibility timeout of a running job
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+
+class SingleFlightLock(models.Model):
+    """Lock row used to coalesce identical work across workers on backends without advisory locks"""
+    key = models.CharField(max_length=255, primary_key=True)
+    owner = models.CharField(max_length=32)  # Only the holder releases it
+    expires_at = models.DateTimeField()  # Lease; another worker may take the lock after this
+    created_at = models.DateTimeField(auto_now_add=True)
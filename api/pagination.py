@@ -0,0 +1,8 @@
+from rest_framework.pagination import CursorPagination
+
+
+class MarketingContentCursorPagination(CursorPagination):
+    """Keyset pagination over (created_at, id): no OFFSET scans and no COUNT(*) per page"""
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
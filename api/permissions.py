@@ -1,33 +1,39 @@
-from rest_framework import permissions
-from django.utils import timezone
-from datetime import timedelta
-from .models import ContentGenerationRequest
+from rest_framework import exceptions, permissions
+from django.conf import settings
+from .utils.audit_log import audit_log
+from .utils.rate_limit import SlidingWindowRateLimiter
 
 class FreeTierRateLimit(permissions.BasePermission):
     """
-    Allow 2 free content generations per IP/session, then require authentication
+    Allow FREE_TIER_LIMIT free content generations per IP every
+    FREE_TIER_WINDOW_HOURS, then require authentication
     """
+    limiter = None
+    
+    @classmethod
+    def get_limiter(cls):
+        if cls.limiter is None:
+            cls.limiter = SlidingWindowRateLimiter(
+                limit=settings.FREE_TIER_LIMIT,
+                window_seconds=settings.FREE_TIER_WINDOW_HOURS * 60 * 60,
+                cache_alias=settings.RATE_LIMIT_CACHE_ALIAS,
+                prefix='free-tier'
+            )
+        return cls.limiter
+    
     def has_permission(self, request, view):
         if request.user.is_authenticated:
             return True
-            
-        # Check free tier usage
-        ip = request.META.get('REMOTE_ADDR')
-        session_key = request.session.session_key
         
-        # Count requests in last 24 hours
-        yesterday = timezone.now() - timedelta(hours=24)
-        request_count = ContentGenerationRequest.objects.filter(
-            ip_address=ip,
-            created_at__gte=yesterday
-        ).count()
+        ip = request.META.get('REMOTE_ADDR')
+        allowed, retry_after = self.get_limiter().hit(ip)
+        if not allowed:
+            raise exceptions.Throttled(
+                wait=retry_after,
+                detail='Free tier limit reached. Sign in to keep generating content.'
+            )
         
-        if request_count >= 2:
-            return False
-            
-        # Log this request
-        ContentGenerationRequest.objects.create(
-            ip_address=ip,
-            session_key=session_key or ''
-        )
-        return True
\ No newline at end of file
+        # Read the session cookie directly rather than loading the session from the DB
+        session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME, '')
+        audit_log.record(ip, session_key)
+        return True
@@ -1,5 +1,6 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import BusinessProfile, GrowthPlan, MarketingContent
+from .models import BusinessProfile, GrowthPlan, MarketingContent, GenerationJob
 from users.models import CustomUser
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -35,7 +36,29 @@ class MarketingContentSerializer(serializers.ModelSerializer):
     class Meta:
         model = MarketingContent
         fields = '__all__'
-        read_only_fields = ('id', 'business', 'created_at')
+        read_only_fields = ('id', 'business', 'created_at', 'posted_at', 'publish_attempts', 'next_publish_at',
+                            'last_publish_error')
+
+class MarketingContentSummarySerializer(serializers.ModelSerializer):
+    """List projection without the full body; `preview` is annotated by the view"""
+    preview = serializers.CharField(read_only=True)
+    
+    class Meta:
+        model = MarketingContent
+        fields = ('id', 'business', 'content_type', 'platform', 'preview', 'is_approved', 'is_posted',
+                  'scheduled_time', 'created_at')
+        read_only_fields = fields
+
+class MarketingContentSearchResultSerializer(MarketingContentSummarySerializer):
+    rank = serializers.FloatField(read_only=True)
+    
+    class Meta(MarketingContentSummarySerializer.Meta):
+        fields = MarketingContentSummarySerializer.Meta.fields + ('rank',)
+        read_only_fields = fields
+
+class ContentSearchSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    limit = serializers.IntegerField(required=False, default=20, min_value=1, max_value=50)
 
 class ContentGenerationRequestSerializer(serializers.Serializer):
     content_type = serializers.ChoiceField(choices=[
@@ -43,4 +66,48 @@ class ContentGenerationRequestSerializer(serializers.Serializer):
     ])
     platform = serializers.CharField(required=False)
     theme = serializers.CharField(required=False, allow_blank=True)
-    tone = serializers.CharField(required=False, default='professional')
\ No newline at end of file
+    tone = serializers.CharField(required=False, default='professional')
+    regenerate = serializers.BooleanField(required=False, default=False)  # Bypass the response cache
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GenerationJob
+        fields = ('id', 'kind', 'status', 'result', 'error', 'content', 'attempts', 'created_at', 'finished_at')
+        read_only_fields = fields
+
+
+class BatchContentItemSerializer(ContentGenerationRequestSerializer):
+    variant = serializers.CharField(required=False, allow_blank=True, default='')  # Ad, video, campaign or email type
+
+
+class BatchContentGenerationSerializer(serializers.Serializer):
+    items = serializers.ListField(
+        child=BatchContentItemSerializer(),
+        min_length=1,
+        max_length=settings.CONTENT_BATCH_MAX_ITEMS
+    )
+    regenerate = serializers.BooleanField(required=False, default=False)
+
+
+class GrowthPlanMaterializeSerializer(serializers.Serializer):
+    start_date = serializers.DateField(required=False)  # Defaults to tomorrow
+
+
+class MarketingContentPatchSerializer(serializers.Serializer):
+    is_approved = serializers.BooleanField(required=False)
+    is_posted = serializers.BooleanField(required=False)
+    scheduled_time = serializers.DateTimeField(required=False, allow_null=True)
+    
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError('Provide at least one of is_approved, is_posted or scheduled_time.')
+        return attrs
+
+
+class MarketingContentBulkUpdateSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        min_length=1,
+        max_length=settings.CONTENT_BULK_UPDATE_MAX_IDS
+    )
+    patch = MarketingContentPatchSerializer()
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import BusinessProfile
+from .utils.profile_cache import invalidate_business_profile
+
+
+@receiver(post_save, sender=BusinessProfile)
+@receiver(post_delete, sender=BusinessProfile)
+def invalidate_cached_business_profile(sender, instance, **kwargs):
+    invalidate_business_profile(instance.user_id)
@@ -1,3 +1,1243 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.core.cache import cache
+from django.core.checks import Tags, run_checks
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from google.api_core import exceptions as google_exceptions
+from rest_framework.test import APIClient
+from users.models import CustomUser
+from .checks import check_request_budget, check_shared_caches
+from .models import (BusinessProfile, ContentGenerationDailyRollup, ContentGenerationRequest, GeneratedContentCache,
+                     GenerationJob, GrowthPlan, MarketingContent, SimilarContentCache, SingleFlightLock)
+from .permissions import FreeTierRateLimit
+from .utils import gemini_client, metrics, plan_materializer, profile_cache, publishers, retention
+from .utils.benchmark import delete_benchmark_users, summarize
+from .utils.call_policy import CallPolicy, LLMTimeout
+from .utils.circuit_breaker import CircuitBreaker
+from .utils.concurrency import bounded_map
+from .utils.dispatcher import dispatch_due_content
+from .utils.fake_gemini import FakeGenerativeModel
+from .utils.growth_plan import JSONObjectExtractor, parse_growth_plan
+from .utils.job_queue import claim_jobs, fail_exhausted_jobs, run_job
+from .utils.plan_materializer import materialize_growth_plan
+from .utils.prompt_templates import render_marketing_prompt
+from .utils.rate_limit import SlidingWindowRateLimiter
+from .utils.response_cache import response_cache
+from .utils.similar_cache import similar_cache
+from .utils.single_flight import SingleFlight, coalesce, db_lock
+from .utils.text_analyzer import TextAnalyzer, text_analyzer
 
-# Create your tests here.
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    model_name = 'models/stub'
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.prompts.append(prompt)
+        if stream:
+            return iter([StubResponse('Generated '), StubResponse('post')])
+        return StubResponse('Generated post')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class APITestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        response_cache.clear()
+        similar_cache.clear()
+        profile_cache._profiles.clear()
+
+        self.model = StubModel()
+        client = gemini_client.GeminiClient()
+        client.model = self.model
+        gemini_client.set_gemini_client(client)
+        self.addCleanup(gemini_client.set_gemini_client, None)
+
+        self.user = CustomUser.objects.create_user(email='owner@example.com', password='pass12345')
+        self.profile = BusinessProfile.objects.create(
+            user=self.user,
+            business_name='Mama Mboga',
+            business_type='food',
+            description='Fresh vegetables',
+            location='Nairobi'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class ResponseCacheTests(APITestCase):
+    PAYLOAD = {'content_type': 'social_post', 'platform': 'facebook'}
+
+    def test_identical_request_is_cached_and_regenerate_bypasses_it(self):
+        first = self.client.post('/api/content/generate/', self.PAYLOAD, format='json')
+        self.assertFalse(first.data.get('cached', False))
+        second = self.client.post('/api/content/generate/', self.PAYLOAD, format='json')
+        self.assertTrue(second.data['cached'])
+        self.assertEqual(second.data['content'], first.data['content'])
+        self.assertEqual(len(self.model.prompts), 1)
+
+        self.client.post('/api/content/generate/', dict(self.PAYLOAD, regenerate=True), format='json')
+        self.assertEqual(len(self.model.prompts), 2)
+
+    def test_persistent_tier_serves_workers_with_a_cold_memory_tier(self):
+        self.client.post('/api/content/generate/', self.PAYLOAD, format='json')
+        # As seen by another worker: nothing in memory, the row in the shared table
+        response_cache.clear()
+        response = self.client.post('/api/content/generate/', self.PAYLOAD, format='json')
+        self.assertTrue(response.data['cached'])
+        self.assertEqual(len(self.model.prompts), 1)
+        self.assertEqual(response_cache.stats()['db_hits'], 1)
+
+    def test_expired_entries_are_misses(self):
+        self.client.post('/api/content/generate/', self.PAYLOAD, format='json')
+        response_cache.clear()
+        similar_cache.clear()
+        expired = timezone.now() - timedelta(seconds=1)
+        GeneratedContentCache.objects.update(expires_at=expired)
+        SimilarContentCache.objects.update(expires_at=expired)
+        self.client.post('/api/content/generate/', self.PAYLOAD, format='json')
+        self.assertEqual(len(self.model.prompts), 2)
+
+    def test_purge_cache_deletes_only_expired_rows(self):
+        now = timezone.now()
+        for key, expires_at in [('old', now - timedelta(minutes=1)), ('live', now + timedelta(hours=1))]:
+            GeneratedContentCache.objects.create(cache_key=key, content_type='social_post', response={},
+                                                 expires_at=expires_at)
+        SimilarContentCache.objects.create(bucket='b', fingerprint=1, content_type='social_post', content='Old',
+                                           expires_at=now - timedelta(minutes=1))
+        out = StringIO()
+        call_command('purge_cache', stdout=out)
+        self.assertIn('Deleted 1 expired cached responses and 1 expired similar contents', out.getvalue())
+        self.assertFalse(SimilarContentCache.objects.exists())
+        self.assertEqual(list(GeneratedContentCache.objects.values_list('cache_key', flat=True)), ['live'])
+
+
+class StreamingGenerationTests(APITestCase):
+    PAYLOAD = {'content_type': 'social_post', 'platform': 'facebook'}
+
+    def stream(self, client=None):
+        response = (client or self.client).post('/api/content/generate/stream/', self.PAYLOAD, format='json')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = []
+        for block in b''.join(response.streaming_content).decode().split('\n\n'):
+            if not block:
+                continue
+            fields = dict(line.split(': ', 1) for line in block.split('\n'))
+            events.append((fields.get('event', 'message'), json.loads(fields['data'])))
+        return events
+
+    def test_chunks_are_sent_as_deltas_then_saved_once_done(self):
+        events = self.stream()
+        self.assertEqual(events[:2], [('message', {'delta': 'Generated '}), ('message', {'delta': 'post'})])
+        self.assertEqual(len(events), 3)
+        name, done = events[2]
+        self.assertEqual(name, 'done')
+        self.assertEqual((done['content'], done['type'], done['platform']), ('Generated post', 'social_post', 'facebook'))
+        content = MarketingContent.objects.get(id=done['content_id'])
+        self.assertEqual((content.business, content.content_text), (self.profile, 'Generated post'))
+
+    def test_cached_content_is_sent_without_calling_the_model(self):
+        self.stream()
+        events = self.stream()
+        self.assertEqual([name for name, _ in events], ['message', 'done'])
+        self.assertEqual(events[0][1], {'delta': 'Generated post'})
+        self.assertEqual(len(self.model.prompts), 1)
+
+    def test_generation_failure_ends_the_stream_with_an_error_event(self):
+        def broken(prompt, **kwargs):
+            raise RuntimeError('quota exceeded')
+
+        self.model.generate_content = broken
+        self.assertEqual(self.stream(), [
+            ('error', {'error': 'Failed to generate content', 'details': 'quota exceeded'})
+        ])
+        self.assertFalse(MarketingContent.objects.exists())
+
+    def test_anonymous_streams_are_rate_limited(self):
+        FreeTierRateLimit.limiter = None
+        self.addCleanup(setattr, FreeTierRateLimit, 'limiter', None)
+        anonymous = APIClient()
+        for _ in range(2):
+            self.assertEqual(self.stream(anonymous)[-1][0], 'done')
+        response = anonymous.post('/api/content/generate/stream/', self.PAYLOAD, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertFalse(MarketingContent.objects.exists())
+
+
+class BatchGenerationTests(APITestCase):
+    ITEMS = [{'content_type': 'social_post', 'platform': platform} for platform in ['facebook', 'instagram', 'whatsapp']]
+
+    def test_items_are_generated_in_order_and_saved_together(self):
+        response = self.client.post('/api/content/generate/batch/', {'items': self.ITEMS}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['succeeded'], response.data['failed']), (3, 0))
+        self.assertEqual([result['index'] for result in response.data['results']], [0, 1, 2])
+        self.assertEqual(
+            sorted(MarketingContent.objects.filter(business=self.profile).values_list('platform', flat=True)),
+            ['facebook', 'instagram', 'whatsapp']
+        )
+
+    def test_results_are_structured_in_one_analyzer_pass(self):
+        items = self.ITEMS + [{'content_type': 'email', 'variant': 'promotional'}]
+        with mock.patch.object(text_analyzer, 'analyze_many', wraps=text_analyzer.analyze_many) as analyze_many:
+            response = self.client.post('/api/content/generate/batch/', {'items': items}, format='json')
+        analyze_many.assert_called_once()
+        results = response.data['results']
+        self.assertEqual(results[1]['enhanced_content']['platform'], 'instagram')
+        self.assertEqual(results[3]['structured_email']['subject_line'], 'Special Offer: Generated post')
+
+    def test_one_failing_item_does_not_hide_the_others(self):
+        def generate_content(prompt, **kwargs):
+            if 'instagram' in prompt.lower():
+                raise ValueError('Prompt was blocked')
+            return StubResponse('Generated post')
+
+        self.model.generate_content = generate_content
+        response = self.client.post('/api/content/generate/batch/', {'items': self.ITEMS}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['success'] for result in response.data['results']], [True, False, True])
+        self.assertEqual(MarketingContent.objects.filter(business=self.profile).count(), 2)
+
+    def test_regenerate_is_honoured_per_item(self):
+        self.client.post('/api/content/generate/batch/', {'items': self.ITEMS}, format='json')
+        items = [dict(self.ITEMS[0], regenerate=True)] + self.ITEMS[1:]
+        response = self.client.post('/api/content/generate/batch/', {'items': items}, format='json')
+        self.assertEqual([result.get('cached', False) for result in response.data['results']], [False, True, True])
+        self.assertEqual(len(self.model.prompts), 4)
+
+    def test_bounded_map_caps_concurrency_and_keeps_order(self):
+        running, peak = [0], [0]
+        lock = threading.Lock()
+
+        def work(item):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            if item == 3:
+                raise ValueError(item)
+            return item * 2
+
+        outcomes = bounded_map(work, range(8), max_workers=2)
+        self.assertEqual([result for result, _ in outcomes], [0, 2, 4, None, 8, 10, 12, 14])
+        self.assertIsInstance(outcomes[3][1], ValueError)
+        self.assertLessEqual(peak[0], 2)
+
+
+class GenerationJobTests(APITestCase):
+    PAYLOAD = {'content_type': 'social_post', 'platform': 'facebook'}
+
+    def enqueue(self):
+        response = self.client.post('/api/content/generate/async/', self.PAYLOAD, format='json')
+        self.assertEqual(response.status_code, 202)
+        return response.data['job_id']
+
+    def test_queued_job_is_claimed_once_run_and_reported(self):
+        job_id = self.enqueue()
+        self.assertEqual(self.client.get(f'/api/content/jobs/{job_id}/').data['status'], 'queued')
+
+        jobs = claim_jobs('worker-1', 10)
+        self.assertEqual([str(job.id) for job in jobs], [job_id])
+        self.assertEqual(claim_jobs('worker-2', 10), [])
+        run_job(jobs[0])
+
+        response = self.client.get(f'/api/content/jobs/{job_id}/')
+        self.assertEqual(response.data['status'], 'succeeded')
+        self.assertEqual(response.data['result']['content'], 'Generated post')
+        self.assertTrue(MarketingContent.objects.filter(id=response.data['content']).exists())
+
+        other = CustomUser.objects.create_user(email='other@example.com', password='pass12345')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(f'/api/content/jobs/{job_id}/').status_code, 404)
+
+    def test_expired_lease_is_reclaimed_and_the_stale_worker_cannot_finish(self):
+        self.enqueue()
+        stale = claim_jobs('worker-1', 1)[0]
+        GenerationJob.objects.update(leased_until=timezone.now() - timedelta(seconds=1))
+        fresh = claim_jobs('worker-2', 1)[0]
+
+        run_job(stale)
+        self.assertEqual(GenerationJob.objects.get(id=fresh.id).status, GenerationJob.STATUS_RUNNING)
+        run_job(fresh)
+        job = GenerationJob.objects.get(id=fresh.id)
+        self.assertEqual((job.status, job.worker_id, job.attempts), (GenerationJob.STATUS_SUCCEEDED, 'worker-2', 2))
+        self.assertEqual(MarketingContent.objects.filter(business=self.profile).count(), 1)
+
+    @override_settings(GENERATION_JOB_MAX_ATTEMPTS=2)
+    def test_failed_job_is_requeued_until_attempts_run_out(self):
+        def reject(prompt, **kwargs):
+            raise ValueError('Prompt was blocked')
+
+        self.model.generate_content = reject
+        job_id = self.enqueue()
+        statuses = [run_job(claim_jobs('worker-1', 1)[0]).status for _ in range(2)]
+        self.assertEqual(statuses, [GenerationJob.STATUS_QUEUED, GenerationJob.STATUS_FAILED])
+        self.assertEqual(claim_jobs('worker-1', 1), [])
+        self.assertIn('Prompt was blocked', GenerationJob.objects.get(id=job_id).error)
+
+    @override_settings(GENERATION_JOB_MAX_ATTEMPTS=1)
+    def test_job_whose_last_lease_expired_is_failed(self):
+        self.enqueue()
+        claim_jobs('worker-1', 1)
+        GenerationJob.objects.update(leased_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(fail_exhausted_jobs(), 1)
+        self.assertEqual(GenerationJob.objects.get().status, GenerationJob.STATUS_FAILED)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def run_concurrently(self, group, fn, callers=5):
+        outcomes = []
+
+        def call():
+            try:
+                outcomes.append(group.do('key', fn))
+            except Exception as e:
+                outcomes.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def test_concurrent_callers_share_one_call(self):
+        calls = []
+        release = threading.Event()
+
+        def fn():
+            calls.append(1)
+            # Hold the call open until every caller has had time to join it
+            release.wait(5)
+            return 'result'
+
+        threading.Timer(0.1, release.set).start()
+        outcomes = self.run_concurrently(SingleFlight(), fn)
+        self.assertEqual(outcomes, ['result'] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_error_reaches_every_caller_and_the_next_call_runs_again(self):
+        group = SingleFlight()
+        release = threading.Event()
+
+        def fail():
+            release.wait(5)
+            raise ValueError('upstream failed')
+
+        threading.Timer(0.1, release.set).start()
+        outcomes = self.run_concurrently(group, fail, callers=3)
+        self.assertTrue(all(isinstance(outcome, ValueError) for outcome in outcomes))
+        self.assertEqual(group.do('key', lambda: 'retried'), 'retried')
+
+    def test_coalesce_returns_the_rechecked_result_without_calling(self):
+        fn = mock.Mock(return_value='fresh')
+        self.assertEqual(coalesce('key', fn, recheck=lambda: 'stored'), 'stored')
+        fn.assert_not_called()
+        self.assertEqual(coalesce('key', fn, recheck=lambda: None), 'fresh')
+
+
+@override_settings(SINGLE_FLIGHT_LEASE_SECONDS=60)
+class SingleFlightLockTests(TestCase):
+    def setUp(self):
+        # Row locks are used on backends other than PostgreSQL and SQLite
+        patcher = mock.patch.object(connection, 'vendor', 'mysql')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lock_row_is_committed_with_a_lease_and_released(self):
+        with db_lock('key'):
+            lock = SingleFlightLock.objects.get(key='key')
+            self.assertGreater(lock.expires_at, timezone.now() + timedelta(seconds=50))
+        self.assertFalse(SingleFlightLock.objects.exists())
+
+    def test_expired_lease_is_taken_over_and_not_released_by_its_old_holder(self):
+        with db_lock('key'):
+            # The holder hung past its lease
+            SingleFlightLock.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+            with db_lock('key'):
+                pass
+            SingleFlightLock.objects.create(key='key', owner='other', expires_at=timezone.now())
+        self.assertEqual(list(SingleFlightLock.objects.values_list('owner', flat=True)), ['other'])
+
+
+class RequestRetentionTests(TestCase):
+    def log(self, ip, days_ago, count=1):
+        created_at = timezone.now() - timedelta(days=days_ago)
+        for _ in range(count):
+            request = ContentGenerationRequest.objects.create(ip_address=ip)
+            ContentGenerationRequest.objects.filter(id=request.id).update(created_at=created_at)
+
+    def rollups(self):
+        return {(rollup.ip_address, rollup.request_count)
+                for rollup in ContentGenerationDailyRollup.objects.all()}
+
+    def test_expired_rows_are_rolled_up_per_day_and_ip_in_batches(self):
+        self.log('10.0.0.1', 40, count=3)
+        self.log('10.0.0.2', 40)
+        self.log('10.0.0.1', 1)
+
+        out = StringIO()
+        call_command('compact_generation_requests', '--retention-days', '30', '--batch-size', '2', stdout=out)
+        self.assertIn('Compacted 4 requests in 2 batches', out.getvalue())
+        self.assertEqual(self.rollups(), {('10.0.0.1', 3), ('10.0.0.2', 1)})
+        self.assertEqual(ContentGenerationRequest.objects.count(), 1)
+
+    def test_later_runs_add_to_existing_rollups_and_drop_old_ones(self):
+        self.log('10.0.0.1', 40)
+        call_command('compact_generation_requests', '--retention-days', '30', stdout=StringIO())
+        self.log('10.0.0.1', 40, count=2)
+        self.log('10.0.0.3', 400)
+        out = StringIO()
+        call_command('compact_generation_requests', '--retention-days', '30', '--rollup-retention-days', '365',
+                     stdout=out)
+        self.assertEqual(self.rollups(), {('10.0.0.1', 3)})
+        self.assertIn('deleted 1 expired rollups', out.getvalue())
+
+    def test_batches_skip_rows_claimed_by_a_concurrent_run(self):
+        self.log('10.0.0.1', 40, count=2)
+        select_for_update = ContentGenerationRequest.objects.select_for_update
+        with mock.patch.object(ContentGenerationRequest.objects, 'select_for_update',
+                               wraps=select_for_update) as locking:
+            self.assertEqual(retention.compact_generation_requests(retention_days=30)['compacted'], 2)
+        locking.assert_called_with(skip_locked=True)
+
+    def test_batch_is_retried_when_a_concurrent_run_creates_the_same_rollup(self):
+        with mock.patch.object(retention, '_roll_up_locked_batch', side_effect=[IntegrityError, 3]) as roll_up:
+            self.assertEqual(retention._roll_up_batch(10, timezone.now()), 3)
+        self.assertEqual(roll_up.call_count, 2)
+
+
+class FreeTierRateLimitTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        FreeTierRateLimit.limiter = None
+        self.addCleanup(setattr, FreeTierRateLimit, 'limiter', None)
+        self.anonymous = APIClient()
+
+    def test_anonymous_requests_over_the_limit_get_429_with_retry_after(self):
+        payload = {'content_type': 'social_post', 'platform': 'facebook'}
+        for _ in range(2):
+            self.assertEqual(self.anonymous.post('/api/content/generate/', payload, format='json').status_code, 200)
+        response = self.anonymous.post('/api/content/generate/', payload, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        # Signed-in users are not limited
+        self.assertEqual(self.client.post('/api/content/generate/', payload, format='json').status_code, 200)
+
+    def test_previous_window_is_weighted_by_its_overlap(self):
+        limiter = SlidingWindowRateLimiter(limit=4, window_seconds=100, prefix='test')
+        with mock.patch('api.utils.rate_limit.time.time', return_value=1000.0):
+            self.assertEqual([limiter.hit('ip')[0] for _ in range(5)], [True] * 4 + [False])
+        # A quarter into the next window, three quarters of the 4 earlier hits still count
+        with mock.patch('api.utils.rate_limit.time.time', return_value=1125.0):
+            self.assertTrue(limiter.hit('ip')[0])
+            allowed, retry_after = limiter.hit('ip')
+            # Rejected hits do not use up quota
+            self.assertEqual(limiter.cache.get('test:ip:11'), 1)
+        self.assertFalse(allowed)
+        self.assertEqual(retry_after, 25)
+
+    def test_local_memory_cache_fails_the_check_outside_debug(self):
+        with override_settings(LOCAL_CACHE_ALLOWED=False):
+            self.assertEqual([error.obj for error in check_shared_caches(None)],
+                             ['settings.RATE_LIMIT_CACHE_ALIAS', 'settings.BUSINESS_PROFILE_CACHE_ALIAS',
+                              'settings.AUTH_USER_CACHE_ALIAS'])
+            with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                                                       'LOCATION': 'redis://localhost:6379'}}):
+                self.assertEqual(check_shared_caches(None), [])
+        with override_settings(LOCAL_CACHE_ALLOWED=True):
+            self.assertEqual(check_shared_caches(None), [])
+
+    @override_settings(LOCAL_CACHE_ALLOWED=False)
+    def test_shared_cache_check_only_runs_with_deploy(self):
+        self.assertEqual(run_checks(tags=[Tags.caches]), [])
+        errors = run_checks(tags=[Tags.caches], include_deployment_checks=True)
+        self.assertIn('api.E001', {error.id for error in errors})
+
+
+class BusinessProfileCacheTests(APITestCase):
+    def test_content_list_reuses_cached_profile(self):
+        MarketingContent.objects.create(business=self.profile, content_type='social_post', content_text='Hi')
+        self.client.get('/api/content/')
+        # Only the keyset page SELECT remains once the profile is cached
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/content/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_generate_reads_profile_once_then_from_cache(self):
+        payload = {'content_type': 'social_post', 'platform': 'facebook'}
+        self.client.post('/api/content/generate/', payload, format='json')
+        # A cached response leaves only the MarketingContent INSERT
+        with self.assertNumQueries(1):
+            response = self.client.post('/api/content/generate/', payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(MarketingContent.objects.filter(business=self.profile).count(), 2)
+
+    def test_profile_save_invalidates_cache(self):
+        self.client.post('/api/content/generate/', {'content_type': 'social_post', 'platform': 'facebook'},
+                         format='json')
+        self.profile.business_name = 'Mama Mboga Deluxe'
+        self.profile.save()
+        # regenerate: a rename alone would be served from the near-duplicate cache
+        self.client.post('/api/content/generate/',
+                         {'content_type': 'social_post', 'platform': 'facebook', 'regenerate': True}, format='json')
+        self.assertIn('Mama Mboga Deluxe', self.model.prompts[-1])
+
+    def test_version_bump_from_another_worker_invalidates_local_copy(self):
+        self.assertEqual(profile_cache.get_business_profile(self.user).business_name, 'Mama Mboga')
+        # A change this worker never saw: no signal, so only the shared version can invalidate it
+        BusinessProfile.objects.filter(id=self.profile.id).update(business_name='Mama Mboga Deluxe')
+        self.assertEqual(profile_cache.get_business_profile(self.user).business_name, 'Mama Mboga')
+
+        cache.incr(profile_cache._version_key(self.user.pk))
+        self.assertEqual(profile_cache.get_business_profile(self.user).business_name, 'Mama Mboga Deluxe')
+
+
+class MarketingContentListTests(APITestCase):
+    def test_summary_list_returns_preview_and_detail_returns_body(self):
+        body = 'Fresh sukuma wiki every morning. ' * 20
+        content = MarketingContent.objects.create(business=self.profile, content_type='social_post', content_text=body)
+
+        response = self.client.get('/api/content/', {'view': 'summary'})
+        self.assertEqual(response.status_code, 200)
+        row = response.data['results'][0]
+        self.assertNotIn('content_text', row)
+        self.assertEqual(row['preview'], body[:160])
+        self.assertIn('next', response.data)
+
+        response = self.client.get(f'/api/content/{content.id}/')
+        self.assertEqual(response.data['content_text'], body)
+
+    def test_create_attaches_callers_business(self):
+        response = self.client.post('/api/content/', {'content_type': 'social_post', 'platform': 'facebook',
+                                                      'content_text': 'Hand-written post'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(str(response.data['business']), str(self.profile.id))
+        self.assertTrue(MarketingContent.objects.filter(business=self.profile, content_text='Hand-written post').exists())
+
+
+class MarketingContentSearchTests(APITestCase):
+    def test_search_is_ranked_and_scoped_to_business(self):
+        other_user = CustomUser.objects.create_user(email='other@example.com', password='pass12345')
+        other = BusinessProfile.objects.create(user=other_user, business_name='Other', business_type='retail',
+                                               description='Shop', location='Mombasa')
+        MarketingContent.objects.create(business=other, content_type='social_post',
+                                        content_text='Easter promo on eggs')
+        weak = MarketingContent.objects.create(business=self.profile, content_type='social_post',
+                                               content_text='Fresh greens for the holidays, Easter included')
+        strong = MarketingContent.objects.create(business=self.profile, content_type='social_post',
+                                                 content_text='Easter promo: buy two bunches, get one free',
+                                                 metadata={'theme': 'Easter promo', 'tone': 'friendly'})
+
+        response = self.client.get('/api/content/search/', {'q': 'easter promo'})
+        ids = [row['id'] for row in response.data['results']]
+        self.assertEqual(ids, [str(strong.id)])
+
+        response = self.client.get('/api/content/search/', {'q': 'easter'})
+        ids = [row['id'] for row in response.data['results']]
+        self.assertEqual(ids, [str(strong.id), str(weak.id)])
+
+        strong.delete()
+        response = self.client.get('/api/content/search/', {'q': 'promo'})
+        self.assertEqual(response.data['results'], [])
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite FTS5 index')
+    def test_index_survives_renumbered_rowids(self):
+        content = MarketingContent.objects.create(business=self.profile, content_type='social_post',
+                                                  content_text='Easter promo on mangoes')
+        # What VACUUM or a table rebuild may do
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE api_marketingcontent SET rowid = rowid + 1000')
+        response = self.client.get('/api/content/search/', {'q': 'mangoes'})
+        self.assertEqual([row['id'] for row in response.data['results']], [str(content.id)])
+
+        content.content_text = 'Easter promo on avocados'
+        content.save()
+        self.assertEqual(self.client.get('/api/content/search/', {'q': 'mangoes'}).data['results'], [])
+
+    def test_content_deleted_after_ranking_is_skipped(self):
+        kept = MarketingContent.objects.create(business=self.profile, content_type='social_post',
+                                               content_text='Easter promo on mangoes')
+        gone = MarketingContent.objects.create(business=self.profile, content_type='social_post',
+                                               content_text='Easter promo on sukuma')
+        with mock.patch('api.views.search_marketing_content', return_value=[(gone.id, 2.0), (kept.id, 1.0)]):
+            gone.delete()
+            response = self.client.get('/api/content/search/', {'q': 'easter'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['results']], [str(kept.id)])
+
+
+class BulkUpdateContentTests(APITestCase):
+    def test_bulk_update_is_one_scoped_update(self):
+        mine = [
+            MarketingContent.objects.create(business=self.profile, content_type='social_post', content_text='Hi')
+            for _ in range(3)
+        ]
+        ids = [str(content.id) for content in mine]
+        with self.assertNumQueries(1):
+            response = self.client.patch('/api/content/bulk/', {'ids': ids, 'patch': {'is_approved': True}},
+                                         format='json')
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(MarketingContent.objects.filter(is_approved=True).count(), 3)
+
+    def test_bulk_update_reports_foreign_ids_as_not_found(self):
+        other_user = CustomUser.objects.create_user(email='other@example.com', password='pass12345')
+        other = BusinessProfile.objects.create(user=other_user, business_name='Other', business_type='retail',
+                                               description='Shop', location='Mombasa')
+        theirs = MarketingContent.objects.create(business=other, content_type='social_post', content_text='Hi')
+        mine = MarketingContent.objects.create(business=self.profile, content_type='social_post', content_text='Hi')
+
+        response = self.client.patch('/api/content/bulk/', {
+            'ids': [str(mine.id), str(theirs.id)],
+            'patch': {'is_posted': True}
+        }, format='json')
+        self.assertEqual(response.data['results'], [
+            {'id': str(mine.id), 'status': 'updated'},
+            {'id': str(theirs.id), 'status': 'not_found'},
+        ])
+        theirs.refresh_from_db()
+        self.assertFalse(theirs.is_posted)
+
+    def test_bulk_update_sets_publishing_state_in_the_same_update(self):
+        earlier = timezone.now() - timedelta(days=1)
+        posted = MarketingContent.objects.create(business=self.profile, content_type='social_post', content_text='Hi',
+                                                 is_posted=True, posted_at=earlier)
+        failing = MarketingContent.objects.create(business=self.profile, content_type='social_post', content_text='Hi',
+                                                  publish_attempts=5, next_publish_at=earlier,
+                                                  last_publish_error='ConnectionError: timed out')
+        ids = [str(posted.id), str(failing.id)]
+        tomorrow = timezone.now() + timedelta(days=1)
+        with self.assertNumQueries(1):
+            self.client.patch('/api/content/bulk/', {'ids': ids, 'patch': {
+                'is_posted': True, 'scheduled_time': tomorrow.isoformat()
+            }}, format='json')
+
+        posted.refresh_from_db()
+        failing.refresh_from_db()
+        self.assertEqual(posted.posted_at, earlier)
+        self.assertIsNotNone(failing.posted_at)
+        self.assertEqual((failing.publish_attempts, failing.next_publish_at, failing.last_publish_error), (0, None, ''))
+
+        self.client.patch('/api/content/bulk/', {'ids': ids, 'patch': {'is_posted': False}}, format='json')
+        self.assertEqual(set(MarketingContent.objects.values_list('posted_at', flat=True)), {None})
+
+
+class FlakyPublisher(publishers.BasePublisher):
+    failures = 1
+    published = []
+
+    def publish(self, content):
+        if FlakyPublisher.failures:
+            FlakyPublisher.failures -= 1
+            raise publishers.PublishError('Platform unavailable')
+        FlakyPublisher.published.append(content.id)
+
+
+class PlanMaterializerTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.plan = GrowthPlan.objects.create(business=self.profile, messaging_tone='friendly',
+                                              target_platforms=['facebook'])
+
+    def test_rerun_is_idempotent_and_next_week_is_new(self):
+        monday = date(2026, 1, 5)
+        self.assertEqual(materialize_growth_plan(self.plan, monday)['created'], 7)
+        summary = materialize_growth_plan(self.plan, monday)
+        self.assertEqual((summary['created'], summary['skipped']), (0, 7))
+
+        self.assertEqual(materialize_growth_plan(self.plan, monday + timedelta(days=7))['created'], 7)
+        self.assertEqual(MarketingContent.objects.filter(business=self.profile).count(), 14)
+
+    def test_failed_items_are_reported_and_generated_on_rerun(self):
+        self.plan.target_platforms = ['facebook', 'instagram']
+        self.plan.save()
+        generate_content = self.model.generate_content
+
+        def flaky(prompt, **kwargs):
+            if 'instagram' in prompt.lower():
+                raise ValueError('Prompt was blocked')
+            return generate_content(prompt, **kwargs)
+
+        self.model.generate_content = flaky
+        summary = materialize_growth_plan(self.plan, date(2026, 1, 5))
+        self.assertEqual((summary['created'], summary['failed']), (7, 7))
+        self.assertTrue(all(error['plan_item'].endswith(':instagram') for error in summary['errors']))
+
+        self.model.generate_content = generate_content
+        summary = materialize_growth_plan(self.plan, date(2026, 1, 5))
+        self.assertEqual((summary['created'], summary['skipped'], summary['failed']), (7, 7, 0))
+
+    def test_endpoint_queues_one_job_per_week_and_the_worker_runs_it(self):
+        payload = {'start_date': '2026-01-05'}
+        first = self.client.post('/api/business/growth-plan/materialize/', payload, format='json')
+        self.assertEqual(first.status_code, 202)
+        # A double click or client retry gets the same job
+        second = self.client.post('/api/business/growth-plan/materialize/', payload, format='json')
+        self.assertEqual(second.data['job_id'], first.data['job_id'])
+        self.assertEqual(MarketingContent.objects.count(), 0)
+
+        run_job(claim_jobs('worker-1', 1)[0])
+        job = self.client.get(f"/api/content/jobs/{first.data['job_id']}/").data
+        self.assertEqual((job['kind'], job['status']), ('materialize_plan', 'succeeded'))
+        self.assertEqual(job['result']['created'], 7)
+        self.assertEqual(MarketingContent.objects.filter(growth_plan=self.plan).count(), 7)
+
+    def test_item_saved_by_a_concurrent_run_is_not_duplicated(self):
+        monday = date(2026, 1, 5)
+        materialize_growth_plan(self.plan, monday)
+        saved = MarketingContent.objects.filter(growth_plan=self.plan).order_by('scheduled_time').first()
+        saved.delete()
+        # The other run saves the item after this one found it missing but before it is flushed
+        build = plan_materializer.build_marketing_content
+
+        def racing(business, spec, text, **metadata):
+            MarketingContent.objects.create(business=business, content_type='social_post',
+                                            content_text='From the other run', growth_plan=self.plan,
+                                            plan_item=spec['plan_item'])
+            return build(business, spec, text, **metadata)
+
+        response_cache.clear()
+        similar_cache.clear()
+        with mock.patch.object(plan_materializer, 'build_marketing_content', racing):
+            summary = materialize_growth_plan(self.plan, monday)
+        self.assertEqual((summary['created'], summary['skipped']), (0, 7))
+        self.assertEqual(MarketingContent.objects.filter(plan_item=saved.plan_item).get().content_text,
+                         'From the other run')
+
+    def test_daily_actions_are_matched_by_weekday(self):
+        self.plan.weekly_plan = {'weekly_themes': ['Freshness'], 'platforms': ['facebook'], 'daily_actions': [
+            {'day': 'wednesday', 'theme': 'Sukuma wiki deal', 'platform': 'instagram', 'posting_time': '6:30 PM'},
+            {'day': 'monday', 'theme': 'New stock', 'platform': 'whatsapp', 'posting_time': '07:15'},
+        ]}
+        self.plan.save()
+        materialize_growth_plan(self.plan, date(2026, 1, 5))
+
+        contents = MarketingContent.objects.filter(business=self.profile)
+        self.assertEqual(contents.count(), 7)
+        monday = contents.get(scheduled_time__date=date(2026, 1, 5))
+        self.assertEqual(monday.metadata['keywords'], ['generated', 'post'])
+        self.assertEqual((monday.platform, monday.content_type), ('whatsapp', 'whatsapp'))
+        self.assertEqual(timezone.localtime(monday.scheduled_time).strftime('%H:%M'), '07:15')
+        wednesday = contents.get(scheduled_time__date=date(2026, 1, 7))
+        self.assertEqual(wednesday.platform, 'instagram')
+        self.assertEqual(timezone.localtime(wednesday.scheduled_time).strftime('%H:%M'), '18:30')
+        self.assertTrue(any('Sukuma wiki deal' in prompt for prompt in self.model.prompts))
+        self.assertEqual(contents.get(scheduled_time__date=date(2026, 1, 6)).platform, 'facebook')
+
+
+@override_settings(CONTENT_PUBLISHERS={'default': 'api.tests.FlakyPublisher'})
+class ScheduledDispatchTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        publishers.reset_publishers()
+        self.addCleanup(publishers.reset_publishers)
+        FlakyPublisher.failures = 1
+        FlakyPublisher.published = []
+
+    def test_due_approved_content_is_retried_then_posted(self):
+        past = timezone.now() - timedelta(minutes=1)
+        due = MarketingContent.objects.create(business=self.profile, content_type='social_post',
+                                              content_text='Hi', is_approved=True, scheduled_time=past)
+        MarketingContent.objects.create(business=self.profile, content_type='social_post', content_text='Draft',
+                                        scheduled_time=past)
+        MarketingContent.objects.create(business=self.profile, content_type='social_post', content_text='Later',
+                                        is_approved=True, scheduled_time=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(dispatch_due_content(), {'claimed': 1, 'posted': 0, 'failed': 1})
+        due.refresh_from_db()
+        self.assertFalse(due.is_posted)
+        self.assertIn('Platform unavailable', due.last_publish_error)
+
+        # Backing off: nothing is claimed until the retry time passes
+        self.assertEqual(dispatch_due_content()['claimed'], 0)
+        MarketingContent.objects.filter(id=due.id).update(next_publish_at=past)
+
+        self.assertEqual(dispatch_due_content(), {'claimed': 1, 'posted': 1, 'failed': 0})
+        due.refresh_from_db()
+        self.assertTrue(due.is_posted)
+        self.assertEqual(due.publish_attempts, 2)
+        self.assertEqual(FlakyPublisher.published, [due.id])
+
+
+class LLMMetricsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+
+    def test_calls_and_cache_lookups_are_exported(self):
+        payload = {'content_type': 'social_post', 'platform': 'Facebook'}
+        self.client.post('/api/content/generate/', payload, format='json')
+        self.client.post('/api/content/generate/', payload, format='json')
+
+        body = self.client.get('/metrics').content.decode()
+        labels = 'operation="generate",content_type="social_post",platform="facebook"'
+        self.assertIn(f'penyeza_llm_requests_total{{{labels},outcome="success"}} 1', body)
+        self.assertIn(f'penyeza_llm_latency_seconds_count{{{labels}}} 1', body)
+        self.assertIn(f'penyeza_llm_response_chars_total{{{labels}}} 14', body)
+        self.assertIn('penyeza_llm_cache_hit_ratio{content_type="social_post",platform="facebook"} 0.5000', body)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_scrape_requires_token_when_configured(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_without_a_token_only_staff_and_internal_addresses_can_scrape(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+        outside = {'REMOTE_ADDR': '203.0.113.9'}
+        self.assertEqual(self.client.get('/metrics', **outside).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/metrics', **outside).status_code, 200)
+
+    def test_worker_snapshots_are_summed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            registry = metrics.MetricsRegistry(directory)
+            calls = registry.counter('calls_total', 'Calls', ('platform',))
+            calls.inc(2, platform='facebook')
+            # Another live worker's snapshot
+            worker = os.getppid()
+            with open(os.path.join(directory, f'{worker}-{metrics._process_start(worker)}.json'), 'w') as snapshot:
+                json.dump({'calls_total': {'["facebook"]': 3}}, snapshot)
+            self.assertIn('calls_total{platform="facebook"} 5', registry.render())
+
+    def test_snapshots_of_exited_workers_are_pruned(self):
+        exited = subprocess.Popen(['true'])
+        exited.wait()
+        with tempfile.TemporaryDirectory() as directory:
+            registry = metrics.MetricsRegistry(directory)
+            registry.counter('calls_total', 'Calls', ('platform',)).inc(platform='facebook')
+            # An exited worker, and an earlier process that had this one's pid
+            for name in (f'{exited.pid}-1.json', f'{os.getpid()}-1.json'):
+                with open(os.path.join(directory, name), 'w') as snapshot:
+                    json.dump({'calls_total': {'["facebook"]': 3}}, snapshot)
+            self.assertIn('calls_total{platform="facebook"} 1', registry.render())
+            self.assertEqual(len(os.listdir(directory)), 1)
+
+    def test_updates_reach_the_snapshot_when_the_worker_goes_idle(self):
+        with tempfile.TemporaryDirectory() as directory:
+            registry = metrics.MetricsRegistry(directory, flush_interval=0.05)
+            calls = registry.counter('calls_total', 'Calls', ('platform',))
+            calls.inc(platform='facebook')
+            calls.inc(platform='facebook')
+            time.sleep(0.3)
+            with open(registry._snapshot_path()) as snapshot:
+                self.assertEqual(json.load(snapshot), {'calls_total': {'["facebook"]': 2}})
+
+
+class SimilarContentCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.model.generate_content = lambda prompt, **kwargs: (
+            self.model.prompts.append(prompt) or StubResponse('Shop at Mama Mboga for the freshest greens!')
+        )
+
+    def generate_as(self, business_name, description):
+        user = CustomUser.objects.create_user(email=f'{business_name.split()[0]}@example.com', password='pass12345')
+        BusinessProfile.objects.create(user=user, business_name=business_name, business_type='food',
+                                       description=description, location='Nairobi')
+        self.client.force_authenticate(user)
+        return self.client.post('/api/content/generate/', {'content_type': 'social_post', 'platform': 'Facebook'},
+                                format='json')
+
+    def test_near_duplicate_context_reuses_personalised_content(self):
+        self.client.post('/api/content/generate/', {'content_type': 'social_post', 'platform': 'Facebook'},
+                         format='json')
+        self.assertEqual(len(self.model.prompts), 1)
+
+        response = self.generate_as('Green Grocers', 'Fresh vegetables!')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.model.prompts), 1)
+        self.assertEqual(response.data['content'], 'Shop at Green Grocers for the freshest greens!')
+
+    def test_different_description_is_generated(self):
+        self.client.post('/api/content/generate/', {'content_type': 'social_post', 'platform': 'Facebook'},
+                         format='json')
+        self.generate_as('Kicks Kenya', 'Handmade leather shoes and bags')
+        self.assertEqual(len(self.model.prompts), 2)
+
+    def test_only_the_caller_that_generated_content_stores_it(self):
+        client = gemini_client.get_gemini_client()
+        context = {'business_name': 'Mama Mboga', 'business_type': 'food'}
+        leader_result = {'success': True, 'content': 'Fresh greens', 'type': 'social_post', 'platform': 'facebook',
+                         'cached': False}
+        with mock.patch.object(similar_cache, 'add') as add:
+            # A follower gets the leader's result from coalesce without running the call itself
+            with mock.patch.object(gemini_client, 'coalesce', return_value=leader_result):
+                result = client.generate_marketing_content(context, 'social_post', 'facebook')
+            self.assertTrue(result['coalesced'])
+            add.assert_not_called()
+            client.generate_marketing_content(context, 'social_post', 'facebook')
+            add.assert_called_once()
+
+    def test_bucket_is_loaded_without_holding_the_lock(self):
+        held = []
+        filter_rows = SimilarContentCache.objects.filter
+
+        def tracking_filter(*args, **kwargs):
+            held.append(similar_cache._lock.locked())
+            return filter_rows(*args, **kwargs)
+
+        with mock.patch.object(SimilarContentCache.objects, 'filter', side_effect=tracking_filter):
+            self.assertIsNone(similar_cache.get({'business_type': 'food'}, 'social_post', 'facebook'))
+        self.assertEqual(held, [False])
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_QUERY_BUDGET=0)
+class ProfilingMiddlewareTests(APITestCase):
+    def test_sampled_request_reports_queries_and_llm_time(self):
+        with self.assertLogs('api.profiling', 'WARNING') as logs:
+            response = self.client.post('/api/content/generate/', {'content_type': 'social_post'}, format='json')
+
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn('desc="1 calls"', timing)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'generate-content')
+        self.assertEqual(record['llm_calls'], 1)
+        self.assertIn('queries', record['over_budget'])
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_unsampled_request_is_untouched(self):
+        response = self.client.get('/api/content/')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class PromptTemplateTests(SimpleTestCase):
+    def test_context_is_rendered_compactly_and_trimmed_to_budget(self):
+        prompt = render_marketing_prompt({
+            'business_name': 'Mama Mboga',
+            'description': 'Fresh vegetables daily. ' * 500,
+            'target_audience': {'age': '25-40', 'interests': ['cooking', 'health']},
+            'ad_type': 'Focus on discounts.',
+        }, 'ad_copy', 'facebook')
+
+        self.assertIn('Target Audience: age: 25-40; interests: cooking, health', prompt.text)
+        self.assertIn('TASK: Create AD COPY for FACEBOOK', prompt.text)
+        self.assertIn('Focus on discounts.', prompt.text)
+        self.assertNotIn('  ', prompt.text)
+        self.assertEqual(prompt.trimmed_fields, ['description'])
+        self.assertLessEqual(prompt.estimated_tokens, 600)
+
+
+class CircuitBreakerTests(APITestCase):
+    def test_open_breaker_serves_degraded_fallback_then_recovers(self):
+        now = [0.0]
+        breaker = CircuitBreaker(min_calls=2, open_seconds=30, half_open_probes=1, clock=lambda: now[0])
+        gemini_client.get_gemini_client().breaker = breaker
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        payload = {'content_type': 'whatsapp', 'platform': 'whatsapp', 'regenerate': True}
+        response = self.client.post('/api/content/generate/', payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['degraded'])
+        self.assertIn('Mama Mboga', response.data['content'])
+        self.assertEqual(self.model.prompts, [])
+        content = MarketingContent.objects.get(id=response.data['content_id'])
+        self.assertTrue(content.metadata['degraded'])
+
+        # After open_seconds one probe goes upstream and its success closes the breaker
+        now[0] = 31
+        response = self.client.post('/api/content/generate/', payload, format='json')
+        self.assertNotIn('degraded', response.data)
+        self.assertEqual(len(self.model.prompts), 1)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_slow_calls_open_the_breaker(self):
+        breaker = CircuitBreaker(min_calls=3, slow_call_seconds=1, slow_call_ratio=0.6)
+        breaker.record_success(0.1)
+        breaker.record_success(2)
+        self.assertTrue(breaker.allow())
+        breaker.record_success(3)
+        self.assertFalse(breaker.allow())
+
+    def test_only_admitted_probes_count_while_half_open(self):
+        now = [0.0]
+        breaker = CircuitBreaker(min_calls=1, open_seconds=30, half_open_probes=1, clock=lambda: now[0])
+        before_opening = breaker.allow()
+        breaker.record_failure(breaker.allow())
+        now[0] = 31
+        stale_probe = breaker.allow()
+        # A call let through while closed finishes during the half-open period
+        breaker.record_success(0.1, before_opening)
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertIsNone(breaker.allow())
+        breaker.record_failure(stale_probe)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        # A probe from the previous half-open period no longer frees a slot
+        now[0] = 62
+        probe = breaker.allow()
+        breaker.record_ignored(stale_probe)
+        self.assertIsNone(breaker.allow())
+        breaker.record_success(0.1, probe)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+class FakeGeminiBackendTests(SimpleTestCase):
+    def outcomes(self, model, prompts):
+        results = []
+        for prompt in prompts:
+            try:
+                results.append(model.generate_content(prompt).text)
+            except google_exceptions.ServiceUnavailable:
+                results.append(None)
+        return results
+
+    def test_outcomes_are_reproducible_for_a_seed(self):
+        prompts = [f'prompt {index % 5}' for index in range(40)]
+        first = self.outcomes(FakeGenerativeModel(failure_rate=0.3, seed=7), prompts)
+        second = self.outcomes(FakeGenerativeModel(failure_rate=0.3, seed=7), prompts)
+        self.assertEqual(first, second)
+        self.assertIn(None, first)
+        self.assertTrue(any(first))
+
+    def test_streamed_chunks_reassemble_the_response(self):
+        model = FakeGenerativeModel(chunk_size=10)
+        text = model.generate_content('hello').text
+        self.assertEqual(''.join(chunk.text for chunk in model.generate_content('hello', stream=True)), text)
+
+    def test_growth_plan_prompts_get_json(self):
+        plan = json.loads(FakeGenerativeModel().generate_content('a weekly marketing growth plan').text)
+        self.assertEqual(len(plan['daily_actions']), 7)
+
+
+@override_settings(GEMINI_BACKEND='fake', GEMINI_FAKE=dict(settings.GEMINI_FAKE, latency_ms=0))
+class SharedGeminiClientTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        gemini_client.set_gemini_client(None)
+
+    def test_requests_share_one_client(self):
+        payload = {'content_type': 'social_post', 'platform': 'facebook', 'regenerate': True}
+        with mock.patch.object(gemini_client, 'GeminiClient', wraps=gemini_client.GeminiClient) as client_class:
+            for _ in range(3):
+                self.assertEqual(self.client.post('/api/content/generate/', payload, format='json').status_code, 200)
+        self.assertEqual(client_class.call_count, 1)
+        self.assertIs(gemini_client.get_gemini_client(), gemini_client.get_gemini_client())
+
+    def test_a_new_process_gets_its_own_client(self):
+        parent = gemini_client.get_gemini_client()
+        with mock.patch.object(gemini_client.os, 'getpid', return_value=os.getpid() + 1):
+            child = gemini_client.get_gemini_client()
+            self.assertIsNot(child, parent)
+            self.assertIs(gemini_client.get_gemini_client(), child)
+
+    @skipUnless(hasattr(os, 'register_at_fork'), 'needs os.register_at_fork')
+    def test_client_is_rebuilt_after_fork(self):
+        parent = gemini_client.get_gemini_client()
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.write(write_end, b'rebuilt' if gemini_client.get_gemini_client() is not parent else b'shared')
+            finally:
+                os._exit(0)
+        os.close(write_end)
+        os.waitpid(pid, 0)
+        with os.fdopen(read_end, 'rb') as result:
+            self.assertEqual(result.read(), b'rebuilt')
+        self.assertIs(gemini_client.get_gemini_client(), parent)
+
+
+class GrowthPlanTests(APITestCase):
+    PLAN = {
+        'weekly_themes': ['Freshness'],
+        'daily_actions': [{'day': day, 'theme': 'Freshness', 'platform': 'Facebook', 'action': 'Post'}
+                          for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']],
+        'platforms': ['Facebook'],
+    }
+
+    def test_extractor_finds_object_in_fenced_streamed_text(self):
+        text = 'Sure {as promised}! Here it is:\n```json\n' + json.dumps(self.PLAN) + '\n```\nEnjoy {"x": 1}'
+        extractor = JSONObjectExtractor()
+        results = [extractor.feed(text[start:start + 7]) for start in range(0, len(text), 7)]
+        self.assertEqual(results[-1], self.PLAN)
+        self.assertIsNone(results[0])
+
+    def test_plan_is_validated_and_normalised(self):
+        plan, errors = parse_growth_plan(json.dumps(dict(self.PLAN, daily_actions=self.PLAN['daily_actions'][:6])))
+        self.assertEqual(errors, ['$.daily_actions has no entry for sunday'])
+        plan, errors = parse_growth_plan(json.dumps(self.PLAN)[:-1] + ',}')
+        self.assertEqual(errors, [])
+        self.assertEqual(plan['platforms'], ['facebook'])
+
+    def test_invalid_plan_gets_one_repair_call(self):
+        replies = iter([
+            '```json\n' + json.dumps(dict(self.PLAN, platforms='facebook')) + '\n```',
+            json.dumps(self.PLAN),
+        ])
+        self.model.generate_content = lambda prompt, **kwargs: (
+            self.model.prompts.append(prompt) or StubResponse(next(replies))
+        )
+        response = self.client.get('/api/business/growth-plan/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.model.prompts), 2)
+        self.assertIn('$.platforms must be an array', self.model.prompts[1])
+        self.assertEqual(GrowthPlan.objects.get(business=self.profile).weekly_plan['platforms'], ['facebook'])
+
+    def test_model_without_json_mode_gets_plain_prompts(self):
+        configs = []
+
+        def generate_content(prompt, **kwargs):
+            configs.append(kwargs.get('generation_config'))
+            if 'generation_config' in kwargs:
+                raise google_exceptions.InvalidArgument('response_schema is not supported')
+            return StubResponse(json.dumps(self.PLAN))
+
+        self.model.generate_content = generate_content
+        self.assertEqual(self.client.get('/api/business/growth-plan/').status_code, 200)
+        self.assertIsNotNone(configs[0])
+        self.assertEqual(configs[1:], [None])
+        self.assertFalse(GrowthPlan.objects.get(business=self.profile).weekly_plan.get('degraded', False))
+
+        # The next plan tries JSON mode again
+        GrowthPlan.objects.all().delete()
+        self.assertEqual(self.client.get('/api/business/growth-plan/').status_code, 200)
+        self.assertIsNotNone(configs[2])
+        self.assertEqual(configs[3:], [None])
+
+    def test_other_invalid_arguments_do_not_disable_json_mode(self):
+        configs = []
+
+        def generate_content(prompt, **kwargs):
+            configs.append(kwargs.get('generation_config'))
+            raise google_exceptions.InvalidArgument('prompt is too long')
+
+        self.model.generate_content = generate_content
+        self.client.get('/api/business/growth-plan/')
+        self.assertEqual(len(configs), 1)
+        self.assertIsNotNone(configs[0])
+
+
+class TextAnalyzerTests(SimpleTestCase):
+    TEXT = ("Fresh Mangoes This Week\nOur mangoes are sweet. Mangoes arrive daily!\n\n"
+            "Order fresh mangoes and avocados today #Nairobi #FreshFood #Nairobi")
+
+    def test_single_pass_extracts_structure(self):
+        analysis = TextAnalyzer().analyze(self.TEXT)
+        self.assertEqual(analysis.headline, 'Fresh Mangoes This Week')
+        self.assertEqual(analysis.hashtags, ['#Nairobi', '#FreshFood'])
+        self.assertEqual(analysis.keywords[:3], ['mangoes', 'fresh', 'week'])
+        self.assertNotIn('today', TextAnalyzer(stopwords={'today'}).analyze(self.TEXT).keywords)
+        self.assertEqual(analysis.sentences[1], 'Mangoes arrive daily!')
+        self.assertEqual(len(analysis.paragraphs), 2)
+
+    def test_batch_matches_single_analysis(self):
+        analyzer = TextAnalyzer()
+        texts = [self.TEXT, 'Visit us.', self.TEXT]
+        self.assertEqual(analyzer.analyze_many(texts), [analyzer.analyze(text) for text in texts])
+
+
+class BenchmarkSummaryTests(SimpleTestCase):
+    def test_percentiles_and_queries_per_request(self):
+        samples = [
+            {'latency': index / 1000, 'status': 200, 'error': False, 'queries': 2 if index % 2 else None}
+            for index in range(1, 101)
+        ]
+        samples[0].update(status=500, error=True)
+        summary = summarize(samples, elapsed=2)
+        self.assertEqual(summary['throughput_rps'], 50)
+        self.assertEqual((summary['p50_ms'], summary['p95_ms'], summary['p99_ms']), (50, 95, 99))
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['queries_per_request'], 2)
+        self.assertEqual(summary['status_codes'], {'200': 99, '500': 1})
+
+
+class BenchmarkCleanupTests(APITestCase):
+    def test_only_the_runs_own_users_are_deleted(self):
+        other = CustomUser.objects.create_user(email='bench-000000000000@example.com', password='pass12345')
+        bench = CustomUser.objects.create_user(email='bench-0123456789ab@example.com', password='pass12345')
+        BusinessProfile.objects.create(user=bench, business_name='Bench Shop 0', business_type='retail',
+                                       description='Household goods', location='Nairobi')
+        GeneratedContentCache.objects.create(cache_key='real', content_type='social_post', response={},
+                                             expires_at=timezone.now() + timedelta(hours=1))
+
+        # Addresses the benchmark never generates are ignored even if passed in
+        self.assertEqual(delete_benchmark_users([bench.email, 'owner@example.com']), 1)
+        self.assertEqual(set(CustomUser.objects.values_list('email', flat=True)),
+                         {'owner@example.com', other.email})
+        self.assertEqual(BusinessProfile.objects.count(), 1)
+        # Cached content may be serving real businesses, so it is left alone
+        self.assertTrue(GeneratedContentCache.objects.exists())
+
+
+class CallPolicyTests(SimpleTestCase):
+    def policy(self, **kwargs):
+        return CallPolicy(**dict(dict(max_attempts=3, attempt_timeout=1, budget=5, backoff_base=0.001,
+                                      backoff_max=0.001), **kwargs))
+
+    def test_default_budget_finishes_before_the_worker_timeout(self):
+        self.assertLess(settings.GEMINI_CALL_POLICY['budget'], settings.REQUEST_BUDGET_SECONDS)
+        self.assertLess(settings.REQUEST_BUDGET_SECONDS, settings.GUNICORN_TIMEOUT)
+        self.assertEqual(check_request_budget(None), [])
+        with override_settings(GEMINI_CALL_POLICY=dict(settings.GEMINI_CALL_POLICY, budget=45)):
+            self.assertEqual([warning.id for warning in check_request_budget(None)], ['api.W001'])
+        with override_settings(REQUEST_BUDGET_SECONDS=30):
+            self.assertEqual([warning.id for warning in check_request_budget(None)], ['api.W002'])
+
+    def test_retryable_errors_are_retried(self):
+        calls = []
+
+        def flaky(timeout):
+            calls.append(timeout)
+            if len(calls) < 3:
+                raise google_exceptions.ServiceUnavailable('busy')
+            return 'ok'
+
+        self.assertEqual(self.policy().call(flaky), 'ok')
+        self.assertEqual(len(calls), 3)
+
+    def test_fatal_errors_fail_immediately(self):
+        calls = []
+
+        def rejected(timeout):
+            calls.append(timeout)
+            raise google_exceptions.InvalidArgument('bad prompt')
+
+        with self.assertRaises(google_exceptions.InvalidArgument):
+            self.policy().call(rejected)
+        self.assertEqual(len(calls), 1)
+
+    def test_hung_attempt_times_out(self):
+        with self.assertRaises(LLMTimeout):
+            self.policy(max_attempts=1, attempt_timeout=0.05).call(lambda timeout: time.sleep(0.5))
+
+    def test_slow_attempt_is_hedged(self):
+        policy = self.policy(hedge=True, hedge_min_samples=1, hedge_min_delay=0.01)
+        policy.latencies.record(0.01)
+        calls = []
+
+        def first_call_hangs(timeout):
+            calls.append(timeout)
+            if len(calls) == 1:
+                time.sleep(0.5)
+                return 'slow'
+            return 'hedged'
+
+        self.assertEqual(policy.call(first_call_hangs), 'hedged')
@@ -4,7 +4,15 @@ from . import views
 urlpatterns = [
     path('business/profile/', views.BusinessProfileView.as_view(), name='business-profile'),
     path('business/growth-plan/', views.GrowthPlanView.as_view(), name='growth-plan'),
+    path('business/growth-plan/materialize/', views.materialize_growth_plan_content, name='growth-plan-materialize'),
     path('content/generate/', views.generate_marketing_content, name='generate-content'),
+    path('content/generate/batch/', views.generate_marketing_content_batch, name='generate-content-batch'),
+    path('content/generate/stream/', views.stream_marketing_content, name='generate-content-stream'),
+    path('content/generate/async/', views.enqueue_marketing_content, name='generate-content-async'),
+    path('content/jobs/<uuid:job_id>/', views.generation_job_status, name='generation-job'),
     path('content/', views.MarketingContentView.as_view(), name='marketing-content'),
+    path('content/bulk/', views.bulk_update_content, name='bulk-update-content'),
+    path('content/search/', views.search_marketing_content_view, name='search-content'),
+    path('content/<uuid:content_id>/', views.MarketingContentDetailView.as_view(), name='marketing-content-detail'),
     path('content/<uuid:content_id>/approve/', views.approve_content, name='approve-content'),
 ]
\ No newline at end of file
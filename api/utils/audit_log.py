@@ -0,0 +1,84 @@
+import atexit
+import os
+import queue
+import threading
+from django.conf import settings
+from django.db import connections
+
+
+class GenerationAuditLog:
+    """
+    Writes ContentGenerationRequest rows off the request path. Records are
+    queued in memory and bulk inserted by a background thread; if the queue is
+    full the record is dropped, since the log is only used for auditing.
+    """
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 2.0, max_pending: int = 10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def record(self, ip_address: str, session_key: str = ''):
+        if not settings.FREE_TIER_AUDIT_ASYNC:
+            self._write([(ip_address, session_key)])
+            return
+        try:
+            self._queue.put_nowait((ip_address, session_key))
+        except queue.Full:
+            return
+        self._ensure_thread()
+
+    def flush(self):
+        """Write everything queued so far on the calling thread"""
+        pending = []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(pending), self.batch_size):
+            self._write(pending[start:start + self.batch_size])
+
+    def _write(self, records):
+        from ..models import ContentGenerationRequest
+
+        ContentGenerationRequest.objects.bulk_create([
+            ContentGenerationRequest(ip_address=ip, session_key=session_key or '')
+            for ip, session_key in records
+        ])
+
+    def _ensure_thread(self):
+        # Threads don't survive fork(), so a forked worker starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='generation-audit-log', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            records = []
+            try:
+                records.append(self._queue.get(timeout=self.flush_interval))
+                while len(records) < self.batch_size:
+                    records.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if not records:
+                continue
+            try:
+                self._write(records)
+            except Exception:
+                # Auditing must never take the writer thread down
+                pass
+            finally:
+                connections.close_all()
+
+
+audit_log = GenerationAuditLog()
+atexit.register(audit_log.flush)
@@ -0,0 +1,309 @@
+import json
+import math
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+CONTENT_TYPES = ['social_post', 'ad_copy', 'product_desc', 'whatsapp']
+PLATFORMS = ['facebook', 'instagram', 'whatsapp', 'twitter']
+THEMES = ['Weekend offer', 'New stock', 'Customer story', 'Holiday hours']
+PASSWORD = 'Bench-pass-12345'
+BENCH_EMAIL_RE = r'^bench-[0-9a-f]{12}@example\.com$'
+
+_QUERIES_RE = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def percentile(ordered: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def summarize(samples: List[Dict], elapsed: float) -> Dict:
+    latencies = sorted(sample['latency'] for sample in samples)
+    queries = [sample['queries'] for sample in samples if sample['queries'] is not None]
+    status_codes: Dict[str, int] = {}
+    for sample in samples:
+        status_codes[str(sample['status'])] = status_codes.get(str(sample['status']), 0) + 1
+
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if sample['error']),
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else None,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        # Read from the Server-Timing header, so only present when the server profiles every request
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        'status_codes': status_codes,
+    }
+
+
+class VirtualUser:
+    """One registered user with a business profile, driving requests over its own HTTP session"""
+
+    def __init__(self, base_url: str, index: int, unique_prompts: bool):
+        self.base_url = base_url.rstrip('/')
+        self.index = index
+        self.unique_prompts = unique_prompts
+        self.email = f'bench-{uuid.uuid4().hex[:12]}@example.com'
+        self.session = requests.Session()
+        self.iteration = 0
+
+    def url(self, path: str) -> str:
+        return f'{self.base_url}/{path.lstrip("/")}'
+
+    def setup(self):
+        response = self.session.post(self.url('api/auth/register/'), json={
+            'email': self.email,
+            'password': PASSWORD,
+            'password2': PASSWORD,
+            'first_name': 'Bench',
+            'last_name': f'User {self.index}',
+        })
+        response.raise_for_status()
+        self.login()
+        self.session.put(self.url('api/business/profile/'), json={
+            'business_name': f'Bench Shop {self.index}',
+            'business_type': 'retail',
+            'description': 'Household goods and fresh produce',
+            'target_audience': {'age': '25-45', 'interests': ['cooking', 'family']},
+            'location': 'Nairobi',
+        }).raise_for_status()
+
+    def login(self) -> requests.Response:
+        response = self.session.post(self.url('api/auth/token/'), json={'email': self.email, 'password': PASSWORD})
+        if response.ok:
+            self.session.headers['Authorization'] = f"Bearer {response.json()['access']}"
+        return response
+
+    def generate(self) -> requests.Response:
+        self.iteration += 1
+        return self.session.post(self.url('api/content/generate/'), json={
+            'content_type': CONTENT_TYPES[self.iteration % len(CONTENT_TYPES)],
+            'platform': PLATFORMS[self.iteration % len(PLATFORMS)],
+            'theme': THEMES[self.iteration % len(THEMES)],
+            'regenerate': self.unique_prompts,
+        })
+
+    def content_list(self) -> requests.Response:
+        return self.session.get(self.url('api/content/'), params={'view': 'summary'})
+
+    def growth_plan(self) -> requests.Response:
+        return self.session.get(self.url('api/business/growth-plan/'))
+
+    def auth(self) -> requests.Response:
+        return self.login()
+
+
+SCENARIOS: Dict[str, Callable[[VirtualUser], requests.Response]] = {
+    'generate': VirtualUser.generate,
+    'content_list': VirtualUser.content_list,
+    'growth_plan': VirtualUser.growth_plan,
+    'auth': VirtualUser.auth,
+}
+
+
+def parse_mix(spec: str) -> List[Tuple[str, int]]:
+    """'generate:4,content_list:4,auth' -> [('generate', 4), ('content_list', 4), ('auth', 1)]"""
+    mix = []
+    for part in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, weight = part.partition(':')
+        if name not in SCENARIOS:
+            raise ValueError(f'Unknown scenario {name!r}; choose from {", ".join(SCENARIOS)}')
+        mix.append((name, int(weight or 1)))
+    if not mix:
+        raise ValueError('No scenarios given')
+    return mix
+
+
+def _time_request(user: VirtualUser, scenario: str) -> Dict:
+    started = time.perf_counter()
+    try:
+        response = SCENARIOS[scenario](user)
+    except requests.RequestException as e:
+        return {'scenario': scenario, 'latency': time.perf_counter() - started, 'status': type(e).__name__,
+                'error': True, 'queries': None}
+    latency = time.perf_counter() - started
+    match = _QUERIES_RE.search(response.headers.get('Server-Timing', ''))
+    return {
+        'scenario': scenario,
+        'latency': latency,
+        'status': response.status_code,
+        'error': response.status_code >= 400,
+        'queries': int(match.group(1)) if match else None,
+    }
+
+
+def create_users(base_url: str, concurrency: int, unique_prompts: bool = False) -> List[VirtualUser]:
+    return [VirtualUser(base_url, index, unique_prompts) for index in range(concurrency)]
+
+
+def run_load(users: List[VirtualUser], mix: List[Tuple[str, int]], duration: float,
+             max_requests: Optional[int] = None, seed: int = 0) -> Dict:
+    """Register the users, then drive the mix from them until duration or max_requests runs out"""
+    concurrency = len(users)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(VirtualUser.setup, users))
+
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    samples: List[Dict] = []
+    lock = threading.Lock()
+    remaining = [max_requests if max_requests is not None else math.inf]
+    deadline = time.perf_counter() + duration
+
+    def drive(user: VirtualUser):
+        rng = random.Random(f'{seed}:{user.index}')
+        while time.perf_counter() < deadline:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            sample = _time_request(user, rng.choices(names, weights)[0])
+            with lock:
+                samples.append(sample)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(drive, users))
+    elapsed = time.perf_counter() - started
+
+    return {
+        'elapsed_seconds': round(elapsed, 3),
+        'scenarios': {
+            name: summarize([sample for sample in samples if sample['scenario'] == name], elapsed)
+            for name in names
+        },
+        'total': summarize(samples, elapsed),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_listening(process: subprocess.Popen, port: int, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Benchmark server exited with status {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Benchmark server did not start listening within {timeout:.0f}s')
+
+
+@contextmanager
+def local_server(port: int = 0, backend: str = 'fake', workers: int = 4,
+                 database_url: str = '') -> Iterator[str]:
+    """
+    Serve this project from gunicorn in a separate process, so the load
+    generator does not share its GIL, for the duration of the block. It runs
+    against a throwaway database (a temporary SQLite file unless database_url
+    is given), migrated first and removed afterwards, with a local-memory
+    cache, so nothing it writes reaches real data. Every request is profiled
+    so query counts come back in Server-Timing.
+    """
+    workdir = tempfile.mkdtemp(prefix='penyeza-bench-')
+    port = port or _free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url or f"sqlite:///{os.path.join(workdir, 'db.sqlite3')}",
+        CACHE_URL='locmemcache://',
+        LOCAL_CACHE_ALLOWED='true',
+        GEMINI_BACKEND=backend,
+        PROFILING_SAMPLE_RATE='1',
+        SECURE_SSL_REDIRECT='false',
+        METRICS_MULTIPROC_DIR='',
+    )
+    process = None
+    # Server output (one profiling line per request) goes to a log instead of the benchmark's output
+    with open(os.path.join(workdir, 'server.log'), 'w') as log:
+        try:
+            subprocess.run([sys.executable, 'manage.py', 'migrate', '--noinput'], cwd=settings.BASE_DIR, env=env,
+                           stdout=log, stderr=subprocess.STDOUT, check=True)
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', 'penyeza.wsgi:application', '--bind', f'127.0.0.1:{port}',
+                 '--workers', str(workers)],
+                cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+            )
+            _wait_until_listening(process, port, timeout=30)
+            yield f'http://127.0.0.1:{port}'
+        finally:
+            if process is not None:
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.wait()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def delete_benchmark_users(emails: List[str]) -> int:
+    """
+    Delete the given virtual users from the configured database, with their
+    profiles and content. Only addresses the benchmark generates are
+    touched. Returns the number of users deleted.
+    """
+    user_model = get_user_model()
+    emails = [email for email in emails if re.match(BENCH_EMAIL_RE, email)]
+    _, deleted = user_model.objects.filter(email__in=emails).delete()
+    return deleted.get(user_model._meta.label, 0)
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_report(results: Dict, started_at: str, base_url: str, mix: List[Tuple[str, int]],
+                     concurrency: int, server: Optional[Dict] = None) -> Dict:
+    """`server` describes a local server; a remote one is only known by its URL"""
+    server = server or {}
+    backend = server.get('gemini_backend')
+    return {
+        'started_at': started_at,
+        'commit': current_commit(),
+        'base_url': base_url,
+        'concurrency': concurrency,
+        'mix': dict(mix),
+        'gemini_backend': backend,
+        'gemini_fake': settings.GEMINI_FAKE if backend == 'fake' else None,
+        'database': server.get('database'),
+        'workers': server.get('workers'),
+        **results,
+    }
+
+
+def write_report(report: Dict, path: str):
+    with open(path, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, indent=2)
@@ -0,0 +1,173 @@
+import contextvars
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional, TypeVar
+from django.conf import settings
+from google.api_core import exceptions as google_exceptions
+
+T = TypeVar('T')
+
+
+class LLMTimeout(Exception):
+    """An upstream call (or the whole request budget) ran past its deadline"""
+
+
+# Transient upstream conditions worth another attempt. Everything else
+# (bad request, auth, blocked prompt, quota misconfiguration) fails at once.
+RETRYABLE_ERRORS = (
+    LLMTimeout,
+    TimeoutError,
+    ConnectionError,
+    google_exceptions.ServerError,
+    google_exceptions.TooManyRequests,
+    google_exceptions.Aborted,
+)
+FATAL_ERRORS = (google_exceptions.MethodNotImplemented,)
+
+
+def is_retryable(error: BaseException) -> bool:
+    return isinstance(error, RETRYABLE_ERRORS) and not isinstance(error, FATAL_ERRORS)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter for the given (1-based) failed attempt"""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies, used to pick the hedging delay"""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < max(min_samples, 1):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Upstream calls run here so a caller can stop waiting on a hung one"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.GEMINI_CALL_POOL_SIZE,
+                                           thread_name_prefix='gemini-call')
+        return _executor
+
+
+def _reset_after_fork():
+    global _executor, _executor_lock
+    _executor_lock = threading.Lock()
+    _executor = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class CallPolicy:
+    """
+    Deadline, retry and hedging policy for one kind of upstream call.
+
+    call(fn) runs fn(timeout) until it succeeds, the error is fatal,
+    max_attempts is reached or the request budget is spent. Each attempt is
+    bounded by min(attempt_timeout, time left in the budget). With hedging
+    on, an attempt still running after the observed p95 latency gets a
+    second, identical request and the first to succeed wins.
+    """
+
+    def __init__(self, max_attempts: int = 3, attempt_timeout: float = 20, budget: float = 45,
+                 backoff_base: float = 0.5, backoff_max: float = 4, hedge: bool = False,
+                 hedge_percentile: float = 95, hedge_min_samples: int = 20, hedge_min_delay: float = 0.5):
+        self.max_attempts = max_attempts
+        self.attempt_timeout = attempt_timeout
+        self.budget = budget
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.latencies = LatencyTracker()
+
+    @classmethod
+    def from_settings(cls) -> 'CallPolicy':
+        return cls(**settings.GEMINI_CALL_POLICY)
+
+    def hedge_delay(self) -> Optional[float]:
+        if not self.hedge:
+            return None
+        observed = self.latencies.percentile(self.hedge_percentile, self.hedge_min_samples)
+        if observed is None:
+            return None
+        return max(observed, self.hedge_min_delay)
+
+    def call(self, fn: Callable[[float], T], budget: Optional[float] = None) -> T:
+        deadline = Deadline(budget if budget is not None else self.budget)
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = min(self.attempt_timeout, deadline.remaining())
+            if timeout <= 0:
+                raise LLMTimeout('Request budget exhausted before the upstream call could be made')
+            try:
+                return self._attempt(fn, timeout)
+            except Exception as e:
+                if attempt >= self.max_attempts or not is_retryable(e):
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                if delay >= deadline.remaining():
+                    raise
+                time.sleep(delay)
+
+    def _attempt(self, fn: Callable[[float], T], timeout: float) -> T:
+        executor = _get_executor()
+        started = time.monotonic()
+        # Calls run in a copy of the caller's context so request profiling sees them
+        pending = {executor.submit(contextvars.copy_context().run, fn, timeout)}
+
+        hedge_delay = self.hedge_delay()
+        if hedge_delay is not None and hedge_delay < timeout:
+            done, _ = wait(pending, timeout=hedge_delay)
+            if not done:
+                pending.add(executor.submit(contextvars.copy_context().run, fn, timeout - hedge_delay))
+
+        last_error = None
+        while pending:
+            remaining = timeout - (time.monotonic() - started)
+            done, pending = wait(pending, timeout=max(remaining, 0), return_when=FIRST_COMPLETED)
+            if not done:
+                # Abandoned calls finish (or time out upstream) in the pool
+                raise LLMTimeout(f'Upstream call exceeded {timeout:.1f}s')
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    self.latencies.record(time.monotonic() - started)
+                    return future.result()
+                last_error = error
+        raise last_error
@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, NamedTuple, Optional
+from django.conf import settings
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the breaker is open"""
+
+
+class Permit(NamedTuple):
+    """Returned by allow() for a call that may go upstream; pass it to the call's record_* method"""
+    probe: Optional[int] = None  # Half-open period the call is a probe for, if it is one
+
+
+class CircuitBreaker:
+    """
+    Per-process breaker for an upstream dependency.
+
+    Closed: calls go through and their outcomes are kept for window_seconds.
+    Once there are at least min_calls, it opens if failure_ratio of them
+    failed or slow_call_ratio took slow_call_seconds or longer.
+    Open: calls are rejected for open_seconds.
+    Half-open: up to half_open_probes calls go through; if they all succeed
+    quickly it closes, otherwise it opens again. Only those probes count:
+    calls let through earlier that finish meanwhile are ignored.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, window_seconds: float = 60, min_calls: int = 10, failure_ratio: float = 0.5,
+                 slow_call_seconds: float = 15, slow_call_ratio: float = 0.8, open_seconds: float = 30,
+                 half_open_probes: int = 2, enabled: bool = True, clock: Callable[[], float] = time.monotonic):
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_ratio = slow_call_ratio
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.enabled = enabled
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._half_open_period = 0
+        self._close()
+
+    @classmethod
+    def from_settings(cls) -> 'CircuitBreaker':
+        return cls(**settings.GEMINI_CIRCUIT_BREAKER)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self.clock() - self._opened_at >= self.open_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> Optional[Permit]:
+        """
+        A permit if a call may go upstream now, else None. Every permitted call
+        must be followed by one record_* call with its permit.
+        """
+        if not self.enabled:
+            return Permit()
+        with self._lock:
+            if self._state == self.OPEN:
+                if self.clock() - self._opened_at < self.open_seconds:
+                    return None
+                self._state = self.HALF_OPEN
+                self._half_open_period += 1
+                self._probes_in_flight = 0
+                self._probe_successes = 0
+            if self._state == self.HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    return None
+                self._probes_in_flight += 1
+                return Permit(probe=self._half_open_period)
+            return Permit()
+
+    def _is_probe(self, permit: Optional[Permit]) -> bool:
+        return (self._state == self.HALF_OPEN and permit is not None
+                and permit.probe == self._half_open_period)
+
+    def record_success(self, duration: float, permit: Optional[Permit] = None):
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                if not self._is_probe(permit):
+                    return
+                self._probes_in_flight -= 1
+                if slow:
+                    self._open()
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._close()
+                return
+            self._record(failed=False, slow=slow)
+
+    def record_failure(self, permit: Optional[Permit] = None):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                if self._is_probe(permit):
+                    self._open()
+                return
+            self._record(failed=True, slow=False)
+
+    def record_ignored(self, permit: Optional[Permit] = None):
+        """The call ended in a way that says nothing about upstream health (e.g. a rejected prompt)"""
+        with self._lock:
+            if self._is_probe(permit):
+                self._probes_in_flight -= 1
+
+    def _record(self, failed: bool, slow: bool):
+        now = self.clock()
+        self._calls.append((now, failed, slow))
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+        if len(self._calls) < self.min_calls:
+            return
+        failures = sum(1 for _, call_failed, _ in self._calls if call_failed)
+        slow_calls = sum(1 for _, _, call_slow in self._calls if call_slow)
+        if failures >= self.failure_ratio * len(self._calls) or slow_calls >= self.slow_call_ratio * len(self._calls):
+            self._open()
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = self.clock()
+        self._calls = deque()
+
+    def _close(self):
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._calls = deque()
+        self._probes_in_flight = 0
+        self._probe_successes = 0
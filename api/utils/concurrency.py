@@ -0,0 +1,50 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from django.db import connections
+from .profiling import track_queries
+
+
+def _run_and_release(func: Callable, item):
+    try:
+        with track_queries():
+            return func(item), None
+    except Exception as e:
+        return None, e
+    finally:
+        # Pool threads get their own DB connections; don't leak them
+        connections.close_all()
+
+
+def bounded_map(func: Callable, items: Iterable, max_workers: int) -> List[Tuple[Optional[object], Optional[Exception]]]:
+    """
+    Run func over items on at most max_workers threads. Returns (result, exception)
+    pairs in input order, so one failing item never hides the others.
+    """
+    items = list(items)
+    if not items:
+        return []
+    workers = max(1, min(max_workers, len(items)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Each item runs in a copy of the caller's context so request profiling follows it
+        futures = [executor.submit(contextvars.copy_context().run, _run_and_release, func, item) for item in items]
+        return [future.result() for future in futures]
+
+
+def bounded_as_completed(func: Callable, items: Iterable, max_workers: int) -> Iterator[Tuple[object, Optional[object], Optional[Exception]]]:
+    """
+    Run func over items on at most max_workers threads, yielding
+    (item, result, exception) as each one finishes so the caller can
+    process results while later items are still running.
+    """
+    items = list(items)
+    if not items:
+        return
+    workers = max(1, min(max_workers, len(items)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(contextvars.copy_context().run, _run_and_release, func, item): item for item in items
+        }
+        for future in as_completed(futures):
+            result, error = future.result()
+            yield futures[future], result, error
@@ -1,11 +1,85 @@
 import json
-import re
 from typing import Dict, List, Optional
-from .gemini_client import GeminiClient
+from .gemini_client import GeminiClient, get_gemini_client
+from .text_analyzer import TextAnalysis, TextAnalyzer, text_analyzer
 
 class ContentGenerator:
-    def __init__(self):
-        self.gemini = GeminiClient()
+    DEFAULT_HASHTAGS = ['#smallbusiness', '#localbusiness', '#supportlocal', '#entrepreneur']
+    CALLS_TO_ACTION = {
+        'product': "Shop now!",
+        'sales': "Limited time offer!",
+        'video': "Watch now!",
+        'email': "Click here to learn more!",
+        'social_post': "Like and share!",
+        'whatsapp': "Reply to get started!"
+    }
+    SUGGESTED_REPLIES = {
+        'sales': ["Yes, I'm interested!", "Tell me more", "Send me the details"],
+        'followup': ["Great, thanks!", "I'll be there", "See you soon"],
+        'promotional': ["Awesome deal!", "I want this!", "How do I get it?"]
+    }
+    
+    def __init__(self, gemini: Optional[GeminiClient] = None, use_cache: bool = True,
+                 analyzer: Optional[TextAnalyzer] = None, structure: bool = True):
+        """structure=False skips post-processing for callers that only keep result['content']"""
+        self.gemini = gemini or get_gemini_client()
+        self.use_cache = use_cache
+        self.analyzer = analyzer or text_analyzer
+        self.structure = structure
+    
+    def generate(self, business_context: Dict, content_type: str, platform: str = '',
+                 theme: str = '', variant: str = '') -> Dict:
+        """Dispatch to the generator for content_type. variant is the ad/video/campaign/email type."""
+        if content_type == 'social_post':
+            return self.generate_social_media_post(business_context, platform or 'general', theme)
+        if content_type == 'product_desc':
+            return self.generate_product_description(business_context, {'name': theme})
+        if content_type == 'ad_copy':
+            return self.generate_ad_copy(business_context, variant or 'sales', {'theme': theme} if theme else None)
+        if content_type == 'video_script':
+            return self.generate_video_script(business_context, variant or 'promotional')
+        if content_type == 'whatsapp':
+            return self.generate_whatsapp_campaign(business_context, variant or 'broadcast')
+        if content_type == 'email':
+            return self.generate_email_campaign(business_context, variant or 'newsletter')
+        raise ValueError(f"Unsupported content type: {content_type}")
+    
+    def structure_many(self, items: List[Dict], results: List[Dict]) -> List[Dict]:
+        """
+        Add the structured extras to results generated with structure=False,
+        analyzing every successful text in one analyze_many pass. items[i]
+        has the content_type, platform, theme and variant of results[i].
+        """
+        succeeded = [index for index, result in enumerate(results) if result.get('success')]
+        analyses = self.analyzer.analyze_many(results[index]['content'] for index in succeeded)
+        structured = list(results)
+        for index, analysis in zip(succeeded, analyses):
+            item = items[index]
+            # Copied so results shared with a cache are not changed
+            structured[index] = dict(results[index], **self._structured_extras(
+                results[index]['content'], analysis, item['content_type'], item.get('platform', ''),
+                item.get('theme', ''), item.get('variant', '')
+            ))
+        return structured
+    
+    def _structured_extras(self, content: str, analysis: TextAnalysis, content_type: str, platform: str,
+                           theme: str, variant: str) -> Dict:
+        """The extras generate() adds for content_type, with the same defaults"""
+        if content_type == 'social_post':
+            return {'enhanced_content': self._enhance_social_content(content, platform or 'general', theme, analysis)}
+        if content_type == 'product_desc':
+            return {'structured_description': self._structure_product_description(content, {'name': theme}, analysis)}
+        if content_type == 'ad_copy':
+            return {'structured_ad': self._structure_ad_copy(content, variant or 'sales',
+                                                             {'theme': theme} if theme else None, analysis)}
+        if content_type == 'video_script':
+            return {'structured_script': self._structure_video_script(content, variant or 'promotional', 'short',
+                                                                      analysis)}
+        if content_type == 'whatsapp':
+            return {'structured_message': self._structure_whatsapp_message(content, variant or 'broadcast')}
+        if content_type == 'email':
+            return {'structured_email': self._structure_email_content(content, variant or 'newsletter', analysis)}
+        raise ValueError(f"Unsupported content type: {content_type}")
     
     def generate_social_media_post(self, business_context: Dict, platform: str, theme: str = "") -> Dict:
         """Generate social media post with platform-specific formatting"""
@@ -26,11 +100,14 @@ class ContentGenerator:
         if theme:
             prompt_enhancement += f" Theme: {theme}"
         
-        business_context['platform_specific'] = prompt_enhancement
+        # Copy so concurrent callers can share one business_context
+        enhanced_context = business_context.copy()
+        enhanced_context['platform_specific'] = prompt_enhancement
         
-        result = self.gemini.generate_marketing_content(business_context, content_type, platform)
+        result = self.gemini.generate_marketing_content(enhanced_context, content_type, platform,
+                                                        use_cache=self.use_cache)
         
-        if result['success']:
+        if result['success'] and self.structure:
             # Enhance the content with structured data
             enhanced_content = self._enhance_social_content(result['content'], platform, theme)
             result['enhanced_content'] = enhanced_content
@@ -47,9 +124,10 @@ class ContentGenerator:
         enhanced_context['product_benefits'] = product_details.get('benefits', [])
         enhanced_context['target_customer'] = product_details.get('target_customer', '')
         
-        result = self.gemini.generate_marketing_content(enhanced_context, content_type, 'general')
+        result = self.gemini.generate_marketing_content(enhanced_context, content_type, 'general',
+                                                        use_cache=self.use_cache)
         
-        if result['success']:
+        if result['success'] and self.structure:
             # Structure the product description
             structured_description = self._structure_product_description(result['content'], product_details)
             result['structured_description'] = structured_description
@@ -76,9 +154,10 @@ class ContentGenerator:
         enhanced_context = business_context.copy()
         enhanced_context['ad_type'] = prompt_enhancement
         
-        result = self.gemini.generate_marketing_content(enhanced_context, content_type, 'ads')
+        result = self.gemini.generate_marketing_content(enhanced_context, content_type, 'ads',
+                                                        use_cache=self.use_cache)
         
-        if result['success']:
+        if result['success'] and self.structure:
             structured_ad = self._structure_ad_copy(result['content'], ad_type, promotion)
             result['structured_ad'] = structured_ad
         
@@ -102,9 +181,10 @@ class ContentGenerator:
         enhanced_context = business_context.copy()
         enhanced_context['video_type'] = prompt_enhancement
         
-        result = self.gemini.generate_marketing_content(enhanced_context, content_type, 'video')
+        result = self.gemini.generate_marketing_content(enhanced_context, content_type, 'video',
+                                                        use_cache=self.use_cache)
         
-        if result['success']:
+        if result['success'] and self.structure:
             structured_script = self._structure_video_script(result['content'], video_type, duration)
             result['structured_script'] = structured_script
         
@@ -127,9 +207,10 @@ class ContentGenerator:
         enhanced_context = business_context.copy()
         enhanced_context['campaign_type'] = prompt_enhancement
         
-        result = self.gemini.generate_marketing_content(enhanced_context, content_type, 'whatsapp')
+        result = self.gemini.generate_marketing_content(enhanced_context, content_type, 'whatsapp',
+                                                        use_cache=self.use_cache)
         
-        if result['success']:
+        if result['success'] and self.structure:
             structured_message = self._structure_whatsapp_message(result['content'], campaign_type)
             result['structured_message'] = structured_message
         
@@ -152,18 +233,19 @@ class ContentGenerator:
         enhanced_context = business_context.copy()
         enhanced_context['email_type'] = prompt_enhancement
         
-        result = self.gemini.generate_marketing_content(enhanced_context, content_type, 'email')
+        result = self.gemini.generate_marketing_content(enhanced_context, content_type, 'email',
+                                                        use_cache=self.use_cache)
         
-        if result['success']:
+        if result['success'] and self.structure:
             structured_email = self._structure_email_content(result['content'], email_type)
             result['structured_email'] = structured_email
         
         return result
     
-    def _enhance_social_content(self, content: str, platform: str, theme: str) -> Dict:
+    def _enhance_social_content(self, content: str, platform: str, theme: str,
+                                analysis: Optional[TextAnalysis] = None) -> Dict:
         """Enhance social media content with structured data"""
-        # Extract hashtags
-        hashtags = self._extract_hashtags(content)
+        hashtags = self._hashtags(analysis or self.analyzer.analyze(content))
         
         # Generate platform-specific recommendations
         posting_tips = self._get_posting_tips(platform)
@@ -182,20 +264,23 @@ class ContentGenerator:
             'optimal_post_times': self._get_optimal_times(platform)
         }
     
-    def _structure_product_description(self, content: str, product_details: Dict) -> Dict:
+    def _structure_product_description(self, content: str, product_details: Dict,
+                                       analysis: Optional[TextAnalysis] = None) -> Dict:
         """Structure product description with key elements"""
+        analysis = analysis or self.analyzer.analyze(content)
         return {
             'description': content,
-            'key_features': self._extract_key_points(content),
+            'key_features': [sentence for sentence in analysis.sentences if len(sentence) > 10][:5],
             'target_audience': product_details.get('target_customer', ''),
-            'seo_keywords': self._extract_keywords(content),
+            'seo_keywords': analysis.keywords,
             'call_to_action': self._generate_cta('product')
         }
     
-    def _structure_ad_copy(self, content: str, ad_type: str, promotion: Dict = None) -> Dict:
+    def _structure_ad_copy(self, content: str, ad_type: str, promotion: Dict = None,
+                           analysis: Optional[TextAnalysis] = None) -> Dict:
         """Structure ad copy with campaign elements"""
         return {
-            'headline': self._extract_headline(content),
+            'headline': (analysis or self.analyzer.analyze(content)).headline,
             'body': content,
             'call_to_action': self._generate_cta(ad_type),
             'ad_type': ad_type,
@@ -203,13 +288,14 @@ class ContentGenerator:
             'targeting_suggestions': self._get_ad_targeting(ad_type)
         }
     
-    def _structure_video_script(self, content: str, video_type: str, duration: str) -> Dict:
+    def _structure_video_script(self, content: str, video_type: str, duration: str,
+                                analysis: Optional[TextAnalysis] = None) -> Dict:
         """Structure video script with timing and elements"""
         return {
             'script': content,
             'video_type': video_type,
             'estimated_duration': duration,
-            'key_scenes': self._extract_scenes(content),
+            'key_scenes': (analysis or self.analyzer.analyze(content)).paragraphs[:5],
             'call_to_action': self._generate_cta('video'),
             'platform_optimization': self._get_video_platform_tips(video_type)
         }
@@ -225,24 +311,22 @@ class ContentGenerator:
             'personalization_tips': self._get_whatsapp_personalization()
         }
     
-    def _structure_email_content(self, content: str, email_type: str) -> Dict:
+    def _structure_email_content(self, content: str, email_type: str,
+                                 analysis: Optional[TextAnalysis] = None) -> Dict:
         """Structure email content with marketing elements"""
+        analysis = analysis or self.analyzer.analyze(content)
         return {
-            'subject_line': self._generate_email_subject(content, email_type),
+            'subject_line': self._generate_email_subject(analysis, email_type),
             'body': content,
             'email_type': email_type,
-            'key_sections': self._extract_email_sections(content),
+            'key_sections': [paragraph for paragraph in analysis.paragraphs if len(paragraph) > 20][:4],
             'call_to_action': self._generate_cta('email'),
             'personalization_fields': ['{name}', '{business}', '{location}']
         }
     
-    def _extract_hashtags(self, content: str) -> List[str]:
-        """Extract or generate relevant hashtags"""
-        hashtags = re.findall(r'#\w+', content)
-        if not hashtags:
-            # Generate some generic business hashtags
-            hashtags = ['#smallbusiness', '#localbusiness', '#supportlocal', '#entrepreneur']
-        return hashtags[:10]  # Limit to 10 hashtags
+    def _hashtags(self, analysis: TextAnalysis) -> List[str]:
+        """Hashtags used in the content, or generic business ones"""
+        return analysis.hashtags or list(self.DEFAULT_HASHTAGS)
     
     def _get_posting_tips(self, platform: str) -> List[str]:
         """Get platform-specific posting tips"""
@@ -297,48 +381,13 @@ class ContentGenerator:
         }
         return times.get(platform.lower(), ["Morning", "Afternoon", "Evening"])
     
-    def _extract_key_points(self, content: str) -> List[str]:
-        """Extract key points from content"""
-        sentences = content.split('. ')
-        return [s.strip() for s in sentences if len(s.strip()) > 10][:5]
-    
-    def _extract_keywords(self, content: str) -> List[str]:
-        """Extract potential SEO keywords"""
-        words = content.lower().split()
-        # Simple keyword extraction - in production, use proper NLP
-        keywords = [word for word in words if len(word) > 5]
-        return list(set(keywords))[:10]
-    
     def _generate_cta(self, content_type: str) -> str:
         """Generate call-to-action based on content type"""
-        ctas = {
-            'product': "Shop now!",
-            'sales': "Limited time offer!",
-            'video': "Watch now!",
-            'email': "Click here to learn more!",
-            'social_post': "Like and share!",
-            'whatsapp': "Reply to get started!"
-        }
-        return ctas.get(content_type, "Learn more!")
-    
-    def _extract_headline(self, content: str) -> str:
-        """Extract or generate headline from content"""
-        first_line = content.split('\n')[0]
-        return first_line[:100]  # Limit headline length
-    
-    def _extract_scenes(self, content: str) -> List[str]:
-        """Extract scenes from video script"""
-        scenes = content.split('\n\n')
-        return [scene.strip() for scene in scenes if scene.strip()][:5]
+        return self.CALLS_TO_ACTION.get(content_type, "Learn more!")
     
     def _generate_suggested_replies(self, campaign_type: str) -> List[str]:
         """Generate suggested replies for WhatsApp"""
-        replies = {
-            'sales': ["Yes, I'm interested!", "Tell me more", "Send me the details"],
-            'followup': ["Great, thanks!", "I'll be there", "See you soon"],
-            'promotional': ["Awesome deal!", "I want this!", "How do I get it?"]
-        }
-        return replies.get(campaign_type, ["Thanks!", "Got it", "Interesting"])
+        return self.SUGGESTED_REPLIES.get(campaign_type, ["Thanks!", "Got it", "Interesting"])
     
     def _get_whatsapp_timing(self) -> List[str]:
         """Get optimal WhatsApp messaging times"""
@@ -348,9 +397,9 @@ class ContentGenerator:
         """Get WhatsApp personalization tips"""
         return ["Use customer name", "Reference past purchases", "Keep it conversational"]
     
-    def _generate_email_subject(self, content: str, email_type: str) -> str:
+    def _generate_email_subject(self, analysis: TextAnalysis, email_type: str) -> str:
         """Generate email subject line"""
-        first_sentence = content.split('.')[0]
+        first_sentence = analysis.sentences[0].rstrip('.!?') if analysis.sentences else ''
         subjects = {
             'newsletter': f"Update: {first_sentence[:50]}",
             'promotional': f"Special Offer: {first_sentence[:40]}",
@@ -360,11 +409,6 @@ class ContentGenerator:
         }
         return subjects.get(email_type, first_sentence[:60])
     
-    def _extract_email_sections(self, content: str) -> List[str]:
-        """Extract email sections"""
-        paragraphs = content.split('\n\n')
-        return [p.strip() for p in paragraphs if len(p.strip()) > 20][:4]
-    
     def _get_ad_targeting(self, ad_type: str) -> List[str]:
         """Get ad targeting suggestions"""
         targeting = {
@@ -0,0 +1,96 @@
+import random
+from datetime import timedelta
+from typing import Dict, List, Optional
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from ..models import MarketingContent
+from .concurrency import bounded_map
+from .publishers import get_publisher
+
+
+def due_content():
+    """Approved, unposted content whose time has come and that isn't leased or backing off"""
+    now = timezone.now()
+    return MarketingContent.objects.filter(
+        Q(next_publish_at__isnull=True) | Q(next_publish_at__lte=now),
+        is_approved=True,
+        is_posted=False,
+        scheduled_time__lte=now,
+        publish_attempts__lt=settings.CONTENT_PUBLISH_MAX_ATTEMPTS
+    )
+
+
+def claim_due_content(batch_size: int, lease_seconds: Optional[int] = None) -> List[MarketingContent]:
+    """
+    Lease a batch of due items. SKIP LOCKED lets several dispatchers claim
+    disjoint batches; the lease keeps a crashed dispatcher's items from
+    being picked up again until it expires.
+    """
+    lease = timedelta(seconds=lease_seconds or settings.CONTENT_DISPATCH_LEASE_SECONDS)
+    with transaction.atomic():
+        ids = list(
+            due_content()
+            .select_for_update(skip_locked=True)
+            .order_by('scheduled_time')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        MarketingContent.objects.filter(id__in=ids).update(
+            next_publish_at=timezone.now() + lease,
+            publish_attempts=F('publish_attempts') + 1
+        )
+    return list(MarketingContent.objects.filter(id__in=ids).order_by('scheduled_time'))
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff with full jitter"""
+    ceiling = min(
+        settings.CONTENT_PUBLISH_RETRY_MAX_SECONDS,
+        settings.CONTENT_PUBLISH_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    )
+    return timedelta(seconds=random.uniform(ceiling / 2, ceiling))
+
+
+def _publish(content: MarketingContent):
+    get_publisher(content.platform).publish(content)
+
+
+def dispatch_due_content(batch_size: Optional[int] = None, max_workers: Optional[int] = None,
+                         lease_seconds: Optional[int] = None) -> Dict:
+    """Claim one batch of due content, publish it and record the outcomes"""
+    batch = claim_due_content(batch_size or settings.CONTENT_DISPATCH_BATCH_SIZE, lease_seconds)
+    if not batch:
+        return {'claimed': 0, 'posted': 0, 'failed': 0}
+
+    outcomes = bounded_map(_publish, batch, max_workers or settings.CONTENT_DISPATCH_CONCURRENCY)
+
+    posted_ids = []
+    failed = 0
+    now = timezone.now()
+    for content, (_, error) in zip(batch, outcomes):
+        if error is None:
+            posted_ids.append(content.id)
+            continue
+
+        failed += 1
+        update = {
+            'last_publish_error': f'{type(error).__name__}: {error}'[:1000],
+            # publish_attempts already counts this attempt; it was incremented when claimed
+            'next_publish_at': now + retry_delay(content.publish_attempts),
+        }
+        if not getattr(error, 'retryable', True):
+            # Give up straight away on errors that retrying won't fix
+            update['publish_attempts'] = settings.CONTENT_PUBLISH_MAX_ATTEMPTS
+        MarketingContent.objects.filter(id=content.id).update(**update)
+
+    # One UPDATE for the whole batch of successes
+    MarketingContent.objects.filter(id__in=posted_ids).update(
+        is_posted=True,
+        posted_at=now,
+        next_publish_at=None,
+        last_publish_error=''
+    )
+    return {'claimed': len(batch), 'posted': len(posted_ids), 'failed': failed}
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from typing import Dict, Iterator
+from django.conf import settings
+from google.api_core import exceptions as google_exceptions
+
+# Stand-in for genai.GenerativeModel, selected with GEMINI_BACKEND = 'fake'.
+# Output, latency and failures are derived from the seed, the prompt and how
+# many times that prompt has been sent, so a run is reproducible regardless
+# of how concurrent requests interleave.
+
+GROWTH_PLAN_MARKER = 'weekly marketing growth plan'
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+class FakeUsageMetadata:
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class FakeResponse:
+    def __init__(self, text: str, prompt: str = ''):
+        self.text = text
+        self.usage_metadata = FakeUsageMetadata(math.ceil(len(prompt) / 4), math.ceil(len(text) / 4))
+
+
+class FakeGenerativeModel:
+    def __init__(self, latency: str = 'fixed', latency_ms: float = 0, latency_sigma: float = 0.5,
+                 failure_rate: float = 0.0, seed: int = 0, chunk_size: int = 40):
+        if latency not in ('fixed', 'uniform', 'lognormal'):
+            raise ValueError(f'Unknown latency distribution: {latency}')
+        self.model_name = 'models/fake'
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self._calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> 'FakeGenerativeModel':
+        return cls(**settings.GEMINI_FAKE)
+
+    def _rng(self, prompt: str) -> random.Random:
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        with self._lock:
+            call = self._calls.get(digest, 0)
+            self._calls[digest] = call + 1
+        return random.Random(f'{self.seed}:{digest}:{call}')
+
+    def _delay(self, rng: random.Random) -> float:
+        """Seconds to sleep. latency_ms is the fixed value, the uniform maximum or the lognormal median."""
+        if self.latency_ms <= 0:
+            return 0.0
+        if self.latency == 'uniform':
+            return rng.uniform(0, self.latency_ms) / 1000
+        if self.latency == 'lognormal':
+            return rng.lognormvariate(math.log(self.latency_ms), self.latency_sigma) / 1000
+        return self.latency_ms / 1000
+
+    def _outcome(self, prompt: str) -> str:
+        rng = self._rng(prompt)
+        delay = self._delay(rng)
+        failed = rng.random() < self.failure_rate
+        time.sleep(delay)
+        if failed:
+            raise google_exceptions.ServiceUnavailable('Fake Gemini backend failure')
+        return self._text(prompt)
+
+    def _text(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        if GROWTH_PLAN_MARKER in prompt:
+            themes = ['Engagement', 'Promotion', 'Testimonials', 'Education', 'Community']
+            return json.dumps({
+                'weekly_themes': themes,
+                'daily_actions': [
+                    {'day': day, 'theme': themes[index % len(themes)], 'platform': 'facebook',
+                     'content_type': 'social_post', 'action': f'{day} post ({digest})', 'posting_time': '9:00 AM'}
+                    for index, day in enumerate(DAYS)
+                ],
+                'platforms': ['facebook', 'instagram', 'whatsapp'],
+                'metrics': ['Reach', 'Enquiries'],
+            })
+        return (f'Fresh from us to you! Visit today and discover what makes us special. '
+                f'Share with a friend and tag us. #SupportLocal #{digest}')
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        if stream:
+            return self._stream(prompt)
+        return FakeResponse(self._outcome(prompt), prompt)
+
+    def _stream(self, prompt: str) -> Iterator[FakeResponse]:
+        text = self._outcome(prompt)
+        for start in range(0, len(text), self.chunk_size):
+            yield FakeResponse(text[start:start + self.chunk_size])
@@ -0,0 +1,81 @@
+import re
+from typing import Dict
+from .content_generator import ContentGenerator
+from .prompt_templates import render_value
+
+# Template content served while the Gemini circuit breaker is open. It is
+# plain and deterministic, built from the business context and the CTA,
+# reply and hashtag tables in ContentGenerator, and marked degraded so
+# clients can offer to regenerate it once the model is back.
+
+CTA_KEYS = {
+    'social_post': 'social_post',
+    'product_desc': 'product',
+    'ad_copy': 'sales',
+    'video_script': 'video',
+    'email': 'email',
+    'whatsapp': 'whatsapp',
+}
+
+SOCIAL_OPENERS = {
+    'facebook': "Hello {location}! 👋 {business_name} here.",
+    'instagram': "✨ {business_name} | {location} ✨",
+    'twitter': "{business_name} in {location}:",
+    'linkedin': "At {business_name}, we serve {audience} across {location}.",
+    'tiktok': "POV: you just found {business_name} in {location} 👀",
+    'whatsapp': "Hi there! This is {business_name} in {location}.",
+}
+
+TEMPLATES = {
+    'social_post': "{opener}\n\n{description}. Made for {audience}.\n\n{cta}\n\n{hashtags}",
+    'product_desc': ("{product} by {business_name}\n\n{description}. Loved by {audience} in {location}.\n\n"
+                     "{cta}"),
+    'ad_copy': "{business_name}: {location}'s {business_type} favourite\n\n{description}. Visit us today.\n\n{cta}",
+    'video_script': ("SCENE 1: Outside {business_name} in {location}. \"Welcome to {business_name}!\"\n\n"
+                     "SCENE 2: Show what we offer. \"{description}.\"\n\n"
+                     "SCENE 3: Happy customers. \"Perfect for {audience}.\"\n\n"
+                     "SCENE 4: Logo and contact details. \"{cta}\""),
+    'email': ("Subject: News from {business_name}\n\nHello,\n\n{description}. We are here for {audience} "
+              "in {location}.\n\n{cta}\n\nWarm regards,\n{business_name}"),
+    'whatsapp': ("Hello! 👋 This is {business_name} in {location}. {description}.\n\n"
+                 "Reply \"{reply}\" and we'll get back to you. {cta}"),
+}
+
+
+def _hashtag(text: str) -> str:
+    words = re.findall(r'\w+', text)
+    return '#' + ''.join(word.capitalize() for word in words) if words else ''
+
+
+def fallback_content(business_context: Dict, content_type: str, platform: str) -> str:
+    name = business_context.get('business_name') or 'our shop'
+    location = business_context.get('location') or 'your area'
+    values = {
+        'business_name': name,
+        'location': location,
+        'business_type': business_context.get('business_type') or 'local',
+        'description': (render_value(business_context.get('description')) or 'Quality you can trust').rstrip('.'),
+        'audience': render_value(business_context.get('target_audience')) or 'our community',
+        'product': render_value(business_context.get('product_name')) or 'Our latest product',
+        'cta': ContentGenerator.CALLS_TO_ACTION.get(CTA_KEYS.get(content_type, ''), 'Learn more!'),
+        'reply': ContentGenerator.SUGGESTED_REPLIES['sales'][1],
+        'hashtags': ' '.join(
+            tag for tag in [_hashtag(name), _hashtag(location)] + ContentGenerator.DEFAULT_HASHTAGS[:2] if tag
+        ),
+    }
+    opener = SOCIAL_OPENERS.get((platform or '').lower(), "{business_name} in {location}.")
+    values['opener'] = opener.format(**values)
+    template = TEMPLATES.get(content_type, TEMPLATES['social_post'])
+    return template.format(**values)
+
+
+def fallback_result(business_context: Dict, content_type: str, platform: str) -> Dict:
+    """A successful, uncached generation result built locally and marked degraded"""
+    return {
+        'success': True,
+        'content': fallback_content(business_context, content_type, platform),
+        'type': content_type,
+        'platform': platform,
+        'cached': False,
+        'degraded': True
+    }
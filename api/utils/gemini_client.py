@@ -1,107 +1,272 @@
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+import copy
+import logging
 import os
-import json
+import threading
+import time
 from django.conf import settings
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
+from .call_policy import CallPolicy, is_retryable
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, Permit
+from .fake_gemini import FakeGenerativeModel
+from .growth_plan import FALLBACK_PLAN, GENERATION_CONFIG as GROWTH_PLAN_CONFIG, PlanValidationError, parse_growth_plan
+from .metrics import record_cache_lookup, record_fallback, record_llm_call
+from .prompt_templates import render_growth_plan_prompt, render_growth_plan_repair_prompt, render_marketing_prompt
+from .response_cache import response_cache
+from .similar_cache import similar_cache
+from .single_flight import coalesce
+
+logger = logging.getLogger(__name__)
 
 class GeminiClient:
     def __init__(self):
+        self.policy = CallPolicy.from_settings()
+        self.breaker = CircuitBreaker.from_settings()
+        if settings.GEMINI_BACKEND == 'fake':
+            # Deterministic local backend for load tests and development without an API key
+            self.api_key = None
+            self.model = FakeGenerativeModel.from_settings()
+            return
+        
         self.api_key = settings.GEMINI_API_KEY
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY not found in settings")
         
         genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
     
-    def generate_marketing_content(self, business_context: Dict, content_type: str, platform: str) -> Dict:
+    def generate_marketing_content(self, business_context: Dict, content_type: str, platform: str,
+                                   use_cache: bool = True) -> Dict:
         prompt = self._build_prompt(business_context, content_type, platform)
+        cache_key = self._cache_key(prompt, content_type, platform)
+        
+        if use_cache:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                record_cache_lookup(content_type, platform, 'hit')
+                return dict(cached, cached=True)
+            similar = similar_cache.get(business_context, content_type, platform)
+            if similar is not None:
+                record_cache_lookup(content_type, platform, 'similar')
+                content, score = similar
+                return {'success': True, 'content': content, 'type': content_type, 'platform': platform,
+                        'cached': True, 'similarity': round(score, 3)}
+            record_cache_lookup(content_type, platform, 'miss')
+            # Identical concurrent prompts share a single upstream call
+            generated = []
+            
+            def generate():
+                generated.append(True)
+                return self._generate(prompt, cache_key, content_type, platform)
+            
+            result = dict(coalesce(f'gemini:{cache_key}', generate, recheck=lambda: self._cached_result(cache_key)))
+            if not generated and not result.get('cached'):
+                # Another caller generated it and stores it for look-alikes
+                result['coalesced'] = True
+        else:
+            result = self._generate(prompt, cache_key, content_type, platform)
         
+        if result['success'] and not result.get('cached') and not result.get('coalesced'):
+            # Only the caller that actually generated it stores it for look-alike businesses
+            similar_cache.add(business_context, content_type, platform, result['content'])
+        elif result.get('circuit_open'):
+            # Upstream is unhealthy: answer straight away with local template content
+            record_fallback(content_type, platform)
+            from .fallback_content import fallback_result  # content_generator imports this module
+            return fallback_result(business_context, content_type, platform)
+        return result
+    
+    def _call_model(self, prompt: str, operation: str, content_type: str, platform: str,
+                    generation_config: Optional[Dict] = None):
+        """Call the model under the retry/deadline/hedging policy, recording every attempt"""
+        options = {'generation_config': generation_config} if generation_config is not None else {}
+        
+        def attempt(timeout: float):
+            started = time.monotonic()
+            try:
+                response = self.model.generate_content(prompt, **options, request_options={'timeout': timeout})
+            except Exception as e:
+                record_llm_call(operation, content_type, platform, prompt, time.monotonic() - started, error=e)
+                raise
+            record_llm_call(operation, content_type, platform, prompt, time.monotonic() - started,
+                            response=response)
+            return response
+        
+        permit = self.breaker.allow()
+        if not permit:
+            raise CircuitOpenError('Gemini circuit breaker is open')
+        started = time.monotonic()
         try:
-            response = self.model.generate_content(prompt)
-            return {
+            response = self.policy.call(attempt)
+        except Exception as e:
+            self._record_breaker_failure(permit, e)
+            raise
+        self.breaker.record_success(time.monotonic() - started, permit)
+        return response
+    
+    def _record_breaker_failure(self, permit: Permit, error: Exception):
+        if is_retryable(error):
+            self.breaker.record_failure(permit)
+        else:
+            # A rejected prompt or bad key says nothing about upstream health
+            self.breaker.record_ignored(permit)
+    
+    def _generate(self, prompt: str, cache_key: str, content_type: str, platform: str) -> Dict:
+        try:
+            response = self._call_model(prompt, 'generate', content_type, platform)
+            result = {
                 'success': True,
                 'content': response.text.strip(),
                 'type': content_type,
                 'platform': platform
             }
+            # A regenerate request still refreshes the cache with the new content
+            response_cache.set(cache_key, result, content_type, platform)
+            return dict(result, cached=False)
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e),
+                'error_type': type(e).__name__,
+                'retryable': is_retryable(e),
+                'circuit_open': isinstance(e, CircuitOpenError),
                 'content': None
             }
     
-    def _build_prompt(self, business_context: Dict, content_type: str, platform: str) -> str:
-        base_prompt = f"""
-        You are Penyeza AI Growth Agent, an expert marketing assistant for small businesses in Africa.
-        
-        BUSINESS CONTEXT:
-        - Business Name: {business_context.get('business_name', 'Local Business')}
-        - Business Type: {business_context.get('business_type', 'General')}
-        - Description: {business_context.get('description', 'Serving local community')}
-        - Target Audience: {business_context.get('target_audience', 'Local customers')}
-        - Location: {business_context.get('location', 'Local area')}
+    def _cached_result(self, cache_key: str) -> Optional[Dict]:
+        cached = response_cache.get(cache_key)
+        return dict(cached, cached=True) if cached is not None else None
+    
+    def stream_marketing_content(self, business_context: Dict, content_type: str, platform: str,
+                                 use_cache: bool = True) -> Iterator[str]:
+        """Yield the generated content in chunks as the model produces them"""
+        prompt = self._build_prompt(business_context, content_type, platform)
+        cache_key = self._cache_key(prompt, content_type, platform)
         
-        TASK: Create a {content_type.upper()} for {platform.upper()}
+        if use_cache:
+            cached = response_cache.get(cache_key)
+            record_cache_lookup(content_type, platform, 'hit' if cached is not None else 'miss')
+            if cached is not None:
+                yield cached['content']
+                return
         
-        REQUIREMENTS:
-        - Engaging and professional tone
-        - Culturally appropriate for African markets
-        - Action-oriented with clear call-to-action
-        - Optimized for the specific platform
-        - Includes relevant local context
-        - Mobile-friendly format
+        permit = self.breaker.allow()
+        if not permit:
+            raise CircuitOpenError('Gemini circuit breaker is open')
         
-        ADDITIONAL CONTEXT:
-        {business_context.get('platform_specific', 'Create compelling content that drives engagement and sales.')}
+        chunks = []
+        started = time.monotonic()
+        finished = False
+        try:
+            # Chunks may already be with the client, so a stream is bounded by a timeout but never retried
+            stream = self.model.generate_content(
+                prompt, stream=True, request_options={'timeout': self.policy.attempt_timeout}
+            )
+            for chunk in stream:
+                text = chunk.text
+                if text:
+                    chunks.append(text)
+                    yield text
+            finished = True
+        except Exception as e:
+            finished = True
+            record_llm_call('stream', content_type, platform, prompt, time.monotonic() - started, error=e)
+            self._record_breaker_failure(permit, e)
+            raise
+        finally:
+            if not finished:
+                # The client went away mid-stream
+                self.breaker.record_ignored(permit)
+        duration = time.monotonic() - started
+        record_llm_call('stream', content_type, platform, prompt, duration, response_text=''.join(chunks))
+        self.breaker.record_success(duration, permit)
         
-        FORMAT: Provide only the final content, ready to use. No explanations or notes.
-        """
-        return base_prompt
+        response_cache.set(cache_key, {
+            'success': True,
+            'content': ''.join(chunks).strip(),
+            'type': content_type,
+            'platform': platform
+        }, content_type, platform)
+    
+    def _cache_key(self, prompt: str, content_type: str, platform: str) -> str:
+        return response_cache.make_key(
+            prompt, model=self.model.model_name, content_type=content_type, platform=platform
+        )
+    
+    def _build_prompt(self, business_context: Dict, content_type: str, platform: str) -> str:
+        return render_marketing_prompt(business_context, content_type, platform).text
 
     def generate_growth_plan(self, business_profile_data: Dict) -> Dict:
-        prompt = f"""
-        Create a comprehensive weekly marketing growth plan for this African small business:
-        
-        BUSINESS DETAILS:
-        - Name: {business_profile_data.get('business_name')}
-        - Type: {business_profile_data.get('business_type')}
-        - Description: {business_profile_data.get('description')}
-        - Target Audience: {business_profile_data.get('target_audience')}
-        - Location: {business_profile_data.get('location')}
-        
-        Create a 7-day marketing plan with:
-        
-        DAY-BY-DAY ACTIVITIES:
-        - Monday: Content theme and specific actions
-        - Tuesday: Engagement strategies
-        - Wednesday: Promotional activities
-        - Thursday: Customer retention focus
-        - Friday: Weekend preparation
-        - Saturday: Peak engagement
-        - Sunday: Planning and analysis
-        
-        PLATFORM STRATEGY:
-        - Primary platforms to focus on
-        - Content types for each platform
-        - Best posting times
-        
-        PERFORMANCE METRICS:
-        - Key metrics to track
-        - Goals for the week
-        - Success indicators
-        
-        Format the response as structured JSON that can be parsed.
-        Focus on practical, actionable steps for African small businesses.
         """
+        A validated plan dict. Output that fails the schema gets one repair
+        call quoting the errors; if that fails too, the fallback plan is
+        returned marked degraded.
+        """
+        prompt = render_growth_plan_prompt(business_profile_data).text
         
         try:
-            response = self.model.generate_content(prompt)
-            # Try to parse JSON, if fails return as text
-            try:
-                plan_data = json.loads(response.text)
-                return {'success': True, 'plan': plan_data}
-            except:
-                return {'success': True, 'plan': response.text}
+            text = self._call_growth_plan(prompt, 'growth_plan')
+            plan, errors = parse_growth_plan(text)
+            if errors:
+                repair_prompt = render_growth_plan_repair_prompt(business_profile_data, text, errors).text
+                text = self._call_growth_plan(repair_prompt, 'growth_plan_repair')
+                plan, errors = parse_growth_plan(text)
+            if errors:
+                raise PlanValidationError(errors)
+            return {'success': True, 'plan': plan}
+        except PlanValidationError as e:
+            logger.warning('Unusable growth plan after repair: %s', e)
+            return {'success': True, 'plan': copy.deepcopy(FALLBACK_PLAN), 'degraded': True, 'error': str(e)}
         except Exception as e:
-            return {'success': False, 'error': str(e)}
\ No newline at end of file
+            return {'success': False, 'error': str(e), 'error_type': type(e).__name__,
+                    'retryable': is_retryable(e)}
+
+    def _call_growth_plan(self, prompt: str, operation: str) -> str:
+        try:
+            return self._call_model(prompt, operation, 'growth_plan', '', GROWTH_PLAN_CONFIG).text
+        except google_exceptions.InvalidArgument as e:
+            if 'response_mime_type' not in str(e) and 'response_schema' not in str(e):
+                raise
+            # Models without JSON mode reject the schema; the prompt still asks for JSON
+            logger.warning('%s rejected the growth plan schema, retrying with a plain prompt: %s',
+                           settings.GEMINI_MODEL, e)
+        return self._call_model(prompt, operation, 'growth_plan', '').text
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_gemini_client() -> GeminiClient:
+    """Return the process-wide client, creating it on first use"""
+    global _client, _client_pid
+    client = _client
+    if client is not None and _client_pid == os.getpid():
+        return client
+    with _client_lock:
+        # A client inherited across fork() shares the parent's gRPC channel, so never reuse it
+        if _client is None or _client_pid != os.getpid():
+            _client = GeminiClient()
+            _client_pid = os.getpid()
+        return _client
+
+
+def set_gemini_client(client: Optional[GeminiClient]):
+    """Replace the process-wide client, e.g. with a fake in tests. None resets it."""
+    global _client, _client_pid
+    with _client_lock:
+        _client = client
+        _client_pid = os.getpid() if client is not None else None
+
+
+def _reset_after_fork():
+    global _client, _client_pid, _client_lock
+    _client_lock = threading.Lock()
+    _client = None
+    _client_pid = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,77 @@
+from typing import Dict, Iterator, Optional
+from django.utils import timezone
+from ..models import BusinessProfile, MarketingContent
+from .gemini_client import get_gemini_client
+
+# Used for unauthenticated users and users without a business profile
+DEFAULT_BUSINESS_CONTEXT = {
+    'business_name': 'Small Business',
+    'business_type': 'general',
+    'description': 'Local business serving the community',
+    'target_audience': 'local customers',
+    'location': 'your area'
+}
+
+
+def build_business_context(business_profile: Optional[BusinessProfile]) -> Dict:
+    """Build the prompt context for a business, falling back to the generic one"""
+    if business_profile is None:
+        return dict(DEFAULT_BUSINESS_CONTEXT)
+    return {
+        'business_name': business_profile.business_name,
+        'business_type': business_profile.business_type,
+        'description': business_profile.description,
+        'target_audience': business_profile.target_audience,
+        'location': business_profile.location
+    }
+
+
+def generate_content(business_context: Dict, request_data: Dict) -> Dict:
+    """Run one validated ContentGenerationRequestSerializer payload through Gemini"""
+    return get_gemini_client().generate_marketing_content(
+        business_context,
+        request_data['content_type'],
+        request_data.get('platform', 'general'),
+        use_cache=not request_data.get('regenerate', False)
+    )
+
+
+def stream_content(business_context: Dict, request_data: Dict) -> Iterator[str]:
+    """Streaming counterpart of generate_content, yielding text chunks"""
+    return get_gemini_client().stream_marketing_content(
+        business_context,
+        request_data['content_type'],
+        request_data.get('platform', 'general'),
+        use_cache=not request_data.get('regenerate', False)
+    )
+
+
+def build_marketing_content(business_profile: BusinessProfile, request_data: Dict, content_text: str,
+                            **extra_metadata) -> MarketingContent:
+    """Build (but do not save) the MarketingContent row for a generation result"""
+    metadata = {
+        'tone': request_data.get('tone', 'professional'),
+        'theme': request_data.get('theme', ''),
+        'generated_at': timezone.now().isoformat()
+    }
+    metadata.update(extra_metadata)
+    return MarketingContent(
+        business=business_profile,
+        content_type=request_data['content_type'],
+        platform=request_data.get('platform', ''),
+        content_text=content_text,
+        metadata=metadata
+    )
+
+
+def degraded_metadata(result: Dict) -> Dict:
+    """Flag content produced by the local fallback so it can be regenerated later"""
+    return {'degraded': True} if result.get('degraded') else {}
+
+
+def save_generated_content(business_profile: BusinessProfile, request_data: Dict, result: Dict) -> MarketingContent:
+    """Persist a successful generation result for a business"""
+    content = build_marketing_content(business_profile, request_data, result['content'],
+                                      **degraded_metadata(result))
+    content.save()
+    return content
@@ -0,0 +1,189 @@
+import json
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Growth plans are requested as JSON constrained by PLAN_SCHEMA (an OpenAPI
+# subset, the form Gemini's response_schema takes). Output is still checked
+# here: the extractor finds the object in fenced or chatty text, and
+# validate_growth_plan reports what is wrong in words a repair prompt can use.
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+PLAN_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'weekly_themes': {'type': 'array', 'items': {'type': 'string'}},
+        'daily_actions': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'day': {'type': 'string', 'format': 'enum', 'enum': WEEKDAYS},
+                    'theme': {'type': 'string'},
+                    'platform': {'type': 'string'},
+                    'content_type': {'type': 'string'},
+                    'action': {'type': 'string'},
+                    'posting_time': {'type': 'string'},
+                },
+                'required': ['day', 'theme', 'platform', 'action'],
+            },
+        },
+        'platforms': {'type': 'array', 'items': {'type': 'string'}},
+        'metrics': {'type': 'array', 'items': {'type': 'string'}},
+    },
+    'required': ['weekly_themes', 'daily_actions', 'platforms'],
+}
+
+GENERATION_CONFIG = {'response_mime_type': 'application/json', 'response_schema': PLAN_SCHEMA}
+
+# Stored when the model's answer cannot be used even after a repair attempt
+FALLBACK_PLAN = {
+    'weekly_themes': ['Engagement', 'Promotion', 'Testimonials', 'Education', 'Community'],
+    'daily_actions': [],
+    'platforms': ['facebook', 'instagram'],
+}
+
+_TYPES = {
+    'object': dict,
+    'array': list,
+    'string': str,
+    'integer': int,
+    'number': (int, float),
+    'boolean': bool,
+}
+_TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+
+
+class PlanValidationError(ValueError):
+    """The model's growth plan could not be parsed or did not match PLAN_SCHEMA"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+class JSONObjectExtractor:
+    """
+    Incrementally finds the first complete top-level JSON object in text.
+
+    Feed it chunks as they arrive; it tracks brace depth outside strings,
+    so markdown fences, leading prose and trailing notes are skipped and
+    each chunk is scanned once. A balanced {...} that is not valid JSON
+    (prose in braces) is dropped and scanning resumes just inside it.
+    """
+
+    def __init__(self):
+        self._text = ''
+        self._position = 0
+        self._start: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.result: Optional[Dict] = None
+
+    def feed(self, chunk: str) -> Optional[Dict]:
+        if self.result is not None:
+            return self.result
+        self._text += chunk
+        text = self._text
+        position = self._position
+        while position < len(text):
+            char = text[position]
+            position += 1
+            if self._start is None:
+                if char == '{':
+                    self._start, self._depth = position - 1, 1
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = _loads(text[self._start:position])
+                    if isinstance(candidate, dict):
+                        self.result = candidate
+                        break
+                    # Not JSON after all: look for the next object from just after this brace
+                    position = self._start + 1
+                    self._start = None
+        self._position = position
+        return self.result
+
+
+def _loads(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        # The one slip models make most often
+        return json.loads(_TRAILING_COMMA_RE.sub(r'\1', text))
+    except ValueError:
+        return None
+
+
+def extract_json_object(chunks: Iterable[str]) -> Optional[Dict]:
+    extractor = JSONObjectExtractor()
+    for chunk in chunks:
+        if extractor.feed(chunk) is not None:
+            break
+    return extractor.result
+
+
+def schema_errors(value, schema: Dict, path: str = '$') -> List[str]:
+    """Errors for value against the PLAN_SCHEMA subset: type, properties, required, items and enum"""
+    expected = _TYPES[schema['type']]
+    if not isinstance(value, expected) or (isinstance(value, bool) and schema['type'] != 'boolean'):
+        return [f'{path} must be {"an" if schema["type"][0] in "aeiou" else "a"} {schema["type"]}']
+    if 'enum' in schema and value not in schema['enum']:
+        return [f'{path} must be one of {", ".join(schema["enum"])}']
+
+    errors = []
+    if schema['type'] == 'object':
+        errors += [f'{path}.{key} is required' for key in schema.get('required', []) if key not in value]
+        for key, property_schema in schema.get('properties', {}).items():
+            if key in value:
+                errors += schema_errors(value[key], property_schema, f'{path}.{key}')
+    elif schema['type'] == 'array' and 'items' in schema:
+        for index, item in enumerate(value):
+            errors += schema_errors(item, schema['items'], f'{path}[{index}]')
+    return errors
+
+
+def validate_growth_plan(plan) -> List[str]:
+    errors = schema_errors(plan, PLAN_SCHEMA)
+    if errors:
+        return errors
+    if not plan['platforms']:
+        errors.append('$.platforms must not be empty')
+    missing = [day for day in WEEKDAYS if day not in {action['day'] for action in plan['daily_actions']}]
+    if missing:
+        errors.append(f'$.daily_actions has no entry for {", ".join(missing)}')
+    return errors
+
+
+def parse_growth_plan(text: str) -> Tuple[Optional[Dict], List[str]]:
+    """The plan in text, normalised, and what is wrong with it (empty when valid)"""
+    plan = extract_json_object([text or ''])
+    if plan is None:
+        return None, ['the response contains no JSON object']
+    # Capitalised weekdays are not worth a repair call
+    for action in plan.get('daily_actions') or []:
+        if isinstance(action, dict) and isinstance(action.get('day'), str):
+            action['day'] = action['day'].strip().lower()
+    errors = validate_growth_plan(plan)
+    if errors:
+        return plan, errors
+    for action in plan['daily_actions']:
+        action['platform'] = action['platform'].lower()
+    plan['platforms'] = [platform.lower() for platform in plan['platforms']]
+    return plan, []
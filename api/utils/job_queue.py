@@ -0,0 +1,155 @@
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from ..models import BusinessProfile, GenerationJob, GrowthPlan
+from .generation import generate_content, save_generated_content
+from .plan_materializer import materialize_growth_plan
+
+
+def enqueue_generation_job(business_profile: Optional[BusinessProfile], request_data: Dict,
+                           business_context: Dict) -> GenerationJob:
+    """Queue a content generation request for the background workers"""
+    return GenerationJob.objects.create(
+        business=business_profile,
+        request_data=dict(request_data),
+        business_context=business_context
+    )
+
+
+def enqueue_plan_materialization(plan: GrowthPlan, start_date: date) -> GenerationJob:
+    """Queue a week of content for a growth plan, reusing a queued or running job for the same week"""
+    request_data = {'plan_id': str(plan.id), 'start_date': start_date.isoformat()}
+    with transaction.atomic():
+        job = GenerationJob.objects.select_for_update().filter(
+            kind=GenerationJob.KIND_MATERIALIZE_PLAN,
+            business=plan.business,
+            status__in=[GenerationJob.STATUS_QUEUED, GenerationJob.STATUS_RUNNING],
+            request_data=request_data,
+        ).first()
+        if job is None:
+            job = GenerationJob.objects.create(
+                kind=GenerationJob.KIND_MATERIALIZE_PLAN,
+                business=plan.business,
+                request_data=request_data,
+            )
+    return job
+
+
+def _claimable_jobs():
+    # Queued jobs, plus running jobs whose worker let the lease expire (crashed or hung)
+    return GenerationJob.objects.filter(
+        Q(status=GenerationJob.STATUS_QUEUED) |
+        Q(status=GenerationJob.STATUS_RUNNING, leased_until__lt=timezone.now()),
+        attempts__lt=settings.GENERATION_JOB_MAX_ATTEMPTS
+    )
+
+
+def claim_jobs(worker_id: str, limit: int, lease_seconds: Optional[int] = None) -> List[GenerationJob]:
+    """Lease up to `limit` jobs to a worker. Concurrent workers never claim the same job."""
+    if limit <= 0:
+        return []
+    lease = timedelta(seconds=lease_seconds or settings.GENERATION_JOB_LEASE_SECONDS)
+
+    with transaction.atomic():
+        job_ids = list(
+            _claimable_jobs()
+            .select_for_update(skip_locked=True)
+            .order_by('created_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not job_ids:
+            return []
+        GenerationJob.objects.filter(id__in=job_ids).update(
+            status=GenerationJob.STATUS_RUNNING,
+            worker_id=worker_id,
+            leased_until=timezone.now() + lease,
+            attempts=F('attempts') + 1
+        )
+
+    return list(
+        GenerationJob.objects.select_related('business')
+        .filter(id__in=job_ids, worker_id=worker_id)
+        .order_by('created_at')
+    )
+
+
+def fail_exhausted_jobs() -> int:
+    """Mark jobs whose lease expired on their final attempt as failed"""
+    return GenerationJob.objects.filter(
+        status=GenerationJob.STATUS_RUNNING,
+        leased_until__lt=timezone.now(),
+        attempts__gte=settings.GENERATION_JOB_MAX_ATTEMPTS
+    ).update(
+        status=GenerationJob.STATUS_FAILED,
+        error='Job lease expired too many times',
+        leased_until=None,
+        finished_at=timezone.now()
+    )
+
+
+def run_job(job: GenerationJob) -> GenerationJob:
+    """Execute a claimed job and record its outcome, if the worker still holds the lease"""
+    if job.kind == GenerationJob.KIND_MATERIALIZE_PLAN:
+        return _run_plan_materialization(job)
+    result = generate_content(job.business_context, job.request_data)
+    owned = GenerationJob.objects.filter(
+        id=job.id, worker_id=job.worker_id, status=GenerationJob.STATUS_RUNNING
+    )
+
+    if result['success']:
+        with transaction.atomic():
+            # Lock the row so a job whose lease expired mid-call is not completed twice
+            if not owned.select_for_update().exists():
+                return job
+            if job.business is not None:
+                job.content = save_generated_content(job.business, job.request_data, result)
+                result['content_id'] = str(job.content.id)
+            job.status = GenerationJob.STATUS_SUCCEEDED
+            job.result = result
+            job.error = ''
+            job.leased_until = None
+            job.finished_at = timezone.now()
+            job.save(update_fields=['content', 'status', 'result', 'error', 'leased_until', 'finished_at'])
+        return job
+
+    job.error = result.get('error') or 'Failed to generate content'
+    if job.attempts >= settings.GENERATION_JOB_MAX_ATTEMPTS:
+        job.status = GenerationJob.STATUS_FAILED
+        job.finished_at = timezone.now()
+    else:
+        job.status = GenerationJob.STATUS_QUEUED
+    job.leased_until = None
+    owned.update(
+        status=job.status,
+        error=job.error,
+        leased_until=None,
+        finished_at=job.finished_at
+    )
+    return job
+
+
+def _run_plan_materialization(job: GenerationJob) -> GenerationJob:
+    owned = GenerationJob.objects.filter(
+        id=job.id, worker_id=job.worker_id, status=GenerationJob.STATUS_RUNNING
+    )
+    plan = GrowthPlan.objects.select_related('business').filter(id=job.request_data['plan_id']).first()
+    if plan is None:
+        job.status = GenerationJob.STATUS_FAILED
+        job.error = 'Growth plan no longer exists'
+        job.finished_at = timezone.now()
+        job.leased_until = None
+        owned.update(status=job.status, error=job.error, leased_until=None, finished_at=job.finished_at)
+        return job
+
+    # Items that fail are listed in the result; posting again retries only those
+    summary = materialize_growth_plan(plan, start_date=date.fromisoformat(job.request_data['start_date']))
+    job.status = GenerationJob.STATUS_SUCCEEDED
+    job.result = dict(summary, plan_id=str(plan.id))
+    job.error = ''
+    job.leased_until = None
+    job.finished_at = timezone.now()
+    owned.update(status=job.status, result=job.result, error='', leased_until=None, finished_at=job.finished_at)
+    return job
@@ -0,0 +1,362 @@
+import atexit
+import glob
+import json
+import math
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from django.conf import settings
+from .profiling import record_llm_time
+from .prompt_templates import estimate_tokens
+
+# Metrics live in the process that records them. With METRICS_MULTIPROC_DIR
+# set, every process periodically writes a snapshot of its own values to
+# <dir>/<pid>-<start time>.json and a scrape sums the snapshots of all live
+# workers (deleting those of exited ones, even if the pid was reused), so the
+# /metrics endpoint reports the same totals whichever gunicorn worker serves
+# it. Counters and histograms are sums, so merging them is exact; a worker's
+# contribution is at most METRICS_FLUSH_INTERVAL seconds stale, idle or not:
+# an update that is not written straight away arms a timer that writes it.
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+_SNAPSHOT_RE = re.compile(r'^(\d+)-(\d+)\.json$')
+_started_at = str(time.time_ns())  # Fallback start time where /proc is unavailable; reset in forked children
+
+
+def _labels_key(values: Sequence[str]) -> str:
+    return json.dumps(list(values))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _process_start(pid: int) -> Optional[str]:
+    """Start time of pid in clock ticks since boot, from /proc (Linux), or None"""
+    try:
+        with open(f'/proc/{pid}/stat', encoding='utf-8') as stat:
+            # The command name in parentheses may contain spaces; fields after it are fixed
+            return stat.read().rpartition(')')[2].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+def _process_alive(pid: int, start: str) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    # A different process may have been given the same pid since
+    current = _process_start(pid)
+    return current is None or current == start
+
+
+def _format_number(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    type = ''
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, documentation: str, labelnames: Sequence[str]):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[str, object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> str:
+        return _labels_key([str(labels.get(name, '')) for name in self.labelnames])
+
+    def _label_text(self, key: str, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = list(zip(self.labelnames, json.loads(key))) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        self.registry.maybe_flush()
+
+    @staticmethod
+    def merge(total, value):
+        return (total or 0) + value
+
+    def render(self, values: Dict[str, object]) -> List[str]:
+        return [f'{self.name}{self._label_text(key)} {_format_number(value)}' for key, value in sorted(values.items())]
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames, buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            # Per-bucket (non-cumulative) counts, then sum and count
+            state = self.values.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0, 0])
+            index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+        self.registry.maybe_flush()
+
+    @staticmethod
+    def merge(total, value):
+        return list(value) if total is None else [a + b for a, b in zip(total, value)]
+
+    def render(self, values: Dict[str, object]) -> List[str]:
+        lines = []
+        for key, state in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), state):
+                cumulative += count
+                le = (('le', _format_number(bound)),)
+                lines.append(f'{self.name}_bucket{self._label_text(key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{self._label_text(key)} {_format_number(state[-2])}')
+            lines.append(f'{self.name}_count{self._label_text(key)} {state[-1]}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self, multiproc_dir: Optional[str] = None, flush_interval: float = 5):
+        self.multiproc_dir = multiproc_dir
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.metrics: Dict[str, Metric] = {}
+        self._last_flush = 0.0
+        self._timer: Optional[threading.Timer] = None
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def _register(self, metric: Metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self.lock:
+            return {name: json.loads(json.dumps(metric.values)) for name, metric in self.metrics.items()}
+
+    def reset(self):
+        with self.lock:
+            for metric in self.metrics.values():
+                metric.values.clear()
+
+    def _snapshot_path(self) -> str:
+        pid = os.getpid()
+        return os.path.join(self.multiproc_dir, f'{pid}-{_process_start(pid) or _started_at}.json')
+
+    def maybe_flush(self):
+        if not self.multiproc_dir:
+            return
+        wait = self._last_flush + self.flush_interval - time.monotonic()
+        if wait <= 0:
+            self.flush()
+            return
+        with self.lock:
+            if self._timer is None:
+                self._timer = threading.Timer(wait, self._flush_pending)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_pending(self):
+        with self.lock:
+            self._timer = None
+        self.flush()
+
+    def flush(self):
+        """Write this process's values where the other workers' scrapes can read them"""
+        if not self.multiproc_dir:
+            return
+        self._last_flush = time.monotonic()
+        path = self._snapshot_path()
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(self.multiproc_dir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as snapshot_file:
+                json.dump(self.snapshot(), snapshot_file)
+            os.replace(tmp_path, path)
+        except OSError:
+            # Metrics must never break a request
+            pass
+
+    def collect(self) -> Dict[str, Dict[str, object]]:
+        """Values summed over every live process that has written a snapshot, this one included"""
+        if not self.multiproc_dir:
+            return self.snapshot()
+        self.flush()
+        own_path = self._snapshot_path()
+        merged: Dict[str, Dict[str, object]] = {name: {} for name in self.metrics}
+        for path in glob.glob(os.path.join(self.multiproc_dir, '*.json')):
+            match = _SNAPSHOT_RE.match(os.path.basename(path))
+            if path != own_path and (match is None or not _process_alive(int(match.group(1)), match.group(2))):
+                # An exited worker's (or an old-format) snapshot would be counted forever
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path, encoding='utf-8') as snapshot_file:
+                    snapshot = json.load(snapshot_file)
+            except (OSError, ValueError):
+                continue
+            for name, values in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                for key, value in values.items():
+                    merged[name][key] = metric.merge(merged[name].get(key), value)
+        return merged
+
+    def render(self, collected: Optional[Dict[str, Dict[str, object]]] = None) -> str:
+        """Prometheus text exposition format"""
+        collected = self.collect() if collected is None else collected
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            lines.extend(metric.render(collected.get(name, {})))
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry(settings.METRICS_MULTIPROC_DIR, settings.METRICS_FLUSH_INTERVAL)
+
+LLM_LABELS = ('operation', 'content_type', 'platform')
+
+llm_requests = registry.counter(
+    'penyeza_llm_requests_total', 'LLM calls by outcome', LLM_LABELS + ('outcome',)
+)
+llm_errors = registry.counter(
+    'penyeza_llm_errors_total', 'Failed LLM calls by exception type', LLM_LABELS + ('exception',)
+)
+llm_latency = registry.histogram(
+    'penyeza_llm_latency_seconds', 'Wall-clock duration of LLM calls', LLM_LABELS
+)
+llm_prompt_chars = registry.counter('penyeza_llm_prompt_chars_total', 'Characters sent to the LLM', LLM_LABELS)
+llm_response_chars = registry.counter(
+    'penyeza_llm_response_chars_total', 'Characters received from the LLM', LLM_LABELS
+)
+llm_prompt_tokens = registry.counter('penyeza_llm_prompt_tokens_total', 'Prompt tokens sent to the LLM', LLM_LABELS)
+llm_response_tokens = registry.counter(
+    'penyeza_llm_response_tokens_total', 'Response tokens received from the LLM', LLM_LABELS
+)
+llm_cache_lookups = registry.counter(
+    'penyeza_llm_cache_lookups_total', 'Generated-content cache lookups by result',
+    ('content_type', 'platform', 'result')
+)
+
+llm_fallbacks = registry.counter(
+    'penyeza_llm_fallbacks_total', 'Requests served local fallback content while the circuit breaker was open',
+    ('content_type', 'platform')
+)
+
+
+def metric_labels(content_type: Optional[str], platform: Optional[str]) -> Dict[str, str]:
+    """Clamp label values to known sets so free-text platforms can't explode cardinality"""
+    content_type = (content_type or '').lower()
+    platform = (platform or '').lower()
+    return {
+        'content_type': content_type if content_type in settings.METRICS_CONTENT_TYPES else 'other',
+        'platform': platform if not platform or platform in settings.METRICS_PLATFORMS else 'other',
+    }
+
+
+def _usage_tokens(response, field: str) -> Optional[int]:
+    usage = getattr(response, 'usage_metadata', None)
+    count = getattr(usage, field, None) if usage is not None else None
+    return count if isinstance(count, int) else None
+
+
+def record_llm_call(operation: str, content_type: str, platform: str, prompt: str, duration: float,
+                    response=None, response_text: Optional[str] = None, error: Optional[BaseException] = None):
+    """Record one upstream call. Token counts come from the response's usage metadata when present."""
+    record_llm_time(duration)
+    labels = dict(metric_labels(content_type, platform), operation=operation)
+    llm_latency.observe(duration, **labels)
+    llm_prompt_chars.inc(len(prompt), **labels)
+    llm_prompt_tokens.inc(_usage_tokens(response, 'prompt_token_count') or estimate_tokens(prompt), **labels)
+
+    if error is not None:
+        llm_requests.inc(outcome='error', **labels)
+        llm_errors.inc(exception=type(error).__name__, **labels)
+        return
+
+    llm_requests.inc(outcome='success', **labels)
+    if response_text is None:
+        try:
+            response_text = response.text or ''
+        except Exception:
+            # Blocked or empty candidates make .text raise
+            response_text = ''
+    llm_response_chars.inc(len(response_text), **labels)
+    llm_response_tokens.inc(
+        _usage_tokens(response, 'candidates_token_count') or estimate_tokens(response_text), **labels
+    )
+
+
+def record_cache_lookup(content_type: str, platform: str, result: str):
+    """result is 'hit' (exact), 'similar' (near-duplicate) or 'miss'"""
+    llm_cache_lookups.inc(result=result, **metric_labels(content_type, platform))
+
+
+def record_fallback(content_type: str, platform: str):
+    llm_fallbacks.inc(**metric_labels(content_type, platform))
+
+
+def render_metrics() -> str:
+    """The registry in Prometheus text format, plus hit ratios derived from the summed lookups"""
+    collected = registry.collect()
+    lookups: Dict[Tuple[str, str], Dict[str, float]] = {}
+    for key, value in collected.get(llm_cache_lookups.name, {}).items():
+        content_type, platform, result = json.loads(key)
+        lookups.setdefault((content_type, platform), {}).setdefault(result, 0)
+        lookups[(content_type, platform)][result] += value
+
+    lines = [
+        '# HELP penyeza_llm_cache_hit_ratio Share of generated-content cache lookups that were hits',
+        '# TYPE penyeza_llm_cache_hit_ratio gauge',
+    ]
+    for (content_type, platform), results in sorted(lookups.items()):
+        total = sum(results.values())
+        ratio = (results.get('hit', 0) + results.get('similar', 0)) / total if total else 0
+        lines.append(
+            f'penyeza_llm_cache_hit_ratio{{content_type="{_escape(content_type)}",platform="{_escape(platform)}"}} '
+            f'{ratio:.4f}'
+        )
+    return registry.render(collected) + '\n'.join(lines) + '\n'
+
+
+def _reset_after_fork():
+    # A forked worker starts from zero; the parent's values stay in the parent's snapshot
+    global _started_at
+    _started_at = str(time.time_ns())
+    registry.lock = threading.Lock()
+    registry._timer = None  # Timer threads do not survive fork
+    registry.reset()
+
+
+atexit.register(registry.flush)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
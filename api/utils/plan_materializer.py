@@ -0,0 +1,184 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional
+from django.conf import settings
+from django.utils import timezone
+from ..models import GrowthPlan, MarketingContent
+from .concurrency import bounded_as_completed
+from .content_generator import ContentGenerator
+from .generation import build_business_context, build_marketing_content, degraded_metadata
+from .single_flight import coalesce
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+DEFAULT_PLAN_PLATFORMS = ['facebook', 'instagram', 'whatsapp']
+DEFAULT_PLAN_THEMES = ['Engagement', 'Promotion', 'Testimonials', 'Education', 'Community']
+
+
+def plan_item_key(plan: GrowthPlan, day: date, platform: str) -> str:
+    """Stable identifier of one planned item, stored in MarketingContent.metadata"""
+    # The calendar date, not the day offset, so each week gets its own items
+    return f'{plan.id}:{day.isoformat()}:{platform}'
+
+
+def _plan_platforms(plan: GrowthPlan) -> List[str]:
+    platforms = plan.target_platforms
+    if not platforms and isinstance(plan.weekly_plan, dict):
+        platforms = plan.weekly_plan.get('platforms')
+    return [str(p).lower() for p in (platforms or DEFAULT_PLAN_PLATFORMS)]
+
+
+def _day_actions(plan: GrowthPlan) -> Dict[str, List[Dict]]:
+    """The plan's daily_actions ({day, theme, platform, posting_time, ...}) grouped by weekday"""
+    actions = plan.weekly_plan.get('daily_actions') if isinstance(plan.weekly_plan, dict) else None
+    by_day: Dict[str, List[Dict]] = {}
+    for action in actions or plan.daily_actions or []:
+        if isinstance(action, dict) and isinstance(action.get('day'), str) and action.get('platform'):
+            by_day.setdefault(action['day'].strip().lower(), []).append(action)
+    return by_day
+
+
+def _day_theme(plan: GrowthPlan, day: int, weekday: str) -> str:
+    """Theme for a day without actions of its own, from older plan shapes or the weekly themes"""
+    weekly_plan = plan.weekly_plan if isinstance(plan.weekly_plan, dict) else {}
+
+    day_plan = weekly_plan.get(weekday) or weekly_plan.get(weekday.capitalize())
+    if isinstance(day_plan, dict):
+        day_plan = day_plan.get('theme') or day_plan.get('content_theme') or day_plan.get('focus')
+    if isinstance(day_plan, str) and day_plan:
+        return day_plan
+
+    themes = weekly_plan.get('weekly_themes') or DEFAULT_PLAN_THEMES
+    return str(themes[day % len(themes)])
+
+
+def _parse_time(label) -> Optional[time]:
+    for time_format in ('%I:%M %p', '%I:%M%p', '%I %p', '%I%p', '%H:%M'):
+        try:
+            return datetime.strptime(str(label).strip().upper(), time_format).time()
+        except ValueError:
+            continue
+    return None
+
+
+def _posting_time(generator: ContentGenerator, platform: str, label: Optional[str] = None) -> time:
+    # The plan's own time when it gave a usable one, else the platform's first optimal time
+    for candidate in ([label] if label else []) + list(generator._get_optimal_times(platform)):
+        parsed = _parse_time(candidate)
+        if parsed is not None:
+            return parsed
+    return time(9, 0)
+
+
+def _spec(plan: GrowthPlan, day_date: date, platform: str, theme: str, scheduled: time) -> Dict:
+    return {
+        'plan_item': plan_item_key(plan, day_date, platform),
+        'content_type': 'whatsapp' if platform == 'whatsapp' else 'social_post',
+        'platform': platform,
+        'theme': theme,
+        'tone': plan.messaging_tone or 'professional',
+        'scheduled_time': timezone.make_aware(datetime.combine(day_date, scheduled)),
+    }
+
+
+def derive_content_specs(plan: GrowthPlan, start_date: date, generator: ContentGenerator) -> List[Dict]:
+    """
+    One content spec per planned action, matched to its day by name. Days
+    the plan has no actions for get one spec per target platform.
+    """
+    by_day = _day_actions(plan)
+    specs = {}
+    for day in range(7):
+        day_date = start_date + timedelta(days=day)
+        weekday = WEEKDAYS[day_date.weekday()]
+        actions = by_day.get(weekday)
+        if actions:
+            for action in actions:
+                platform = str(action['platform']).lower()
+                theme = action.get('theme') or action.get('action') or _day_theme(plan, day, weekday)
+                spec = _spec(plan, day_date, platform, str(theme),
+                             _posting_time(generator, platform, action.get('posting_time')))
+                # Items are keyed per day and platform: the first action wins
+                specs.setdefault(spec['plan_item'], spec)
+            continue
+        theme = _day_theme(plan, day, weekday)
+        for platform in _plan_platforms(plan):
+            spec = _spec(plan, day_date, platform, theme, _posting_time(generator, platform))
+            specs.setdefault(spec['plan_item'], spec)
+    return list(specs.values())
+
+
+def materialize_growth_plan(plan: GrowthPlan, start_date: Optional[date] = None,
+                            batch_size: Optional[int] = None, max_workers: Optional[int] = None) -> Dict:
+    """
+    Generate and save a week of MarketingContent for a growth plan.
+
+    Items that already exist for the plan are skipped, so re-running after a
+    partial failure only pays for the missing LLM calls. Results are written in
+    batches while later items are still being generated. Concurrent runs for
+    the same plan and week share one run, and the (growth_plan, plan_item)
+    constraint stops any that slip past from saving an item twice.
+    """
+    start_date = start_date or timezone.localdate() + timedelta(days=1)
+    return coalesce(
+        f'materialize-plan:{plan.id}:{start_date.isoformat()}',
+        lambda: _materialize(plan, start_date, batch_size or settings.PLAN_MATERIALIZE_BATCH_SIZE, max_workers)
+    )
+
+
+def _materialize(plan: GrowthPlan, start_date: date, batch_size: int, max_workers: Optional[int]) -> Dict:
+    business = plan.business
+    business_context = build_business_context(business)
+    # Only the text and its hashtags and keywords are stored, so skip the structured extras
+    generator = ContentGenerator(structure=False)
+
+    specs = derive_content_specs(plan, start_date, generator)
+    existing = set(
+        MarketingContent.objects.filter(
+            growth_plan=plan,
+            plan_item__in=[spec['plan_item'] for spec in specs]
+        ).values_list('plan_item', flat=True)
+    )
+    pending = [spec for spec in specs if spec['plan_item'] not in existing]
+
+    def generate_spec(spec):
+        return generator.generate(business_context, spec['content_type'], spec['platform'], spec['theme'])
+
+    summary = {'created': 0, 'skipped': len(specs) - len(pending), 'failed': 0, 'errors': []}
+    batch = []
+
+    def flush():
+        # Hashtags and keywords go in metadata, from one analyzer pass over the batch
+        analyses = generator.analyzer.analyze_many([content.content_text for content in batch])
+        for content, analysis in zip(batch, analyses):
+            content.metadata.update(hashtags=analysis.hashtags, keywords=analysis.keywords)
+        # A row another run saved first is skipped, not duplicated
+        MarketingContent.objects.bulk_create(batch, ignore_conflicts=True)
+        created = MarketingContent.objects.filter(id__in=[content.id for content in batch]).count()
+        summary['created'] += created
+        summary['skipped'] += len(batch) - created
+        batch.clear()
+
+    outcomes = bounded_as_completed(generate_spec, pending, max_workers or settings.CONTENT_BATCH_MAX_WORKERS)
+    for spec, result, error in outcomes:
+        if error is None and not result['success']:
+            error = result.get('error')
+        if error is not None:
+            summary['failed'] += 1
+            summary['errors'].append({'plan_item': spec['plan_item'], 'error': str(error)})
+            continue
+
+        content = build_marketing_content(
+            business, spec, result['content'],
+            plan_id=str(plan.id),
+            plan_item=spec['plan_item'],
+            **degraded_metadata(result)
+        )
+        content.scheduled_time = spec['scheduled_time']
+        content.growth_plan = plan
+        content.plan_item = spec['plan_item']
+        batch.append(content)
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    return summary
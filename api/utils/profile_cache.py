@@ -0,0 +1,78 @@
+import copy
+from typing import Dict, Optional
+from django.conf import settings
+from django.core.cache import caches
+from penyeza.cache import LRUTTLCache
+from ..models import BusinessProfile
+from .generation import build_business_context
+
+# Per-process copies of (profile, prompt context). Profiles change rarely, so
+# entries live for BUSINESS_PROFILE_CACHE_TTL and are dropped by the
+# BusinessProfile save/delete signals. A version counter in the shared cache
+# lets a save in one worker invalidate the copies held by the others.
+_profiles = LRUTTLCache(settings.BUSINESS_PROFILE_CACHE_MAX_ENTRIES)
+_REQUEST_ATTR = '_business_profile_cache'
+
+
+def _version_key(user_id) -> str:
+    return f'business-profile-version:{user_id}'
+
+
+def _shared_cache():
+    return caches[settings.BUSINESS_PROFILE_CACHE_ALIAS]
+
+
+def _load(user_id) -> Dict:
+    version = _shared_cache().get(_version_key(user_id), 0)
+    entry = _profiles.get(user_id)
+    if entry is not None and entry['version'] == version:
+        return entry
+
+    profile = BusinessProfile.objects.filter(user_id=user_id).first()
+    entry = {
+        'version': version,
+        'profile': profile,
+        'context': build_business_context(profile),
+    }
+    _profiles.set(user_id, entry, settings.BUSINESS_PROFILE_CACHE_TTL)
+    return entry
+
+
+def _entry(user, request=None) -> Optional[Dict]:
+    if user is None or not user.is_authenticated:
+        return None
+    if request is not None:
+        entry = getattr(request, _REQUEST_ATTR, None)
+        if entry is None:
+            entry = _load(user.pk)
+            setattr(request, _REQUEST_ATTR, entry)
+        return entry
+    return _load(user.pk)
+
+
+def get_business_profile(user, request=None) -> Optional[BusinessProfile]:
+    """Return the user's BusinessProfile (or None) without hitting the DB on repeat calls"""
+    entry = _entry(user, request)
+    if entry is None or entry['profile'] is None:
+        return None
+    # Callers get their own copy so the cached instance is never mutated
+    return copy.copy(entry['profile'])
+
+
+def get_business_context(user, request=None) -> Dict:
+    """Return the prompt context for the user's business, or the default one"""
+    entry = _entry(user, request)
+    if entry is None:
+        return build_business_context(None)
+    return copy.deepcopy(entry['context'])
+
+
+def invalidate_business_profile(user_id):
+    _profiles.delete(user_id)
+    cache = _shared_cache()
+    key = _version_key(user_id)
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
@@ -0,0 +1,76 @@
+import contextvars
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Optional
+from django.db import connections
+
+
+class RequestProfile:
+    """Time and query counters for one request. Pool threads add to it, so updates are locked."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.llm_calls = 0
+        self.llm_time = 0.0
+        self._lock = threading.Lock()
+
+    def add_query(self, duration: float):
+        with self._lock:
+            self.db_queries += 1
+            self.db_time += duration
+
+    def add_llm_call(self, duration: float):
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_time += duration
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+_current = contextvars.ContextVar('request_profile', default=None)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current.get()
+
+
+@contextmanager
+def profile_request():
+    profile = RequestProfile()
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+
+
+def record_llm_time(duration: float):
+    profile = _current.get()
+    if profile is not None:
+        profile.add_llm_call(duration)
+
+
+@contextmanager
+def track_queries():
+    """Count queries on this thread's connections while a profiled request is active"""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            profile.add_query(time.perf_counter() - started)
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield
@@ -0,0 +1,267 @@
+import math
+import re
+import textwrap
+from string import Template
+from typing import Dict, List, NamedTuple, Sequence
+from django.conf import settings
+
+_SPACES_RE = re.compile(r'[ \t]+')
+_BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+
+def normalize_whitespace(text: str) -> str:
+    """Strip indentation and trailing spaces, collapse runs of spaces and blank lines"""
+    lines = [_SPACES_RE.sub(' ', line).strip() for line in text.strip().splitlines()]
+    return _BLANK_LINES_RE.sub('\n\n', '\n'.join(lines))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)"""
+    return math.ceil(len(text) / 4)
+
+
+def render_value(value) -> str:
+    """Canonical compact rendering of context values; dicts and lists never go through repr()"""
+    if value is None:
+        return ''
+    if isinstance(value, dict):
+        return '; '.join(
+            f'{key}: {render_value(item)}' for key, item in sorted(value.items()) if render_value(item)
+        )
+    if isinstance(value, (list, tuple, set)):
+        return ', '.join(rendered for rendered in (render_value(item) for item in value) if rendered)
+    return normalize_whitespace(str(value)).replace('\n', ' ')
+
+
+def truncate_words(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= 1:
+        return ''
+    cut = text[:max_chars - 1].rsplit(' ', 1)[0] or text[:max_chars - 1]
+    return cut.rstrip(' ,.;:') + '…'
+
+
+class RenderedPrompt(NamedTuple):
+    text: str
+    estimated_tokens: int
+    trimmed_fields: List[str]
+
+
+class PromptTemplate:
+    """
+    A prompt compiled once: indentation and whitespace are normalised at
+    compile time, fields are rendered compactly, and fields listed in
+    trim_order are shortened (in that order) until the prompt fits the
+    token budget.
+    """
+
+    def __init__(self, name: str, source: str, budget_tokens: int, trim_order: Sequence[str] = ()):
+        self.name = name
+        self.template = Template(normalize_whitespace(textwrap.dedent(source)))
+        self.budget_tokens = budget_tokens
+        self.trim_order = list(trim_order)
+
+    def render(self, **fields) -> RenderedPrompt:
+        values = {key: render_value(value) for key, value in fields.items()}
+        text = self._substitute(values)
+        trimmed = []
+
+        for field in self.trim_order:
+            overflow = estimate_tokens(text) - self.budget_tokens
+            if overflow <= 0:
+                break
+            current = values.get(field, '')
+            if not current:
+                continue
+            values[field] = truncate_words(current, max(len(current) - overflow * 4, 0))
+            trimmed.append(field)
+            text = self._substitute(values)
+
+        return RenderedPrompt(text, estimate_tokens(text), trimmed)
+
+    def _substitute(self, values: Dict[str, str]) -> str:
+        # Empty optional sections leave blank lines behind; normalise them away
+        return normalize_whitespace(self.template.safe_substitute(values))
+
+
+MARKETING_SOURCE = """
+    You are Penyeza AI Growth Agent, an expert marketing assistant for small businesses in Africa.
+
+    BUSINESS CONTEXT:
+    - Business Name: $business_name
+    - Business Type: $business_type
+    - Description: $description
+    - Target Audience: $target_audience
+    - Location: $location
+    $details
+
+    TASK: $task for $platform
+
+    REQUIREMENTS:
+    - Engaging and professional tone
+    - Culturally appropriate for African markets
+    - Action-oriented with clear call-to-action
+    - Optimized for the specific platform
+    - Includes relevant local context
+    - Mobile-friendly format
+
+    ADDITIONAL CONTEXT:
+    $instructions
+
+    FORMAT: Provide only the final content, ready to use. No explanations or notes.
+"""
+
+CONTENT_TYPE_TASKS = {
+    'social_post': 'Create a SOCIAL MEDIA POST',
+    'product_desc': 'Create a PRODUCT DESCRIPTION',
+    'ad_copy': 'Create AD COPY',
+    'video_script': 'Create a VIDEO SCRIPT',
+    'email': 'Create an EMAIL CAMPAIGN',
+    'whatsapp': 'Create a WHATSAPP MESSAGE',
+}
+
+# Context keys ContentGenerator uses to pass type-specific instructions
+INSTRUCTION_KEYS = ('platform_specific', 'ad_type', 'video_type', 'campaign_type', 'email_type')
+DEFAULT_INSTRUCTIONS = 'Create compelling content that drives engagement and sales.'
+
+PRODUCT_DETAIL_FIELDS = (
+    ('product_name', 'Product'),
+    ('product_features', 'Features'),
+    ('product_benefits', 'Benefits'),
+    ('target_customer', 'Target Customer'),
+)
+
+GROWTH_PLAN_SOURCE = """
+    Create a comprehensive weekly marketing growth plan for this African small business:
+
+    BUSINESS DETAILS:
+    - Name: $business_name
+    - Type: $business_type
+    - Description: $description
+    - Target Audience: $target_audience
+    - Location: $location
+
+    Create a 7-day marketing plan with:
+
+    DAY-BY-DAY ACTIVITIES:
+    - Monday: Content theme and specific actions
+    - Tuesday: Engagement strategies
+    - Wednesday: Promotional activities
+    - Thursday: Customer retention focus
+    - Friday: Weekend preparation
+    - Saturday: Peak engagement
+    - Sunday: Planning and analysis
+
+    PLATFORM STRATEGY:
+    - Primary platforms to focus on
+    - Content types for each platform
+    - Best posting times
+
+    PERFORMANCE METRICS:
+    - Key metrics to track
+    - Goals for the week
+    - Success indicators
+
+    Respond with a single JSON object and nothing else:
+    - weekly_themes: list of short theme names
+    - daily_actions: one entry per day with day (lowercase weekday), theme, platform, content_type, action
+      and posting_time
+    - platforms: primary platforms, lowercase
+    - metrics: key metrics and goals for the week
+    Focus on practical, actionable steps for African small businesses.
+"""
+
+GROWTH_PLAN_REPAIR_SOURCE = """
+    Your weekly marketing growth plan for $business_name could not be used:
+    $errors
+
+    Your previous response:
+    $previous
+
+    Return the corrected plan as a single JSON object with weekly_themes, daily_actions (one per weekday, each
+    with day, theme, platform, content_type, action and posting_time), platforms and metrics. Keep everything
+    that was already correct.
+"""
+
+# Longest, least essential fields are trimmed first
+MARKETING_TRIM_ORDER = ('description', 'details', 'instructions', 'target_audience')
+GROWTH_PLAN_TRIM_ORDER = ('description', 'target_audience')
+GROWTH_PLAN_REPAIR_TRIM_ORDER = ('previous',)
+
+
+def _compile_marketing_templates() -> Dict[str, PromptTemplate]:
+    budget = settings.PROMPT_TOKEN_BUDGETS['marketing']
+    templates = {
+        content_type: PromptTemplate(
+            f'marketing:{content_type}',
+            MARKETING_SOURCE.replace('$task', task),
+            budget,
+            MARKETING_TRIM_ORDER
+        )
+        for content_type, task in CONTENT_TYPE_TASKS.items()
+    }
+    templates[None] = PromptTemplate('marketing', MARKETING_SOURCE, budget, MARKETING_TRIM_ORDER)
+    return templates
+
+
+MARKETING_TEMPLATES = _compile_marketing_templates()
+GROWTH_PLAN_TEMPLATE = PromptTemplate(
+    'growth_plan', GROWTH_PLAN_SOURCE, settings.PROMPT_TOKEN_BUDGETS['growth_plan'], GROWTH_PLAN_TRIM_ORDER
+)
+GROWTH_PLAN_REPAIR_TEMPLATE = PromptTemplate(
+    'growth_plan_repair', GROWTH_PLAN_REPAIR_SOURCE, settings.PROMPT_TOKEN_BUDGETS['growth_plan_repair'],
+    GROWTH_PLAN_REPAIR_TRIM_ORDER
+)
+
+
+def _product_details(business_context: Dict) -> str:
+    lines = []
+    for key, label in PRODUCT_DETAIL_FIELDS:
+        value = render_value(business_context.get(key))
+        if value:
+            lines.append(f'- {label}: {value}')
+    return '\n'.join(lines)
+
+
+def render_marketing_prompt(business_context: Dict, content_type: str, platform: str) -> RenderedPrompt:
+    template = MARKETING_TEMPLATES.get(content_type)
+    if template is None:
+        template = MARKETING_TEMPLATES[None]
+        task = f'Create a {content_type.upper()}'
+    else:
+        task = None
+    instructions = ' '.join(
+        render_value(business_context[key]) for key in INSTRUCTION_KEYS if business_context.get(key)
+    )
+    fields = dict(
+        business_name=business_context.get('business_name') or 'Local Business',
+        business_type=business_context.get('business_type') or 'General',
+        description=business_context.get('description') or 'Serving local community',
+        target_audience=business_context.get('target_audience') or 'Local customers',
+        location=business_context.get('location') or 'Local area',
+        details=_product_details(business_context),
+        platform=(platform or 'general').upper(),
+        instructions=instructions or DEFAULT_INSTRUCTIONS,
+    )
+    if task is not None:
+        fields['task'] = task
+    return template.render(**fields)
+
+
+def render_growth_plan_prompt(business_profile_data: Dict) -> RenderedPrompt:
+    return GROWTH_PLAN_TEMPLATE.render(
+        business_name=business_profile_data.get('business_name'),
+        business_type=business_profile_data.get('business_type'),
+        description=business_profile_data.get('description'),
+        target_audience=business_profile_data.get('target_audience'),
+        location=business_profile_data.get('location'),
+    )
+
+
+def render_growth_plan_repair_prompt(business_profile_data: Dict, previous: str, errors: List[str]) -> RenderedPrompt:
+    return GROWTH_PLAN_REPAIR_TEMPLATE.render(
+        business_name=business_profile_data.get('business_name') or 'this business',
+        errors='\n'.join(f'- {error}' for error in errors[:10]),
+        previous=previous,
+    )
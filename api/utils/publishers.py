@@ -0,0 +1,70 @@
+import json
+import logging
+import threading
+from typing import Dict, Optional
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class PublishError(Exception):
+    """Raised by publishers. Non-retryable errors stop further attempts."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class BasePublisher:
+    """Posts approved MarketingContent to a platform. Must be thread-safe."""
+
+    def publish(self, content) -> Optional[str]:
+        """Publish content, returning the platform's post id if it has one"""
+        raise NotImplementedError
+
+
+class LogPublisher(BasePublisher):
+    """Logs each post and, if CONTENT_PUBLISH_LOG_PATH is set, appends it there as a JSON line"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path if path is not None else settings.CONTENT_PUBLISH_LOG_PATH
+        self._lock = threading.Lock()
+
+    def publish(self, content) -> Optional[str]:
+        record = {
+            'id': str(content.id),
+            'business': str(content.business_id),
+            'platform': content.platform,
+            'content_type': content.content_type,
+            'scheduled_time': content.scheduled_time.isoformat() if content.scheduled_time else None,
+            'published_at': timezone.now().isoformat(),
+            'content_text': content.content_text,
+        }
+        logger.info('Published %s to %s', content.id, content.platform or 'default')
+        if self.path:
+            with self._lock, open(self.path, 'a', encoding='utf-8') as log_file:
+                log_file.write(json.dumps(record) + '\n')
+        return None
+
+
+_publishers: Dict[str, BasePublisher] = {}
+_publishers_lock = threading.Lock()
+
+
+def get_publisher(platform: str) -> BasePublisher:
+    """Return the configured publisher for a platform, falling back to the default one"""
+    name = (platform or '').lower()
+    if name not in settings.CONTENT_PUBLISHERS:
+        name = 'default'
+    with _publishers_lock:
+        if name not in _publishers:
+            _publishers[name] = import_string(settings.CONTENT_PUBLISHERS[name])()
+        return _publishers[name]
+
+
+def reset_publishers():
+    """Forget instantiated publishers, e.g. after changing CONTENT_PUBLISHERS in tests"""
+    with _publishers_lock:
+        _publishers.clear()
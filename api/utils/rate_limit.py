@@ -0,0 +1,60 @@
+import math
+import time
+from typing import Tuple
+from django.core.cache import caches
+
+
+class SlidingWindowRateLimiter:
+    """
+    Sliding-window limiter over Django's cache. The current and previous fixed
+    windows are kept as atomic counters and the previous one is weighted by how
+    much of it still overlaps the sliding window.
+    """
+
+    def __init__(self, limit: int, window_seconds: int, cache_alias: str = 'default', prefix: str = 'ratelimit'):
+        self.limit = limit
+        self.window = window_seconds
+        self.cache_alias = cache_alias
+        self.prefix = prefix
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _key(self, identity: str, window_index: int) -> str:
+        return f'{self.prefix}:{identity}:{window_index}'
+
+    def hit(self, identity: str) -> Tuple[bool, int]:
+        """Count one request for identity. Returns (allowed, retry_after_seconds)."""
+        now = time.time()
+        window_index = int(now // self.window)
+        elapsed = now - window_index * self.window
+        current_key = self._key(identity, window_index)
+
+        # Counters outlive their window by one so they can act as the previous window
+        self.cache.add(current_key, 0, timeout=self.window * 2)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            # Evicted between add() and incr()
+            self.cache.add(current_key, 1, timeout=self.window * 2)
+            current = 1
+        previous = self.cache.get(self._key(identity, window_index - 1), 0)
+
+        overlap = (self.window - elapsed) / self.window
+        if previous * overlap + current <= self.limit:
+            return True, 0
+
+        # Rejected requests don't consume quota
+        self.cache.decr(current_key)
+        current -= 1
+        if current >= self.limit or not previous:
+            retry_after = self.window - elapsed
+        else:
+            # Wait until enough of the previous window has slid out
+            retry_after = (self.window - elapsed) - (self.limit - current - 1) * self.window / previous
+        return False, max(1, math.ceil(retry_after))
+
+    def reset(self, identity: str):
+        window_index = int(time.time() // self.window)
+        self.cache.delete_many([self._key(identity, window_index), self._key(identity, window_index - 1)])
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import threading
+from datetime import timedelta
+from typing import Dict, Optional
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+from penyeza.cache import LRUTTLCache
+
+
+class ResponseCache:
+    """
+    Two-tier cache for generated content: a per-process LRU in front of a
+    database table shared by every worker.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.memory = LRUTTLCache(max_entries or settings.GEMINI_CACHE_MAX_ENTRIES)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(prompt: str, **params) -> str:
+        """Hash the whitespace-normalised prompt together with the generation parameters"""
+        normalized_prompt = ' '.join(prompt.split())
+        payload = json.dumps({'prompt': normalized_prompt, 'params': params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def ttl_for(content_type: str) -> int:
+        return settings.GEMINI_CACHE_TTLS.get(content_type, settings.GEMINI_CACHE_DEFAULT_TTL)
+
+    def get(self, key: str) -> Optional[Dict]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count('memory_hits')
+            return value
+
+        from ..models import GeneratedContentCache
+
+        try:
+            entry = GeneratedContentCache.objects.filter(
+                cache_key=key,
+                expires_at__gt=timezone.now()
+            ).only('response', 'expires_at').first()
+        except DatabaseError:
+            # The persistent tier is best-effort; an unavailable table is just a miss
+            entry = None
+        if entry is None:
+            self._count('misses')
+            return None
+
+        self._count('db_hits')
+        remaining = int((entry.expires_at - timezone.now()).total_seconds())
+        if remaining > 0:
+            self.memory.set(key, entry.response, remaining)
+        return entry.response
+
+    def set(self, key: str, value: Dict, content_type: str, platform: str = ''):
+        ttl = self.ttl_for(content_type)
+        if ttl <= 0:
+            return
+
+        from ..models import GeneratedContentCache
+
+        self.memory.set(key, value, ttl)
+        try:
+            GeneratedContentCache.objects.update_or_create(
+                cache_key=key,
+                defaults={
+                    'content_type': content_type,
+                    'platform': platform or '',
+                    'response': value,
+                    'expires_at': timezone.now() + timedelta(seconds=ttl),
+                }
+            )
+        except DatabaseError:
+            # Losing a cache write must never fail the generation that produced it
+            pass
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from the persistent tier"""
+        from ..models import GeneratedContentCache
+
+        deleted, _ = GeneratedContentCache.objects.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
+
+    def clear(self):
+        self.memory.clear()
+        with self._lock:
+            self.memory_hits = self.db_hits = self.misses = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = self.memory_hits + self.db_hits
+            lookups = hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'db_hits': self.db_hits,
+                'misses': self.misses,
+                'hit_ratio': hits / lookups if lookups else 0.0,
+                'memory_entries': len(self.memory),
+            }
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,90 @@
+import time
+from collections import Counter
+from datetime import timedelta
+from typing import Dict, Optional
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from ..models import ContentGenerationDailyRollup, ContentGenerationRequest
+
+
+def _start_of_day(days_ago: int):
+    return timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days_ago)
+
+
+def _roll_up_batch(batch_size: int, cutoff) -> int:
+    while True:
+        try:
+            return _roll_up_locked_batch(batch_size, cutoff)
+        except IntegrityError:
+            # A concurrent run created one of the same rollups first; the retry adds to it instead
+            continue
+
+
+def _roll_up_locked_batch(batch_size: int, cutoff) -> int:
+    """Fold one batch of expired raw rows into the daily rollups and delete them atomically"""
+    with transaction.atomic():
+        # Rows another run has claimed are skipped, so concurrent runs never count a row twice
+        rows = list(
+            ContentGenerationRequest.objects.select_for_update(skip_locked=True)
+            .filter(created_at__lt=cutoff)
+            .order_by('created_at')
+            .values_list('id', 'ip_address', 'created_at')[:batch_size]
+        )
+        if not rows:
+            return 0
+
+        counts = Counter((timezone.localtime(created_at).date(), ip) for _, ip, created_at in rows)
+        existing = {
+            (rollup.day, rollup.ip_address): rollup
+            for rollup in ContentGenerationDailyRollup.objects.select_for_update().filter(
+                day__in={day for day, _ in counts},
+                ip_address__in={ip for _, ip in counts}
+            )
+        }
+
+        updated, created = [], []
+        for (day, ip), count in counts.items():
+            rollup = existing.get((day, ip))
+            if rollup is None:
+                created.append(ContentGenerationDailyRollup(day=day, ip_address=ip, request_count=count))
+            else:
+                rollup.request_count += count
+                updated.append(rollup)
+        ContentGenerationDailyRollup.objects.bulk_update(updated, ['request_count'])
+        ContentGenerationDailyRollup.objects.bulk_create(created)
+
+        ContentGenerationRequest.objects.filter(id__in=[row_id for row_id, _, _ in rows]).delete()
+        return len(rows)
+
+
+def compact_generation_requests(retention_days: Optional[int] = None, batch_size: Optional[int] = None,
+                                rollup_retention_days: Optional[int] = None, pause: float = 0.0) -> Dict:
+    """
+    Roll raw ContentGenerationRequest rows older than the retention period into
+    ContentGenerationDailyRollup and delete them. Work is done in short
+    transactions of batch_size rows so no long locks are held, and a crash
+    part-way through never double counts.
+    """
+    retention_days = settings.CONTENT_REQUEST_RETENTION_DAYS if retention_days is None else retention_days
+    batch_size = batch_size or settings.CONTENT_REQUEST_COMPACTION_BATCH_SIZE
+    if rollup_retention_days is None:
+        rollup_retention_days = settings.CONTENT_REQUEST_ROLLUP_RETENTION_DAYS
+    cutoff = _start_of_day(retention_days)
+
+    compacted = batches = 0
+    while True:
+        count = _roll_up_batch(batch_size, cutoff)
+        if not count:
+            break
+        compacted += count
+        batches += 1
+        if pause:
+            # Give replication and vacuum room between batches
+            time.sleep(pause)
+
+    expired_rollups, _ = ContentGenerationDailyRollup.objects.filter(
+        day__lt=_start_of_day(rollup_retention_days).date()
+    ).delete()
+
+    return {'compacted': compacted, 'batches': batches, 'expired_rollups': expired_rollups}
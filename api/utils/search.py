@@ -0,0 +1,67 @@
+import re
+import uuid
+from typing import List, Tuple
+from django.db import connection
+from ..models import BusinessProfile, MarketingContent
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _business_param(business: BusinessProfile):
+    # UUIDs are stored as 32-char hex on SQLite and natively on PostgreSQL
+    return MarketingContent._meta.get_field('business').get_db_prep_value(business.pk, connection)
+
+
+def _search_postgresql(business: BusinessProfile, query: str, limit: int) -> List[Tuple[uuid.UUID, float]]:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT id, ts_rank_cd(search_vector, query) AS rank
+            FROM api_marketingcontent, websearch_to_tsquery('english', %s) query
+            WHERE business_id = %s AND search_vector @@ query
+            ORDER BY rank DESC, created_at DESC
+            LIMIT %s
+            """,
+            [query, _business_param(business), limit]
+        )
+        return [(uuid.UUID(str(row_id)), rank) for row_id, rank in cursor.fetchall()]
+
+
+def _search_sqlite(business: BusinessProfile, query: str, limit: int) -> List[Tuple[uuid.UUID, float]]:
+    # Quote every term so user input can't inject FTS5 query syntax
+    terms = _TERM_RE.findall(query)
+    if not terms:
+        return []
+    match = ' '.join('"%s"' % term for term in terms)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.id, -bm25(api_marketingcontent_fts, 0.0, 2.0, 2.0, 1.0) AS rank
+            FROM api_marketingcontent_fts
+            JOIN api_marketingcontent c ON c.id = api_marketingcontent_fts.content_id
+            WHERE api_marketingcontent_fts MATCH %s AND c.business_id = %s
+            ORDER BY rank DESC, c.created_at DESC
+            LIMIT %s
+            """,
+            [match, _business_param(business), limit]
+        )
+        return [(uuid.UUID(str(row_id)), rank) for row_id, rank in cursor.fetchall()]
+
+
+def _search_fallback(business: BusinessProfile, query: str, limit: int) -> List[Tuple[uuid.UUID, float]]:
+    # Unindexed, unranked search for backends without a text index
+    queryset = MarketingContent.objects.filter(business=business)
+    for term in _TERM_RE.findall(query):
+        queryset = queryset.filter(content_text__icontains=term)
+    return [(row_id, 0.0) for row_id in queryset.order_by('-created_at').values_list('id', flat=True)[:limit]]
+
+
+def search_marketing_content(business: BusinessProfile, query: str, limit: int = 20) -> List[Tuple[uuid.UUID, float]]:
+    """Return (content id, rank) pairs for a business's content matching query, best first"""
+    if not query.strip():
+        return []
+    if connection.vendor == 'postgresql':
+        return _search_postgresql(business, query, limit)
+    if connection.vendor == 'sqlite':
+        return _search_sqlite(business, query, limit)
+    return _search_fallback(business, query, limit)
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import re
+import threading
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+from penyeza.cache import LRUTTLCache
+from .prompt_templates import INSTRUCTION_KEYS, PRODUCT_DETAIL_FIELDS, render_value
+from .response_cache import ResponseCache
+
+# Near-duplicate layer behind the exact response cache. Context that has to
+# match exactly (content type, platform, business type, location and the
+# type-specific instructions) picks a bucket; within a bucket, the free text
+# (description and audience) is compared by 64-bit SimHash. Each process
+# keeps an LSH index per bucket, loaded from SimilarContentCache and
+# reloaded every refresh_seconds to pick up other workers' entries.
+
+FINGERPRINT_BITS = 64
+NAME_PLACEHOLDER = '[[business_name]]'
+STOPWORDS = frozenset("""
+    a an and are as at be best by for from good great in is it its of on or our the to we with you your
+    very most more all every
+""".split())
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def text_features(text: str, exclude: Iterable[str] = ()) -> List[str]:
+    """Lowercased, stopword-free unigrams and bigrams; light plural folding"""
+    excluded = set(exclude)
+    words = [
+        word[:-1] if len(word) > 3 and word.endswith('s') else word
+        for word in _WORD_RE.findall(text.lower())
+        if word not in STOPWORDS and word not in excluded
+    ]
+    return words + [f'{first} {second}' for first, second in zip(words, words[1:])]
+
+
+def simhash(features: Iterable[str]) -> int:
+    counts = [0] * FINGERPRINT_BITS
+    for feature in features:
+        # blake2b, not hash(): fingerprints must agree across processes
+        value = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(FINGERPRINT_BITS):
+            counts[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, count in enumerate(counts) if count > 0)
+
+
+def similarity(a: int, b: int) -> float:
+    return 1 - (a ^ b).bit_count() / FINGERPRINT_BITS
+
+
+def _to_signed(value: int) -> int:
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class LSHIndex:
+    """
+    Banded SimHash index. Fingerprints within (bands - 1) differing bits of
+    each other are guaranteed to share a band, so they always come back as
+    candidates.
+    """
+
+    def __init__(self, bands: int = 16):
+        self.bands = bands
+        self.band_bits = FINGERPRINT_BITS // bands
+        self._tables: List[Dict[int, Set[int]]] = [{} for _ in range(bands)]
+        self.entries: Dict[int, Tuple[str, object]] = {}
+
+    def _band_keys(self, fingerprint: int) -> List[int]:
+        mask = (1 << self.band_bits) - 1
+        return [fingerprint >> (band * self.band_bits) & mask for band in range(self.bands)]
+
+    def add(self, fingerprint: int, content: str, expires_at):
+        self.entries[fingerprint] = (content, expires_at)
+        for table, key in zip(self._tables, self._band_keys(fingerprint)):
+            table.setdefault(key, set()).add(fingerprint)
+
+    def nearest(self, fingerprint: int, min_similarity: float) -> Optional[Tuple[str, float]]:
+        candidates = set()
+        for table, key in zip(self._tables, self._band_keys(fingerprint)):
+            candidates |= table.get(key, set())
+        now = timezone.now()
+        best = None
+        for candidate in candidates:
+            content, expires_at = self.entries[candidate]
+            score = similarity(fingerprint, candidate)
+            if score >= min_similarity and expires_at > now and (best is None or score > best[1]):
+                best = (content, score)
+        return best
+
+
+class SimilarContentCache:
+    def __init__(self):
+        config = settings.GEMINI_SIMILAR_CACHE
+        self.enabled = config['enabled']
+        self.min_similarity = config['min_similarity']
+        self.bands = config['bands']
+        self.max_entries_per_bucket = config['max_entries_per_bucket']
+        self.refresh_seconds = config['refresh_seconds']
+        self._buckets = LRUTTLCache(config['max_buckets'])
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def bucket_key(business_context: Dict, content_type: str, platform: str) -> str:
+        exact = {
+            'content_type': content_type,
+            'platform': (platform or '').lower(),
+            'business_type': render_value(business_context.get('business_type')).lower(),
+            'location': render_value(business_context.get('location')).lower(),
+            'instructions': [render_value(business_context.get(key)) for key in INSTRUCTION_KEYS],
+            'product': [render_value(business_context.get(key)) for key, _ in PRODUCT_DETAIL_FIELDS],
+        }
+        return hashlib.sha256(json.dumps(exact, sort_keys=True).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def fingerprint(business_context: Dict) -> int:
+        name_words = _WORD_RE.findall(render_value(business_context.get('business_name')).lower())
+        features = text_features(render_value(business_context.get('description')), exclude=name_words)
+        # Audience words are prefixed so they never pair up with description words
+        features += [f'audience:{feature}'
+                     for feature in text_features(render_value(business_context.get('target_audience')))]
+        return simhash(features)
+
+    def _index(self, bucket: str) -> LSHIndex:
+        from ..models import SimilarContentCache as SimilarContentCacheEntry
+
+        index = self._buckets.get(bucket)
+        if index is not None:
+            return index
+        # Load outside the lock so a slow query never blocks lookups in other buckets
+        try:
+            rows = list(
+                SimilarContentCacheEntry.objects
+                .filter(bucket=bucket, expires_at__gt=timezone.now())
+                .order_by('-created_at')
+                .values_list('fingerprint', 'content', 'expires_at')[:self.max_entries_per_bucket]
+            )
+        except DatabaseError:
+            rows = []
+        loaded = LSHIndex(self.bands)
+        for fingerprint, content, expires_at in rows:
+            loaded.add(_to_unsigned(fingerprint), content, expires_at)
+
+        with self._lock:
+            # Another thread may have loaded (and added to) the bucket meanwhile; keep its index
+            index = self._buckets.get(bucket)
+            if index is None:
+                index = loaded
+                self._buckets.set(bucket, index, self.refresh_seconds)
+            return index
+
+    def get(self, business_context: Dict, content_type: str, platform: str) -> Optional[Tuple[str, float]]:
+        """Personalised content and its similarity score, or None"""
+        if not self.enabled:
+            return None
+        bucket = self.bucket_key(business_context, content_type, platform)
+        index = self._index(bucket)
+        with self._lock:
+            match = index.nearest(self.fingerprint(business_context), self.min_similarity)
+        if match is None:
+            return None
+        content, score = match
+        name = render_value(business_context.get('business_name')) or 'our business'
+        return content.replace(NAME_PLACEHOLDER, name), score
+
+    def add(self, business_context: Dict, content_type: str, platform: str, content: str):
+        ttl = ResponseCache.ttl_for(content_type)
+        if not self.enabled or ttl <= 0 or not content:
+            return
+
+        from ..models import SimilarContentCache as SimilarContentCacheEntry
+
+        name = render_value(business_context.get('business_name'))
+        if name:
+            content = re.sub(re.escape(name), NAME_PLACEHOLDER, content, flags=re.IGNORECASE)
+        bucket = self.bucket_key(business_context, content_type, platform)
+        fingerprint = self.fingerprint(business_context)
+        expires_at = timezone.now() + timedelta(seconds=ttl)
+
+        index = self._index(bucket)
+        with self._lock:
+            index.add(fingerprint, content, expires_at)
+        try:
+            SimilarContentCacheEntry.objects.bulk_create([SimilarContentCacheEntry(
+                bucket=bucket,
+                fingerprint=_to_signed(fingerprint),
+                content_type=content_type,
+                platform=platform or '',
+                content=content,
+                expires_at=expires_at,
+            )], ignore_conflicts=True)
+        except DatabaseError:
+            # Best-effort, like the exact cache's persistent tier
+            pass
+
+    def purge_expired(self) -> int:
+        from ..models import SimilarContentCache as SimilarContentCacheEntry
+
+        deleted, _ = SimilarContentCacheEntry.objects.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
+
+    def clear(self):
+        self._buckets.clear()
+
+
+similar_cache = SimilarContentCache()
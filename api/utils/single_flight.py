@@ -0,0 +1,124 @@
+import hashlib
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Callable, Optional
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+LOCK_POLL_SECONDS = 0.1
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers for the key share its outcome"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: str, fn: Callable):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+def _advisory_lock_id(key: str) -> int:
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+@contextmanager
+def db_lock(key: str):
+    """
+    Cross-process lock on key. PostgreSQL uses a session advisory lock so no
+    transaction is held open while the caller works; other backends insert a
+    SingleFlightLock row, committed straight away, that lapses after
+    SINGLE_FLIGHT_LEASE_SECONDS if its holder dies. SQLite has no row locks
+    and would serialise every writer behind the caller, so it only gets the
+    in-process guarantee.
+    """
+    if connection.vendor == 'sqlite':
+        yield
+        return
+
+    if connection.vendor == 'postgresql':
+        lock_id = _advisory_lock_id(key)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_lock(%s)', [lock_id])
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [lock_id])
+        return
+
+    from ..models import SingleFlightLock
+
+    owner = uuid.uuid4().hex
+    lease = timedelta(seconds=settings.SINGLE_FLIGHT_LEASE_SECONDS)
+    while True:
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                SingleFlightLock.objects.create(key=key, owner=owner, expires_at=now + lease)
+            break
+        except IntegrityError:
+            pass
+        # Take over a lease whose holder died without releasing it
+        if SingleFlightLock.objects.filter(key=key, expires_at__lte=now).update(owner=owner,
+                                                                             expires_at=now + lease):
+            break
+        time.sleep(LOCK_POLL_SECONDS)
+    try:
+        yield
+    finally:
+        SingleFlightLock.objects.filter(key=key, owner=owner).delete()
+
+
+_group = SingleFlight()
+
+
+def coalesce(key: str, fn: Callable, recheck: Optional[Callable] = None):
+    """
+    Run fn once for all concurrent callers of key, within this process and
+    across workers. Callers that were blocked by another worker find its
+    persisted result through recheck() instead of calling fn again.
+    """
+    def leader():
+        with db_lock(key):
+            if recheck is not None:
+                found = recheck()
+                if found is not None:
+                    return found
+            return fn()
+
+    return _group.do(key, leader)
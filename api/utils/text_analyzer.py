@@ -0,0 +1,115 @@
+import re
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional
+
+# Post-processing for generated text. One tokenising pass over a response
+# yields everything ContentGenerator structures it into: hashtags, ranked
+# keywords, sentences, paragraphs and the headline.
+
+STOPWORDS = frozenset("""
+    a about above after again against all also am an and any are as at be because been before being below
+    between both but by can could did do does doing down during each few for from further get got had has
+    have having he her here hers herself him himself his how i if in into is it its itself just let like
+    me more most my myself no nor not now of off on once only or other our ours ourselves out over own
+    same she should so some such than that the their theirs them themselves then there these they this
+    those through to too under until up very was we were what when where which while who whom why will
+    with would you your yours yourself yourselves us
+""".split())
+
+# Alternatives are tried in order, so a paragraph break wins over a line
+# break and a hashtag over the word inside it.
+_TOKEN_RE = re.compile(r"""
+    (?P<paragraph>\n[^\S\n]*\n\s*)
+  | (?P<newline>\n)
+  | (?P<hashtag>\#\w+)
+  | (?P<word>[^\W\d_][\w'’-]*)
+  | (?P<end>[.!?]+(?=\s|$))
+""", re.VERBOSE)
+
+
+class TextAnalysis(NamedTuple):
+    hashtags: List[str]
+    keywords: List[str]
+    sentences: List[str]
+    paragraphs: List[str]
+    headline: str
+
+
+class TextAnalyzer:
+    """
+    Precompiled, stateless analyzer; one instance is shared by all threads.
+
+    Keywords are words of at least min_keyword_length letters that are not
+    stopwords, ranked by frequency and then by first appearance, so the
+    same text always gives the same list.
+    """
+
+    def __init__(self, max_hashtags: int = 10, max_keywords: int = 10, min_keyword_length: int = 4,
+                 max_headline_length: int = 100, stopwords: Iterable[str] = STOPWORDS):
+        self.max_hashtags = max_hashtags
+        self.max_keywords = max_keywords
+        self.min_keyword_length = min_keyword_length
+        self.max_headline_length = max_headline_length
+        self.stopwords: FrozenSet[str] = frozenset(stopwords)
+
+    def analyze(self, text: str) -> TextAnalysis:
+        text = text or ''
+        hashtags: Dict[str, None] = {}  # Ordered set
+        words = Counter()
+        sentences: List[str] = []
+        paragraphs: List[str] = []
+        headline_end: Optional[int] = None
+        sentence_start = paragraph_start = 0
+
+        for match in _TOKEN_RE.finditer(text):
+            kind = match.lastgroup
+            if kind == 'word':
+                word = match.group().lower().rstrip("-'’")
+                if len(word) >= self.min_keyword_length and word not in self.stopwords:
+                    words[word] += 1
+            elif kind == 'hashtag':
+                hashtags.setdefault(match.group(), None)
+            elif kind == 'end':
+                self._append(sentences, text, sentence_start, match.end())
+                sentence_start = match.end()
+            else:
+                if headline_end is None:
+                    headline_end = match.start()
+                if kind == 'paragraph':
+                    self._append(sentences, text, sentence_start, match.start())
+                    self._append(paragraphs, text, paragraph_start, match.start())
+                    sentence_start = paragraph_start = match.end()
+
+        self._append(sentences, text, sentence_start, len(text))
+        self._append(paragraphs, text, paragraph_start, len(text))
+
+        # Counter keeps insertion order, and sorted() is stable: ties stay in order of first use
+        keywords = sorted(words, key=words.__getitem__, reverse=True)
+        headline = text[:headline_end].strip() if headline_end is not None else text.strip()
+        return TextAnalysis(
+            hashtags=list(hashtags)[:self.max_hashtags],
+            keywords=keywords[:self.max_keywords],
+            sentences=sentences,
+            paragraphs=paragraphs,
+            headline=headline[:self.max_headline_length],
+        )
+
+    def analyze_many(self, texts: Iterable[str]) -> List[TextAnalysis]:
+        """Analyze texts in order; repeated texts (e.g. cached responses) are analyzed once"""
+        seen: Dict[str, TextAnalysis] = {}
+        results = []
+        for text in texts:
+            analysis = seen.get(text)
+            if analysis is None:
+                analysis = seen[text] = self.analyze(text)
+            results.append(analysis)
+        return results
+
+    @staticmethod
+    def _append(parts: List[str], text: str, start: int, end: int):
+        part = text[start:end].strip()
+        if part:
+            parts.append(part)
+
+
+text_analyzer = TextAnalyzer()
@@ -1,14 +1,39 @@
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce, Substr
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
-from .models import BusinessProfile, GrowthPlan, MarketingContent
+from django.utils.crypto import constant_time_compare
+from .models import BusinessProfile, GrowthPlan, MarketingContent, GenerationJob
 from .serializers import (
     BusinessProfileSerializer, GrowthPlanSerializer, 
-    MarketingContentSerializer, ContentGenerationRequestSerializer
+    MarketingContentSerializer, ContentGenerationRequestSerializer,
+    MarketingContentSummarySerializer, MarketingContentSearchResultSerializer, ContentSearchSerializer,
+    GenerationJobSerializer, BatchContentGenerationSerializer,
+    GrowthPlanMaterializeSerializer, MarketingContentBulkUpdateSerializer
 )
+from .pagination import MarketingContentCursorPagination
 from .permissions import FreeTierRateLimit
-from .utils.gemini_client import GeminiClient
+from .utils.gemini_client import get_gemini_client
+from .utils.concurrency import bounded_map
+from .utils.content_generator import ContentGenerator
+from .utils.generation import (
+    build_marketing_content, degraded_metadata, generate_content, stream_content, save_generated_content
+)
+from .utils.job_queue import enqueue_generation_job, enqueue_plan_materialization
+from .utils.metrics import render_metrics
+from .utils.profile_cache import get_business_context, get_business_profile
+from .utils.search import search_marketing_content
+from .utils.single_flight import coalesce
+from datetime import timedelta
+from typing import Dict, Optional
+import ipaddress
 import json
 
 class BusinessProfileView(generics.RetrieveUpdateAPIView):
@@ -26,42 +51,67 @@ class GrowthPlanView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
-        business_profile = BusinessProfile.objects.get(user=self.request.user)
-        plan, created = GrowthPlan.objects.get_or_create(
-            business=business_profile,
-            is_active=True
-        )
+        business_profile = get_business_profile(self.request.user, self.request)
+        if business_profile is None:
+            raise NotFound('Business profile not found')
+        plan = self._active_plan(business_profile)
+        if plan is None:
+            # Concurrent first requests share one AI call and one plan row
+            plan = coalesce(
+                f'growth-plan:{business_profile.id}',
+                lambda: self._create_plan(business_profile),
+                recheck=lambda: self._active_plan(business_profile)
+            )
+        return plan
+    
+    def _active_plan(self, business_profile):
+        return GrowthPlan.objects.filter(business=business_profile, is_active=True).first()
+    
+    def _create_plan(self, business_profile):
+        # Generate initial growth plan using AI
+        gemini = get_gemini_client()
+        plan_data = gemini.generate_growth_plan(get_business_context(self.request.user, self.request))
         
-        if created:
-            # Generate initial growth plan using AI
-            gemini = GeminiClient()
-            plan_data = gemini.generate_growth_plan({
-                'business_name': business_profile.business_name,
-                'business_type': business_profile.business_type,
-                'description': business_profile.description,
-                'target_audience': business_profile.target_audience,
-                'location': business_profile.location
-            })
-            
-            if plan_data['success']:
-                plan.weekly_plan = self._parse_ai_plan(plan_data['plan'])
-                plan.messaging_tone = 'friendly_professional'
-                plan.target_platforms = ['facebook', 'instagram', 'whatsapp']
+        plan = GrowthPlan(business=business_profile, is_active=True)
+        if plan_data['success']:
+            # Already parsed and validated against the plan schema (or the degraded fallback)
+            plan.weekly_plan = plan_data['plan']
+            plan.messaging_tone = 'friendly_professional'
+            plan.target_platforms = ['facebook', 'instagram', 'whatsapp']
+        try:
+            with transaction.atomic():
                 plan.save()
-        
+        except IntegrityError:
+            # Another worker without a shared lock created it first
+            plan = self._active_plan(business_profile)
         return plan
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def materialize_growth_plan_content(request):
+    """Generate the scheduled content for the active growth plan's week"""
+    serializer = GrowthPlanMaterializeSerializer(data=request.data)
     
-    def _parse_ai_plan(self, ai_response):
-        # Parse AI response into structured JSON
-        try:
-            return json.loads(ai_response)
-        except:
-            # Fallback structure if parsing fails
-            return {
-                "weekly_themes": ["Engagement", "Promotion", "Testimonials", "Education", "Community"],
-                "daily_actions": [],
-                "platforms": ["facebook", "instagram"]
-            }
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    plan = GrowthPlan.objects.select_related('business').filter(
+        business__user=request.user,
+        is_active=True
+    ).order_by('-created_at').first()
+    if plan is None:
+        return Response({'error': 'No active growth plan'}, status=status.HTTP_404_NOT_FOUND)
+    
+    # A week of LLM calls outlives the request, so a background worker runs it
+    start_date = serializer.validated_data.get('start_date') or timezone.localdate() + timedelta(days=1)
+    job = enqueue_plan_materialization(plan, start_date)
+    return Response({
+        'job_id': str(job.id),
+        'status': job.status,
+        'status_url': reverse('generation-job', kwargs={'job_id': job.id}, request=request),
+        'plan_id': str(plan.id),
+        'start_date': start_date.isoformat(),
+    }, status=status.HTTP_202_ACCEPTED)
 
 @api_view(['POST'])
 @permission_classes([FreeTierRateLimit])
@@ -71,86 +121,315 @@ def generate_marketing_content(request):
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    # Get business context for authenticated users
-    business_context = {}
-    if request.user.is_authenticated:
-        try:
-            business_profile = BusinessProfile.objects.get(user=request.user)
-            business_context = {
-                'business_name': business_profile.business_name,
-                'business_type': business_profile.business_type,
-                'description': business_profile.description,
-                'target_audience': business_profile.target_audience,
-                'location': business_profile.location
-            }
-        except BusinessProfile.DoesNotExist:
-            pass
-    
-    # Use default context for unauthenticated users
-    if not business_context:
-        business_context = {
-            'business_name': 'Small Business',
-            'business_type': 'general',
-            'description': 'Local business serving the community',
-            'target_audience': 'local customers',
-            'location': 'your area'
-        }
+    # Get business context for authenticated users; unauthenticated users get the default context
+    business_profile = get_business_profile(request.user, request)
+    business_context = get_business_context(request.user, request)
     
     # Generate content using Gemini AI
-    gemini = GeminiClient()
-    result = gemini.generate_marketing_content(
-        business_context,
-        serializer.validated_data['content_type'],
-        serializer.validated_data.get('platform', 'general')
-    )
+    result = generate_content(business_context, serializer.validated_data)
     
     if result['success']:
         # Save content for authenticated users
-        if request.user.is_authenticated:
-            try:
-                business_profile = BusinessProfile.objects.get(user=request.user)
-                content = MarketingContent.objects.create(
-                    business=business_profile,
-                    content_type=serializer.validated_data['content_type'],
-                    platform=serializer.validated_data.get('platform', ''),
-                    content_text=result['content'],
-                    metadata={
-                        'tone': serializer.validated_data.get('tone', 'professional'),
-                        'theme': serializer.validated_data.get('theme', ''),
-                        'generated_at': timezone.now().isoformat()
-                    }
-                )
-                result['content_id'] = str(content.id)
-            except BusinessProfile.DoesNotExist:
-                pass
+        if business_profile is not None:
+            content = save_generated_content(business_profile, serializer.validated_data, result)
+            result['content_id'] = str(content.id)
         
         return Response(result, status=status.HTTP_200_OK)
+    elif result.get('retryable'):
+        # Upstream is struggling rather than rejecting the request; tell clients to come back
+        return Response(
+            {'error': 'Content generation is temporarily unavailable', 'details': result['error']},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': str(settings.GEMINI_RETRY_AFTER_SECONDS)}
+        )
     else:
         return Response(
             {'error': 'Failed to generate content', 'details': result['error']},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def generate_marketing_content_batch(request):
+    """Generate several content items concurrently and save them in one query"""
+    serializer = BatchContentGenerationSerializer(data=request.data)
+    
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    business_profile = get_business_profile(request.user, request)
+    business_context = get_business_context(request.user, request)
+    items = serializer.validated_data['items']
+    regenerate_all = serializer.validated_data['regenerate']
+    # Structured afterwards, in one analyzer pass over the whole batch
+    generators = {use_cache: ContentGenerator(use_cache=use_cache, structure=False) for use_cache in (True, False)}
+    
+    def generate_item(item):
+        # regenerate applies to the whole batch or to single items
+        generator = generators[not (regenerate_all or item['regenerate'])]
+        return generator.generate(
+            business_context,
+            item['content_type'],
+            item.get('platform', ''),
+            item.get('theme', ''),
+            item.get('variant', '')
+        )
+    
+    outcomes = bounded_map(generate_item, items, settings.CONTENT_BATCH_MAX_WORKERS)
+    generated = generators[True].structure_many(items, [
+        result if error is None else {'success': False, 'error': str(error), 'content': None}
+        for result, error in outcomes
+    ])
+    
+    results = []
+    contents = []
+    for index, (item, result) in enumerate(zip(items, generated)):
+        result = dict(result, index=index)
+        if result['success'] and business_profile is not None:
+            content = build_marketing_content(business_profile, item, result['content'], **degraded_metadata(result))
+            result['content_id'] = str(content.id)
+            contents.append(content)
+        results.append(result)
+    
+    MarketingContent.objects.bulk_create(contents)
+    
+    succeeded = sum(1 for result in results if result['success'])
+    return Response({
+        'results': results,
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded
+    }, status=status.HTTP_200_OK if succeeded else status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def _sse_event(data: Dict, event: Optional[str] = None) -> str:
+    lines = [f'event: {event}'] if event else []
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+@api_view(['POST'])
+@permission_classes([FreeTierRateLimit])
+def stream_marketing_content(request):
+    """Stream generated content as server-sent events while the model produces it"""
+    serializer = ContentGenerationRequestSerializer(data=request.data)
+    
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    business_profile = get_business_profile(request.user, request)
+    business_context = get_business_context(request.user, request)
+    request_data = serializer.validated_data
+    
+    def event_stream():
+        chunks = []
+        try:
+            for chunk in stream_content(business_context, request_data):
+                chunks.append(chunk)
+                yield _sse_event({'delta': chunk})
+        except Exception as e:
+            yield _sse_event({'error': 'Failed to generate content', 'details': str(e)}, event='error')
+            return
+        
+        result = {
+            'success': True,
+            'content': ''.join(chunks).strip(),
+            'type': request_data['content_type'],
+            'platform': request_data.get('platform', 'general')
+        }
+        # Save once the stream is complete, exactly like the blocking endpoint
+        if business_profile is not None:
+            content = save_generated_content(business_profile, request_data, result)
+            result['content_id'] = str(content.id)
+        yield _sse_event(result, event='done')
+    
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop reverse proxies from buffering the stream
+    return response
+
+@api_view(['POST'])
+@permission_classes([FreeTierRateLimit])
+def enqueue_marketing_content(request):
+    """Queue a generation job and return its id without waiting for the LLM"""
+    serializer = ContentGenerationRequestSerializer(data=request.data)
+    
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    business_profile = get_business_profile(request.user, request)
+    
+    job = enqueue_generation_job(
+        business_profile,
+        serializer.validated_data,
+        get_business_context(request.user, request)
+    )
+    return Response({
+        'job_id': str(job.id),
+        'status': job.status,
+        'status_url': reverse('generation-job', kwargs={'job_id': job.id}, request=request)
+    }, status=status.HTTP_202_ACCEPTED)
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def generation_job_status(request, job_id):
+    try:
+        job = GenerationJob.objects.select_related('business').get(id=job_id)
+    except GenerationJob.DoesNotExist:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    # Jobs submitted by a business are only visible to its owner
+    if job.business is not None and job.business.user_id != request.user.id:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response(GenerationJobSerializer(job).data)
+
 class MarketingContentView(generics.ListCreateAPIView):
+    """List with ?view=summary to get a truncated preview instead of full bodies"""
     serializer_class = MarketingContentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = MarketingContentCursorPagination
+    
+    def is_summary(self):
+        return self.request.method == 'GET' and self.request.query_params.get('view') == 'summary'
+    
+    def get_serializer_class(self):
+        if self.is_summary():
+            return MarketingContentSummarySerializer
+        return MarketingContentSerializer
     
     def get_queryset(self):
-        business_profile = BusinessProfile.objects.get(user=self.request.user)
-        return MarketingContent.objects.filter(business=business_profile).order_by('-created_at')
+        business_profile = get_business_profile(self.request.user, self.request)
+        if business_profile is None:
+            return MarketingContent.objects.none()
+        queryset = MarketingContent.objects.filter(business=business_profile)
+        if self.is_summary():
+            queryset = queryset.defer('content_text', 'metadata').annotate(
+                preview=Substr('content_text', 1, settings.CONTENT_PREVIEW_LENGTH)
+            )
+        return queryset
     
     def perform_create(self, serializer):
-        business_profile = BusinessProfile.objects.get(user=self.request.user)
+        business_profile = get_business_profile(self.request.user, self.request)
+        if business_profile is None:
+            raise NotFound('Business profile not found')
         serializer.save(business=business_profile)
 
+class MarketingContentDetailView(generics.RetrieveAPIView):
+    serializer_class = MarketingContentSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    lookup_url_kwarg = 'content_id'
+    
+    def get_queryset(self):
+        business_profile = get_business_profile(self.request.user, self.request)
+        return MarketingContent.objects.filter(business=business_profile)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def search_marketing_content_view(request):
+    """Ranked full-text search over the caller's content text, theme and tone"""
+    serializer = ContentSearchSerializer(data=request.query_params)
+    
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    business_profile = get_business_profile(request.user, request)
+    if business_profile is None:
+        return Response({'results': []})
+    
+    ranked = search_marketing_content(
+        business_profile,
+        serializer.validated_data['q'],
+        serializer.validated_data['limit']
+    )
+    ranks = dict(ranked)
+    contents = {
+        content.id: content
+        for content in MarketingContent.objects.filter(id__in=ranks).defer('content_text', 'metadata').annotate(
+            preview=Substr('content_text', 1, settings.CONTENT_PREVIEW_LENGTH)
+        )
+    }
+    results = []
+    for content_id, rank in ranked:
+        content = contents.get(content_id)
+        if content is None:
+            # Deleted between ranking and fetching
+            continue
+        content.rank = rank
+        results.append(content)
+    return Response({'results': MarketingContentSearchResultSerializer(results, many=True).data})
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def approve_content(request, content_id):
     try:
-        business_profile = BusinessProfile.objects.get(user=request.user)
+        business_profile = get_business_profile(request.user, request)
         content = MarketingContent.objects.get(id=content_id, business=business_profile)
         content.is_approved = True
         content.save()
         return Response({'status': 'content approved'})
     except MarketingContent.DoesNotExist:
-        return Response({'error': 'Content not found'}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        return Response({'error': 'Content not found'}, status=status.HTTP_404_NOT_FOUND)
+
+def _bulk_patch_side_effects(patch: Dict) -> Dict:
+    """Fields the publishing state derives from the patched ones, set in the same UPDATE"""
+    extra = {}
+    if 'is_posted' in patch:
+        # Rows that were already posted keep their original time
+        extra['posted_at'] = Coalesce('posted_at', Value(timezone.now())) if patch['is_posted'] else None
+    if 'scheduled_time' in patch:
+        # A new time is a fresh schedule: retries and the last failure belong to the old one
+        extra.update(publish_attempts=0, next_publish_at=None, last_publish_error='')
+    return extra
+
+@api_view(['PATCH'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_update_content(request):
+    """Apply one field patch to many content items with a single UPDATE"""
+    serializer = MarketingContentBulkUpdateSerializer(data=request.data)
+    
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    ids = list(dict.fromkeys(serializer.validated_data['ids']))
+    patch = serializer.validated_data['patch']
+    
+    # Ownership is part of the UPDATE itself, so no rows or profile are loaded first
+    owned = MarketingContent.objects.filter(business__user=request.user, id__in=ids)
+    updated = owned.update(**patch, **_bulk_patch_side_effects(patch))
+    
+    # Only look up which ids matched when some of them didn't
+    if updated == len(ids):
+        found = set(ids)
+    elif updated:
+        found = set(owned.values_list('id', flat=True))
+    else:
+        found = set()
+    
+    return Response({
+        'updated': updated,
+        'results': [
+            {'id': str(content_id), 'status': 'updated' if content_id in found else 'not_found'}
+            for content_id in ids
+        ]
+    })
+
+
+def _internal_address(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in ipaddress.ip_network(network, strict=False) for network in settings.METRICS_ALLOWED_NETWORKS)
+
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint, summed across workers. Requires METRICS_TOKEN
+    as a bearer token if set; otherwise only staff users and
+    METRICS_ALLOWED_NETWORKS may scrape.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponse(status=401)
+    elif not (request.user.is_staff or _internal_address(request.META.get('REMOTE_ADDR', ''))):
+        return HttpResponse(status=403)
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     
     # Third party
     'rest_framework',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     'drf_yasg',
     
@@ -48,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ProfilingMiddleware',  # First, so it times everything below it
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add this for static files
     'corsheaders.middleware.CorsMiddleware',
@@ -111,7 +113,7 @@ AUTH_PASSWORD_VALIDATORS = [
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -145,7 +147,7 @@ CORS_ALLOW_CREDENTIALS = True
 
 # Security Settings for Production
 if not DEBUG:
-    SECURE_SSL_REDIRECT = True
+    SECURE_SSL_REDIRECT = env.bool('SECURE_SSL_REDIRECT', default=True)  # Off only for local plain-HTTP servers (benchmarks)
     SESSION_COOKIE_SECURE = True
     CSRF_COOKIE_SECURE = True
     SECURE_BROWSER_XSS_FILTER = True
@@ -162,10 +164,158 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'mediafiles')
 
 # Gemini AI Configuration
 GEMINI_API_KEY = env('GEMINI_API_KEY', default=os.environ.get('GEMINI_API_KEY', 'your-gemini-api-key'))
+GEMINI_MODEL = env('GEMINI_MODEL', default='gemini-pro')  # Models with JSON mode (e.g. gemini-1.5-flash) return growth plans as schema-checked JSON
+GEMINI_BACKEND = env('GEMINI_BACKEND', default='gemini')  # 'fake' uses the deterministic local backend
+GEMINI_FAKE = {
+    'latency': env('GEMINI_FAKE_LATENCY', default='lognormal'),  # fixed, uniform or lognormal
+    'latency_ms': env.float('GEMINI_FAKE_LATENCY_MS', default=800),  # Fixed value, uniform maximum or lognormal median
+    'latency_sigma': env.float('GEMINI_FAKE_LATENCY_SIGMA', default=0.5),
+    'failure_rate': env.float('GEMINI_FAKE_FAILURE_RATE', default=0.0),
+    'seed': env.int('GEMINI_FAKE_SEED', default=0),
+}
+
+# Request deadlines: gunicorn kills a worker whose request runs past its --timeout,
+# so everything a request waits on must finish well inside it
+GUNICORN_TIMEOUT = env.int('GUNICORN_TIMEOUT', default=30)  # Keep equal to gunicorn's --timeout
+REQUEST_BUDGET_SECONDS = env.float('REQUEST_BUDGET_SECONDS', default=GUNICORN_TIMEOUT - 5)
+GEMINI_REQUEST_BUDGET = env.float('GEMINI_REQUEST_BUDGET', default=REQUEST_BUDGET_SECONDS - 5)  # Rest is DB and I/O
+
+# Upstream call policy: per-attempt timeout, overall budget, retries and hedging
+GEMINI_CALL_POOL_SIZE = 32  # Threads per process for upstream calls; bounds concurrent calls to Gemini
+GEMINI_CALL_POLICY = {
+    'max_attempts': 3,
+    'attempt_timeout': env.float('GEMINI_ATTEMPT_TIMEOUT', default=12),  # Seconds per upstream call
+    'budget': GEMINI_REQUEST_BUDGET,  # Seconds for all attempts and backoff together
+    'backoff_base': 0.5,  # Retry delays are full-jitter exponential: up to base * 2**(attempt-1), capped at max
+    'backoff_max': 4,
+    'hedge': env.bool('GEMINI_HEDGE', default=False),  # Send a second request once a call passes the p95 latency
+    'hedge_percentile': 95,
+    'hedge_min_samples': 20,  # Latencies observed before hedging starts
+    'hedge_min_delay': 0.5,
+}
+GEMINI_CIRCUIT_BREAKER = {
+    'enabled': env.bool('GEMINI_CIRCUIT_BREAKER', default=True),
+    'window_seconds': 60,  # Outcomes considered when deciding to open
+    'min_calls': 10,
+    'failure_ratio': 0.5,  # Open when this share of calls in the window failed...
+    'slow_call_seconds': 15,
+    'slow_call_ratio': 0.8,  # ...or this share took at least slow_call_seconds
+    'open_seconds': 30,  # Serve fallback content this long before probing again
+    'half_open_probes': 2,  # Successful probes needed to close
+}
+GEMINI_RETRY_AFTER_SECONDS = 30  # Retry-After sent when generation fails for a transient upstream reason
+SINGLE_FLIGHT_LEASE_SECONDS = 90  # Cross-worker coalescing lock (non-PostgreSQL backends); outlasts a call's budget
+
+# Benchmarks (python manage.py run_benchmark)
+BENCHMARK_OUTPUT_DIR = os.path.join(BASE_DIR, 'benchmarks')
+
+# Cache (shared Redis/Memcached in production so all workers see the same counters)
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+# manage.py check --deploy fails on local-memory caches for shared state unless this is set (single process only)
+LOCAL_CACHE_ALLOWED = env.bool('LOCAL_CACHE_ALLOWED', default=DEBUG)
 
 # Rate limiting for free tier
 FREE_TIER_LIMIT = 2
 FREE_TIER_WINDOW_HOURS = 24
+RATE_LIMIT_CACHE_ALIAS = 'default'
+FREE_TIER_AUDIT_ASYNC = True  # Write the ContentGenerationRequest audit log from a background thread
+CONTENT_REQUEST_RETENTION_DAYS = 30  # Raw audit rows older than this are rolled up per day and IP
+CONTENT_REQUEST_ROLLUP_RETENTION_DAYS = 365
+CONTENT_REQUEST_COMPACTION_BATCH_SIZE = 5000
+
+# Generated content cache (seconds per content type, 0 disables caching)
+GEMINI_CACHE_MAX_ENTRIES = 512
+GEMINI_CACHE_DEFAULT_TTL = 60 * 60
+GEMINI_CACHE_TTLS = {
+    'social_post': 6 * 60 * 60,
+    'product_desc': 7 * 24 * 60 * 60,
+    'ad_copy': 24 * 60 * 60,
+    'video_script': 24 * 60 * 60,
+    'email': 24 * 60 * 60,
+    'whatsapp': 6 * 60 * 60,
+}
+# Reuse of content generated for near-identical business context (same type,
+# location, platform and instructions; description/audience compared by SimHash)
+GEMINI_SIMILAR_CACHE = {
+    'enabled': env.bool('GEMINI_SIMILAR_CACHE', default=True),
+    'min_similarity': env.float('GEMINI_SIMILAR_CACHE_THRESHOLD', default=0.9),  # Share of matching fingerprint bits
+    'bands': 16,  # LSH bands; near matches within bands - 1 bits are always found
+    'max_entries_per_bucket': 500,
+    'refresh_seconds': 60,  # How often a worker reloads a bucket to see other workers' entries
+    'max_buckets': 1024,
+}
+
+# LLM call metrics, exported at /metrics
+METRICS_MULTIPROC_DIR = env('METRICS_MULTIPROC_DIR', default='')  # Shared dir for per-worker snapshots (gunicorn)
+METRICS_FLUSH_INTERVAL = 5  # Seconds between a worker's snapshot writes
+METRICS_TOKEN = env('METRICS_TOKEN', default='')  # Bearer token required to scrape, if set
+# Without a token only staff users and these addresses (REMOTE_ADDR, so a reverse proxy's own address counts) may scrape
+METRICS_ALLOWED_NETWORKS = env.list('METRICS_ALLOWED_NETWORKS', default=['127.0.0.1/32', '::1/128'])
+METRICS_CONTENT_TYPES = ['social_post', 'product_desc', 'ad_copy', 'video_script', 'email', 'whatsapp', 'growth_plan']
+METRICS_PLATFORMS = ['facebook', 'instagram', 'twitter', 'linkedin', 'tiktok', 'whatsapp', 'youtube', 'email',
+                     'general']
+
+# Request profiling (Server-Timing header and one log line per sampled request)
+PROFILING_SAMPLE_RATE = env.float('PROFILING_SAMPLE_RATE', default=0.1)  # Share of requests profiled, 0 disables
+PROFILING_SERVER_TIMING = True
+PROFILING_QUERY_BUDGET = 10  # Sampled requests over either budget are logged as warnings
+PROFILING_LATENCY_BUDGET_MS = 2000
+
+# Prompt templates: estimated token budget per template; oversize fields are trimmed to fit
+PROMPT_TOKEN_BUDGETS = {
+    'marketing': 600,
+    'growth_plan': 800,
+    'growth_plan_repair': 1500,  # Includes the previous response, trimmed to fit
+}
+
+# Scheduled posting
+CONTENT_PUBLISHERS = {
+    # Platform name -> publisher class; 'default' handles every other platform
+    'default': 'api.utils.publishers.LogPublisher',
+}
+CONTENT_PUBLISH_LOG_PATH = env('CONTENT_PUBLISH_LOG_PATH', default='')  # JSON lines written by LogPublisher
+CONTENT_DISPATCH_BATCH_SIZE = 500
+CONTENT_DISPATCH_CONCURRENCY = 8  # Concurrent publisher calls per dispatcher
+CONTENT_DISPATCH_LEASE_SECONDS = 300
+CONTENT_DISPATCH_POLL_SECONDS = 5.0
+CONTENT_PUBLISH_MAX_ATTEMPTS = 5
+CONTENT_PUBLISH_RETRY_BASE_SECONDS = 60
+CONTENT_PUBLISH_RETRY_MAX_SECONDS = 60 * 60
+
+# Business profile cache (invalidated on BusinessProfile save/delete)
+BUSINESS_PROFILE_CACHE_TTL = 10 * 60
+BUSINESS_PROFILE_CACHE_MAX_ENTRIES = 2048
+BUSINESS_PROFILE_CACHE_ALIAS = 'default'  # Holds the version counters; must be shared by all workers
+
+# Users resolved by CachedJWTAuthentication (per process, invalidated on save)
+AUTH_USER_CACHE_TTL = 60
+AUTH_USER_CACHE_MAX_ENTRIES = 4096
+AUTH_USER_CACHE_ALIAS = 'default'  # Holds the version counters; must be shared by all workers
+
+# Token revocation: each worker checks a Bloom filter of revoked JTIs and
+# only queries RevokedToken when it reports a possible match
+TOKEN_REVOCATION = {
+    'sync_seconds': 15,  # Longest delay before other workers see a logout
+    'sync_overlap_seconds': 60,  # Re-read window for revocations that commit late
+    'rebuild_seconds': 60 * 60,  # Full reload, dropping purged entries
+    'min_capacity': 10000,
+    'error_rate': 0.001,  # Bloom false positive rate, each costing one query
+}
+
+# Background generation jobs
+GENERATION_JOB_LEASE_SECONDS = 120  # Visibility timeout before a running job is retried
+GENERATION_JOB_MAX_ATTEMPTS = 3
+GENERATION_WORKER_CONCURRENCY = 4
+GENERATION_WORKER_POLL_SECONDS = 1.0
+
+# Content generation and listing
+CONTENT_BATCH_MAX_ITEMS = 12
+CONTENT_BATCH_MAX_WORKERS = 4  # Concurrent LLM calls per batch request
+PLAN_MATERIALIZE_BATCH_SIZE = 10  # Rows per bulk_create when materialising a growth plan
+CONTENT_PREVIEW_LENGTH = 160  # Characters of content_text in summary list rows
+CONTENT_BULK_UPDATE_MAX_IDS = 500
 
 # Internationalization
 LANGUAGE_CODE = 'en-us'
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
+from .models import CustomUser, RevokedToken
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
@@ -22,4 +22,11 @@ class CustomUserAdmin(UserAdmin):
             'classes': ('wide',),
             'fields': ('email', 'password1', 'password2', 'first_name', 'last_name', 'phone_number'),
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    list_display = ('jti', 'token_type', 'user', 'revoked_at', 'expires_at')
+    list_filter = ('token_type',)
+    search_fields = ('jti', 'user__email')
+    raw_id_fields = ('user',)
@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from penyeza.cache import LRUTTLCache
+from .revocation import revocation_store
+
+# Per-process copies of the user rows JWT authentication needs, keyed by
+# (user id, auth version). Saving or deleting a CustomUser (deactivation,
+# password change, profile edits) bumps the version in the shared cache, so
+# every worker's copy goes stale at once. Writes that bypass save(), such
+# as QuerySet.update(), must call invalidate_cached_user themselves.
+_users = LRUTTLCache(settings.AUTH_USER_CACHE_MAX_ENTRIES)
+
+
+def _version_key(user_id) -> str:
+    return f'auth-user-version:{user_id}'
+
+
+def _shared_cache():
+    return caches[settings.AUTH_USER_CACHE_ALIAS]
+
+
+def _cached_fields(model):
+    # The password hash never sits in the cache; the instance loads it on access
+    return [field.attname for field in model._meta.concrete_fields if field.attname != 'password']
+
+
+def invalidate_cached_user(user_id):
+    cache = _shared_cache()
+    key = _version_key(user_id)
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user from a short-lived
+    cache instead of a SELECT per request. A miss loads the row once. Each
+    request gets its own instance built with Model.from_db, with the
+    password deferred, so callers can modify and save it as usual.
+    Revoked (logged out) tokens are rejected.
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if revocation_store.is_revoked(validated_token.get(api_settings.JTI_CLAIM)):
+            raise InvalidToken(_('Token has been revoked'))
+        return validated_token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        entry = self._load(user_id)
+        if entry is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        fields, values, password_hash = entry
+        user = self.user_model.from_db(router.db_for_read(self.user_model), fields, values)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_hash:
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user
+
+    def _load(self, user_id):
+        key = (str(user_id), _shared_cache().get(_version_key(user_id), 0))
+        entry = _users.get(key)
+        if entry is not None:
+            return entry
+
+        fields = _cached_fields(self.user_model)
+        row = (
+            self.user_model.objects
+            .filter(**{api_settings.USER_ID_FIELD: user_id})
+            .values_list(*fields, 'password')
+            .first()
+        )
+        if row is None:
+            return None
+        entry = (fields, row[:-1], get_md5_hash_password(row[-1]))
+        _users.set(key, entry, settings.AUTH_USER_CACHE_TTL)
+        return entry
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from users.revocation import purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Delete token revocations and outstanding refresh tokens whose tokens have expired'
+
+    def handle(self, *args, **options):
+        summary = purge_expired_tokens()
+        self.stdout.write(
+            f"Deleted {summary['revoked']} expired revocations and {summary['outstanding']} outstanding tokens"
+        )
@@ -46,4 +46,21 @@ class CustomUser(AbstractUser):
     class Meta:
         db_table = 'users_customuser'
         verbose_name = 'User'
-        verbose_name_plural = 'Users'
\ No newline at end of file
+        verbose_name_plural = 'Users'
+
+class RevokedToken(models.Model):
+    """A logged-out access or refresh token, kept until it would have expired anyway"""
+    TOKEN_TYPES = [
+        ('access', 'Access'),
+        ('refresh', 'Refresh'),
+    ]
+
+    jti = models.CharField(max_length=255, unique=True)
+    token_type = models.CharField(max_length=10, choices=TOKEN_TYPES)
+    user = models.ForeignKey(CustomUser, null=True, blank=True, on_delete=models.CASCADE,
+                             related_name='revoked_tokens')
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f'{self.token_type} {self.jti}'
@@ -0,0 +1,162 @@
+import hashlib
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Callable, Dict, Iterable, Optional
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
+from .models import RevokedToken
+
+# Every authenticated request asks whether its token was revoked. Each worker
+# answers from a Bloom filter of revoked JTIs: "no" is certain and costs a
+# couple of microseconds, "maybe" is confirmed against RevokedToken. The
+# filter picks up other workers' revocations every sync_seconds (one
+# indexed range query) and is rebuilt every rebuild_seconds, or when it
+# fills up, so purged entries fall out. Each sync re-reads the last
+# sync_overlap_seconds of revoked_at, so a revocation whose transaction
+# committed after a later one is still seen; adding a JTI twice is harmless.
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        # Double hashing: k positions from one 128-bit digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * step) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & 1 << (position & 7) for position in self._positions(item))
+
+
+class RevocationStore:
+    def __init__(self, sync_seconds: float = 15, rebuild_seconds: float = 3600, min_capacity: int = 10000,
+                 error_rate: float = 0.001, sync_overlap_seconds: float = 60,
+                 clock: Callable[[], float] = time.monotonic):
+        self.sync_seconds = sync_seconds
+        self.sync_overlap = timedelta(seconds=sync_overlap_seconds)
+        self.rebuild_seconds = rebuild_seconds
+        self.min_capacity = min_capacity
+        self.error_rate = error_rate
+        self.clock = clock
+        self.reset()
+
+    @classmethod
+    def from_settings(cls) -> 'RevocationStore':
+        return cls(**settings.TOKEN_REVOCATION)
+
+    def reset(self):
+        """Forget everything; the next check reloads from the table"""
+        self._lock = threading.Lock()
+        self._filter = BloomFilter(self.min_capacity, self.error_rate)
+        self._synced_since: Optional[datetime] = None
+        self._synced_at = self._rebuilt_at = None
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti:
+            return False
+        self._maybe_sync()
+        if jti not in self._filter:
+            return False
+        # A match may be a false positive
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def revoke(self, token: Token, user_id=None) -> bool:
+        """Record token as revoked until it expires; False if it already was"""
+        jti = token[api_settings.JTI_CLAIM]
+        _, created = RevokedToken.objects.get_or_create(jti=jti, defaults={
+            'token_type': token.get(api_settings.TOKEN_TYPE_CLAIM, ''),
+            'user_id': user_id,
+            'expires_at': datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc),
+        })
+        # Effective in this worker at once, in the others after their next sync
+        self._filter.add(jti)
+        return created
+
+    def sync(self, rebuild: bool = False):
+        with self._lock:
+            self._sync(rebuild)
+
+    def _maybe_sync(self):
+        now = self.clock()
+        if self._synced_at is not None and now - self._synced_at < self.sync_seconds:
+            return
+        # One thread syncs; the rest carry on with the current filter
+        if self._lock.acquire(blocking=False):
+            try:
+                self._sync(self._rebuilt_at is None or now - self._rebuilt_at >= self.rebuild_seconds)
+            finally:
+                self._lock.release()
+
+    def _sync(self, rebuild: bool):
+        # Taken before the query, so rows revoked while it runs are read again next time
+        started = timezone.now()
+        try:
+            if not rebuild and self._synced_since is not None:
+                jtis = list(RevokedToken.objects.filter(
+                    revoked_at__gte=self._synced_since - self.sync_overlap
+                ).values_list('jti', flat=True))
+                # A full filter would drift past its false positive rate
+                rebuild = self._filter.count + len(jtis) > self._filter.capacity
+            else:
+                rebuild = True
+            if rebuild:
+                self._rebuild(started)
+                return
+        except DatabaseError:
+            # Keep answering from the filter we have; try again next interval
+            self._synced_at = self.clock()
+            return
+        self._add_all(self._filter, jtis)
+        self._synced_since = started
+        self._synced_at = self.clock()
+
+    def _rebuild(self, started: datetime):
+        live = RevokedToken.objects.filter(expires_at__gt=started)
+        bloom = BloomFilter(max(self.min_capacity, live.count() * 2), self.error_rate)
+        self._add_all(bloom, live.values_list('jti', flat=True).iterator())
+        self._filter = bloom
+        self._synced_since = started
+        self._synced_at = self._rebuilt_at = self.clock()
+
+    @staticmethod
+    def _add_all(bloom: BloomFilter, jtis: Iterable[str]):
+        for jti in jtis:
+            # The overlap re-reads rows; only count new ones towards capacity
+            if jti not in bloom:
+                bloom.add(jti)
+
+
+def purge_expired_tokens() -> Dict[str, int]:
+    """Delete revocations and simplejwt outstanding tokens for tokens that have expired anyway"""
+    from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+    now = timezone.now()
+    revoked, _ = RevokedToken.objects.filter(expires_at__lte=now).delete()
+    # Their BlacklistedToken rows go with them
+    _, deleted = OutstandingToken.objects.filter(expires_at__lte=now).delete()
+    return {'revoked': revoked, 'outstanding': deleted.get(OutstandingToken._meta.label, 0)}
+
+
+revocation_store = RevocationStore.from_settings()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=revocation_store.reset)
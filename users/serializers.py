@@ -1,6 +1,12 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .revocation import revocation_store
 
 User = get_user_model()
 
@@ -41,4 +47,24 @@ class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'email', 'first_name', 'last_name', 'phone_number', 'business_verified', 'date_joined')
-        read_only_fields = ('id', 'email', 'business_verified', 'date_joined')
\ No newline at end of file
+        read_only_fields = ('id', 'email', 'business_verified', 'date_joined')
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField(required=False)
+
+    def validate_refresh(self, value):
+        try:
+            token = RefreshToken(value)
+        except TokenError as e:
+            raise serializers.ValidationError(str(e))
+        if str(token.get(api_settings.USER_ID_CLAIM)) != str(self.context['request'].user.pk):
+            raise serializers.ValidationError('Refresh token belongs to another user.')
+        return token
+
+class RevocationAwareTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        # Signature and expiry are checked by the parent; only the jti is needed here
+        token = self.token_class(attrs['refresh'], verify=False)
+        if revocation_store.is_revoked(token.get(api_settings.JTI_CLAIM)):
+            raise TokenError(_('Token has been revoked'))
+        return super().validate(attrs)
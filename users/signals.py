@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .authentication import invalidate_cached_user
+from .models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_authenticated_user(sender, instance, **kwargs):
+    # Covers deactivation and password changes, which both go through save()
+    invalidate_cached_user(instance.pk)
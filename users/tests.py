@@ -1,3 +1,111 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from . import authentication
+from .models import CustomUser, RevokedToken
+from .revocation import BloomFilter, RevocationStore
 
-# Create your tests here.
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        authentication._users.clear()
+        self.user = CustomUser.objects.create_user(email='owner@example.com', password='pass12345')
+        self.client = APIClient()
+        response = self.client.post('/api/auth/token/', {'email': 'owner@example.com', 'password': 'pass12345'},
+                                    format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_user_is_resolved_without_a_query_once_cached(self):
+        self.client.get('/api/auth/profile/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.data['email'], 'owner@example.com')
+
+    def test_cached_user_can_be_updated_without_losing_password(self):
+        response = self.client.patch('/api/auth/profile/', {'first_name': 'Amina'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Amina')
+        self.assertTrue(self.user.check_password('pass12345'))
+
+    def test_deactivation_and_password_change_invalidate_cache(self):
+        self.client.get('/api/auth/profile/')
+        self.user.set_password('new-pass-6789')
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.client.get('/api/auth/profile/')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+    def test_version_bump_from_another_worker_invalidates_cached_user(self):
+        self.client.get('/api/auth/profile/')
+        # Deactivated without save(), as another worker's stale copy would see it
+        CustomUser.objects.filter(id=self.user.id).update(is_active=False)
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+        authentication.invalidate_cached_user(self.user.id)
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        authentication._users.clear()
+        CustomUser.objects.create_user(email='owner@example.com', password='pass12345')
+        self.client = APIClient()
+        self.tokens = self.client.post('/api/auth/token/', {'email': 'owner@example.com', 'password': 'pass12345'},
+                                       format='json').data
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        jtis = [f'jti-{i}' for i in range(1000)]
+        for jti in jtis:
+            bloom.add(jti)
+        self.assertTrue(all(jti in bloom for jti in jtis))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_logout_revokes_access_and_refresh_tokens(self):
+        response = self.client.post('/api/auth/logout/', {'refresh': self.tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': self.tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_other_workers_see_revocations_after_sync(self):
+        store = RevocationStore(sync_seconds=60)
+        store.sync(rebuild=True)
+        RevokedToken.objects.create(jti='revoked-elsewhere', token_type='access',
+                                    expires_at=timezone.now() + timedelta(days=1))
+        self.assertFalse(store.is_revoked('revoked-elsewhere'))
+        store.sync()
+        self.assertTrue(store.is_revoked('revoked-elsewhere'))
+
+    def test_revocations_committed_late_are_picked_up_by_the_overlap(self):
+        store = RevocationStore(sync_seconds=60, sync_overlap_seconds=60)
+        store.sync(rebuild=True)
+        # Stamped before the sync, but only visible after it, like a slow transaction
+        token = RevokedToken.objects.create(jti='committed-late', token_type='access',
+                                            expires_at=timezone.now() + timedelta(days=1))
+        RevokedToken.objects.filter(id=token.id).update(revoked_at=timezone.now() - timedelta(seconds=30))
+        store.sync()
+        self.assertTrue(store.is_revoked('committed-late'))
+        count = store._filter.count
+        store.sync()
+        self.assertEqual(store._filter.count, count)
+
+    def test_purge_drops_expired_revocations(self):
+        RevokedToken.objects.create(jti='old', token_type='access', expires_at=timezone.now() - timedelta(days=1))
+        RevokedToken.objects.create(jti='live', token_type='access', expires_at=timezone.now() + timedelta(days=1))
+        call_command('purge_revoked_tokens', stdout=StringIO())
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['live'])
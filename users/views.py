@@ -1,9 +1,12 @@
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth import get_user_model
-from .serializers import UserRegistrationSerializer, UserProfileSerializer
+from .revocation import revocation_store
+from .serializers import (
+    LogoutSerializer, RevocationAwareTokenRefreshSerializer, UserRegistrationSerializer, UserProfileSerializer
+)
 from rest_framework import serializers
 User = get_user_model()
 
@@ -60,4 +63,25 @@ class EmailTokenObtainPairSerializer(TokenObtainPairSerializer):
             raise serializers.ValidationError('Unable to log in with provided credentials.')
 
 class EmailTokenObtainPairView(TokenObtainPairView):
-    serializer_class = EmailTokenObtainPairSerializer
\ No newline at end of file
+    serializer_class = EmailTokenObtainPairSerializer
+
+class RevocationAwareTokenRefreshView(TokenRefreshView):
+    serializer_class = RevocationAwareTokenRefreshSerializer
+
+class LogoutView(generics.GenericAPIView):
+    """Revoke the access token used for this request and, if given, its refresh token"""
+    serializer_class = LogoutSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        revocation_store.revoke(request.auth, request.user.pk)
+        refresh = serializer.validated_data.get('refresh')
+        if refresh is not None:
+            revocation_store.revoke(refresh, request.user.pk)
+            # Also rejected by simplejwt's own blacklist check on refresh
+            refresh.blacklist()
+        
+        return Response({'message': 'Logged out successfully'}, status=status.HTTP_200_OK)